@@ -1,16 +1,74 @@
 import logging
-from fastapi import APIRouter, HTTPException, status
-from database.models import CollectionMetadata, Vacancy
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, status
+from database.models import DatasetSnapshot, Vacancy, VacancyRole
+from tortoise.transactions import in_transaction
+from api.services.salary_stats import get_full_stats, render_full_stats
+from api.services.stats_cache import dataset_version, stats_cache
+from api.services.salary_distribution import HISTOGRAM_EDGES, get_grouped_distribution
+from api.services.salary_trends import delete_salary_aggregates, get_salary_trends, record_salary_aggregates
+from api.schemas.v1.hh_models import (
+    FacetQueryRequest,
+    FacetQueryResponse,
+    GroupedStatsResponse,
+    SalaryTrendResponse,
+    VacancySearchResponse,
+)
+from api.services.salary_snapshot import salary_snapshot
+from api.services.facet_index import facet_index
+from api.services.vacancy_search import search_vacancies
+from api.services.vacancy_export import EXPORT_FORMATS, export_vacancies, parquet_available
+from api.services.vacancy_iter import iter_vacancies, iter_vacancy_chunks
+from api.services.vacancy_descriptions import get_descriptions, save_description
+from api.services.vacancy_dedup import duplicate_vacancy_ids, largest_clusters, rebuild_duplicate_index, register_vacancy
+from api.services.snapshot_loader import create_collection_metadata, load_lock, load_snapshot, rollback_snapshot, snapshot_history
+from api.services.profession_catalog import profession_catalog, refresh_profession_catalog
+from api.services.hh_collector import HHruMassCollector
+from api.services.skill_index import skill_index
+import asyncio
 import json
 import database
-from datetime import datetime
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+async def sync_vacancy_roles(vacancy_id: str, roles: list) -> None:
+    """Пересоздаёт строки vacancy_roles для вакансии"""
+    await VacancyRole.filter(vacancy_id=vacancy_id).delete()
+    await VacancyRole.bulk_create([
+        VacancyRole(vacancy_id=vacancy_id, role_id=role.get('id'), role_name=role['name'])
+        for role in roles or [] if role.get('name')
+    ])
+
+
+async def refresh_derived_data(collection_id: Optional[int] = None) -> None:
+    """
+    Данные изменились - сбрасываем кэши статистики и пересобираем in-memory индексы.
+    Для нового сбора дополнительно сохраняются агрегаты зарплат (для динамики).
+    """
+    await dataset_version.bump()
+    await salary_snapshot.rebuild()
+    await facet_index.rebuild()
+    await skill_index.get()
+    await refresh_profession_catalog()
+    if collection_id is not None:
+        await record_salary_aggregates(collection_id)
+
+
 @router.post('/db')
 async def load_vacancies_from_json(json_file_path: str) -> dict:
+    """
+    Инкрементальная загрузка вакансий из JSON файла (upsert по id).
+    Для полной замены данных используйте /db/snapshot.
+    """
+    if load_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Загрузка вакансий уже выполняется")
+    async with load_lock:
+        return await _load_vacancies_from_json(json_file_path)
+
+
+async def _load_vacancies_from_json(json_file_path: str) -> dict:
     """
     Загружает вакансии из JSON файла в базу данных.
     Все данные записываются в одну модель Vacancy.
@@ -31,28 +89,16 @@ async def load_vacancies_from_json(json_file_path: str) -> dict:
         'vacancies_created': 0,
         'vacancies_updated': 0,
         'vacancies_skipped': 0,
+        'duplicates_found': 0,
         'errors': []
     }
 
     # Сохраняем метаданные
     metadata = data.get('metadata', {})
+    collection = None
     if metadata:
         try:
-            collection_time_str = metadata.get('collection_time', '')
-            # Парсим ISO формат datetime
-            if collection_time_str:
-                collection_time = datetime.fromisoformat(collection_time_str)
-            else:
-                collection_time = datetime.now()
-
-            await CollectionMetadata.create(
-                collection_time=collection_time,
-                source=metadata.get('source', 'hh.ru'),
-                total_vacancies=metadata.get('total_vacancies', 0),
-                vacancies_per_profession=metadata.get('vacancies_per_profession', 0),
-                version=metadata.get('version', '1.0'),
-                extra_data=metadata
-            )
+            collection = await create_collection_metadata(metadata)
             print("✓ Метаданные сохранены")
         except Exception as e:
             print(f"✗ Ошибка при сохранении метаданных: {e}")
@@ -76,7 +122,6 @@ async def load_vacancies_from_json(json_file_path: str) -> dict:
             vacancy_dict = {
                 'id': vacancy_id,
                 'name': vacancy_data.get('name', ''),
-                'description': vacancy_data.get('description'),
                 'professional_roles': vacancy_data.get('professional_roles', []),
                 'key_skills': vacancy_data.get('key_skills', []),
                 'specializations': vacancy_data.get('specializations', []),
@@ -86,22 +131,35 @@ async def load_vacancies_from_json(json_file_path: str) -> dict:
                 'schedule': vacancy_data.get('schedule', {}),
             }
 
-            # Проверяем существование вакансии
-            existing_vacancy = await Vacancy.filter(id=vacancy_id).first()
+            async with in_transaction() as connection:
+                # Проверяем существование вакансии
+                existing_vacancy = await Vacancy.filter(id=vacancy_id).first()
+
+                if existing_vacancy:
+                    # Обновляем существующую вакансию
+                    for key, value in vacancy_dict.items():
+                        if key != 'id':  # ID не обновляем
+                            setattr(existing_vacancy, key, value)
+
+                    await existing_vacancy.save()
+                    stats['vacancies_updated'] += 1
+
+                else:
+                    # Создаём новую вакансию
+                    await Vacancy.create(**vacancy_dict)
+                    stats['vacancies_created'] += 1
 
-            if existing_vacancy:
-                # Обновляем существующую вакансию
-                for key, value in vacancy_dict.items():
-                    if key != 'id':  # ID не обновляем
-                        setattr(existing_vacancy, key, value)
+                # Роли вакансии в отдельной таблице - для индексного поиска по роли
+                await sync_vacancy_roles(vacancy_id, vacancy_dict['professional_roles'])
 
-                await existing_vacancy.save()
-                stats['vacancies_updated'] += 1
+                # Описание - в отдельной таблице вместе с поисковым вектором
+                await save_description(connection, vacancy_id, vacancy_dict['name'],
+                                       vacancy_dict['key_skills'], vacancy_data.get('description'))
 
-            else:
-                # Создаём новую вакансию
-                await Vacancy.create(**vacancy_dict)
-                stats['vacancies_created'] += 1
+                # MinHash-сигнатура и кластер почти-дублей
+                cluster_id = await register_vacancy(vacancy_id, vacancy_dict['name'], vacancy_data.get('description'))
+                if cluster_id != vacancy_id:
+                    stats['duplicates_found'] += 1
 
             # Прогресс каждые 100 вакансий
             if idx % 100 == 0:
@@ -115,6 +173,8 @@ async def load_vacancies_from_json(json_file_path: str) -> dict:
             stats['errors'].append(error_msg)
             print(f"✗ {error_msg}")
 
+    await refresh_derived_data(collection.id if collection else None)
+
     # Итоговая статистика
     print("\n" + "=" * 60)
     print("СТАТИСТИКА ЗАГРУЗКИ")
@@ -122,6 +182,7 @@ async def load_vacancies_from_json(json_file_path: str) -> dict:
     print(f"✓ Вакансий создано:   {stats['vacancies_created']}")
     print(f"↻ Вакансий обновлено: {stats['vacancies_updated']}")
     print(f"⊘ Вакансий пропущено: {stats['vacancies_skipped']}")
+    print(f"≈ Почти-дублей:       {stats['duplicates_found']}")
     print(f"✗ Ошибок:             {len(stats['errors'])}")
     print("=" * 60)
 
@@ -136,8 +197,62 @@ async def load_vacancies_from_json(json_file_path: str) -> dict:
     return stats
 
 
+
+@router.post('/db/snapshot')
+async def load_vacancies_snapshot(json_file_path: str) -> dict:
+    """
+    Полная загрузка снимка вакансий (blue/green).
+    Данные заливаются в теневые таблицы и подменяют текущие одной транзакцией,
+    до подмены все запросы читают прежний снимок целиком.
+    """
+    if load_lock.locked():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Загрузка вакансий уже выполняется")
+    try:
+        snapshot = await load_snapshot(json_file_path)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка загрузки снимка: {str(e)}"
+        )
+    await refresh_derived_data(snapshot.collection_id)
+    return {"snapshot_id": snapshot.id, "collection_id": snapshot.collection_id,
+            "vacancies": snapshot.vacancies_count, "status": snapshot.status}
+
+
+@router.post('/db/snapshot/rollback')
+async def rollback_vacancies_snapshot() -> dict:
+    """Мгновенный откат к предыдущему снимку"""
+    rolled_back = await DatasetSnapshot.filter(status="live").first()
+    try:
+        snapshot = await rollback_snapshot()
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    # Отменённый сбор не должен оставаться в динамике зарплат
+    if rolled_back is not None:
+        await delete_salary_aggregates(rolled_back.collection_id)
+    await refresh_derived_data()
+    return {"snapshot_id": snapshot.id if snapshot else None, "status": "live"}
+
+
+@router.get('/db/snapshots')
+async def list_vacancy_snapshots(limit: int = Query(20, ge=1, le=100)) -> list:
+    """История полных загрузок"""
+    return await snapshot_history(limit)
+
+
 from typing import Dict, Optional, Any
 from pydantic import ValidationError
+from tortoise.expressions import Subquery
+
+
+def vacancies_query(professional_role: Optional[str] = None):
+    """Выборка вакансий, при необходимости - только с заданной ролью (через индекс vacancy_roles)"""
+    query = Vacancy.all()
+    if professional_role:
+        query = query.filter(id__in=Subquery(
+            VacancyRole.filter(role_name=professional_role).values("vacancy_id")
+        ))
+    return query
 
 
 async def calculate_average_salary(
@@ -162,43 +277,30 @@ async def calculate_average_salary(
         - currency: валюта
     """
 
-    # Получаем все вакансии (фильтрация по JSON-полям будет в Python)
-    vacancies = await Vacancy.all()
+    # Фильтр по роли выполняется в БД по индексу vacancy_roles,
+    # остальные фильтры по JSON-полям - в Python, порциями только по нужным колонкам
+    salary_from_list = []
+    salary_to_list = []
+    middle_salaries = []
+
+    async for vacancy in iter_vacancies(("salary", "experience"), query=vacancies_query(professional_role)):
+        salary = vacancy["salary"]
 
-    # Фильтруем вакансии в Python
-    filtered_vacancies = []
-    for vacancy in vacancies:
         # Пропускаем вакансии без зарплаты
-        if not vacancy.salary:
+        if not salary:
             continue
 
-        # Фильтр по профессиональной роли
-        if professional_role:
-            roles = vacancy.professional_roles or []
-            role_match = any(role.get("name") == professional_role for role in roles)
-            if not role_match:
-                continue
-
         # Фильтр по опыту
         if experience_id:
-            exp = vacancy.experience or {}
+            exp = vacancy["experience"] or {}
             if exp.get("id") != experience_id:
                 continue
 
         # Фильтр по валюте
-        if vacancy.salary.get("currency") != currency:
+        if salary.get("currency") != currency:
             continue
 
-        filtered_vacancies.append(vacancy)
-
-    # Собираем данные по зарплатам
-    salary_from_list = []
-    salary_to_list = []
-    middle_salaries = []
-
-    for vacancy in filtered_vacancies:
-        salary = vacancy.salary
-
+        # Собираем данные по зарплатам
         from_val = salary.get("from")
         to_val = salary.get("to")
 
@@ -234,7 +336,8 @@ async def calculate_average_salary(
 
 async def calculate_salary_by_groups(
         group_by: str = "experience",  # "experience" или "professional_role"
-        currency: str = "RUR"
+        currency: str = "RUR",
+        deduplicate: bool = False
 ) -> Dict[str, Dict[str, Any]]:
     """
     Группировка и подсчет средней зарплаты по различным параметрам.
@@ -242,56 +345,66 @@ async def calculate_salary_by_groups(
     Args:
         group_by: Параметр для группировки ("experience" или "professional_role")
         currency: Валюта для расчета
+        deduplicate: Пропускать повторно размещённые вакансии (почти-дубли)
 
     Returns:
         Dict с результатами по каждой группе
     """
 
-    vacancies = await Vacancy.all()
+    duplicate_ids = await duplicate_vacancy_ids() if deduplicate else set()
+
+    # Роли берём из vacancy_roles - все роли вакансии, а не только первую
+    roles_by_vacancy = {}
+    if group_by == "professional_role":
+        for row in await VacancyRole.all().order_by("id").values("vacancy_id", "role_name"):
+            roles_by_vacancy.setdefault(row["vacancy_id"], []).append(row["role_name"])
 
     groups = {}
 
-    for vacancy in vacancies:
-        salary = vacancy.salary
+    async for vacancy in iter_vacancies(("salary", "experience")):
+        salary = vacancy["salary"]
 
         # Пропускаем вакансии без зарплаты или с неподходящей валютой
         if not salary or salary.get("currency") != currency:
             continue
 
-        # Определяем ключ группировки
+        if vacancy["id"] in duplicate_ids:
+            continue
+
+        # Определяем ключи группировки (вакансия с несколькими ролями попадает в каждую)
         if group_by == "experience":
-            exp = vacancy.experience or {}
-            group_key = exp.get("name", "Не указано")
+            exp = vacancy["experience"] or {}
+            group_keys = [exp.get("name", "Не указано")]
         elif group_by == "professional_role":
-            roles = vacancy.professional_roles or []
-            group_key = roles[0]["name"] if roles else "Не указано"
+            group_keys = roles_by_vacancy.get(vacancy["id"]) or ["Не указано"]
         else:
             continue
 
-        # Инициализируем группу
-        if group_key not in groups:
-            groups[group_key] = {
-                "from_list": [],
-                "to_list": [],
-                "middle_list": []
-            }
+        for group_key in group_keys:
+            # Инициализируем группу
+            if group_key not in groups:
+                groups[group_key] = {
+                    "from_list": [],
+                    "to_list": [],
+                    "middle_list": []
+                }
 
-        # Собираем данные
-        from_val = salary.get("from")
-        to_val = salary.get("to")
+            # Собираем данные
+            from_val = salary.get("from")
+            to_val = salary.get("to")
 
-        if from_val is not None:
-            groups[group_key]["from_list"].append(float(from_val))
-        if to_val is not None:
-            groups[group_key]["to_list"].append(float(to_val))
+            if from_val is not None:
+                groups[group_key]["from_list"].append(float(from_val))
+            if to_val is not None:
+                groups[group_key]["to_list"].append(float(to_val))
 
-        # Вычисляем среднюю для вакансии
-        if from_val is not None and to_val is not None:
-            groups[group_key]["middle_list"].append((float(from_val) + float(to_val)) / 2)
-        elif from_val is not None:
-            groups[group_key]["middle_list"].append(float(from_val))
-        elif to_val is not None:
-            groups[group_key]["middle_list"].append(float(to_val))
+            # Вычисляем среднюю для вакансии
+            if from_val is not None and to_val is not None:
+                groups[group_key]["middle_list"].append((float(from_val) + float(to_val)) / 2)
+            elif from_val is not None:
+                groups[group_key]["middle_list"].append(float(from_val))
+            elif to_val is not None:
+                groups[group_key]["middle_list"].append(float(to_val))
 
     # Вычисляем средние для каждой группы
     result = {}
@@ -318,37 +431,32 @@ async def calculate_average_salary_optimized(
     Использует генераторы и list comprehension для лучшей производительности.
     """
 
-    vacancies = await Vacancy.all()
-
     # Функция фильтрации
     def passes_filters(vacancy):
-        if not vacancy.salary or vacancy.salary.get("currency") != currency:
+        if not vacancy["salary"] or vacancy["salary"].get("currency") != currency:
             return False
 
-        if professional_role:
-            roles = vacancy.professional_roles or []
-            if not any(role.get("name") == professional_role for role in roles):
-                return False
-
         if experience_id:
-            exp = vacancy.experience or {}
+            exp = vacancy["experience"] or {}
             if exp.get("id") != experience_id:
                 return False
 
         return True
 
-    # Фильтруем вакансии
-    filtered = [v for v in vacancies if passes_filters(v)]
+    # Фильтруем вакансии порциями, держа в памяти только отобранные зарплаты
+    salaries = []
+    async for chunk in iter_vacancy_chunks(("salary", "experience"), query=vacancies_query(professional_role)):
+        salaries.extend(v["salary"] for v in chunk if passes_filters(v))
 
     # Извлекаем зарплаты
-    salary_from = [float(v.salary["from"]) for v in filtered if v.salary.get("from") is not None]
-    salary_to = [float(v.salary["to"]) for v in filtered if v.salary.get("to") is not None]
+    salary_from = [float(s["from"]) for s in salaries if s.get("from") is not None]
+    salary_to = [float(s["to"]) for s in salaries if s.get("to") is not None]
 
     # Вычисляем средние для каждой вакансии
     middle_salaries = []
-    for v in filtered:
-        from_val = v.salary.get("from")
-        to_val = v.salary.get("to")
+    for s in salaries:
+        from_val = s.get("from")
+        to_val = s.get("to")
 
         if from_val is not None and to_val is not None:
             middle_salaries.append((float(from_val) + float(to_val)) / 2)
@@ -369,9 +477,9 @@ async def calculate_average_salary_optimized(
 from pydantic import BaseModel
 from typing import List, Dict, Any
 
-from typing import Optional
+from typing import Literal, Optional
 from fastapi import HTTPException, status
-from fastapi.responses import PlainTextResponse
+from fastapi.responses import PlainTextResponse, StreamingResponse
 
 
 
@@ -379,7 +487,8 @@ from fastapi.responses import PlainTextResponse
 async def get_full_stats_print(
         target_role: Optional[str] = "Автомойщик",
         target_experience: Optional[str] = "noExperience",
-        baseline_experience: Optional[str] = "noExperience"
+        baseline_experience: Optional[str] = "noExperience",
+        deduplicate: bool = False
 ):
     """
     Получение полной статистики в текстовом формате (как print).
@@ -388,64 +497,24 @@ async def get_full_stats_print(
         target_role: Целевая профессиональная роль для первой строки
         target_experience: Опыт для целевой роли
         baseline_experience: Опыт для базовой статистики
+        deduplicate: Считать каждый кластер почти-дублей одной вакансией
 
     Returns:
         Форматированный текст со всей статистикой
     """
     try:
-        output_lines = []
-
-        # 1. Целевая категория (например, Автомойщики без опыта)
-        if target_role and target_experience:
-            target_result = await calculate_average_salary(
-                professional_role=target_role,
-                experience_id=target_experience
-            )
-
-            # Получаем название опыта для красивого вывода
-            exp_name = {
-                "noExperience": "без опыта",
-                "between1And3": "от 1 до 3 лет",
-                "between3And6": "от 3 до 6 лет",
-                "moreThan6": "более 6 лет"
-            }.get(target_experience, target_experience)
-
-            output_lines.append(
-                f"{target_role} {exp_name}: {target_result}"
-            )
-
-        # 2. Базовая категория (все вакансии без опыта)
-        if baseline_experience:
-            baseline_result = await calculate_average_salary(
-                experience_id=baseline_experience
-            )
-
-            exp_name = {
-                "noExperience": "без опыта",
-                "between1And3": "от 1 до 3 лет",
-                "between3And6": "от 3 до 6 лет",
-                "moreThan6": "более 6 лет"
-            }.get(baseline_experience, baseline_experience)
-
-            output_lines.append(
-                f"Все вакансии {exp_name}: {baseline_result}"
-            )
-
-        # 3. По опыту работы
-        output_lines.append("\nПо опыту работы:")
-        experience_data = await calculate_salary_by_groups(group_by="experience")
-
-        for exp_name, stats in experience_data.items():
-            if stats["count"] > 0:  # Показываем только непустые группы
-                output_lines.append(f"  {exp_name}: {stats}")
-
-        # 4. По профессиональным ролям
-        output_lines.append("\nПо ролям:")
-        role_data = await calculate_salary_by_groups(group_by="professional_role")
-
-        for role_name, stats in role_data.items():
-            if stats["count"] > 0:  # Показываем только непустые группы
-                output_lines.append(f"  {role_name}: {stats}")
+        stats = await get_full_stats(
+            target_role=target_role,
+            target_experience=target_experience,
+            baseline_experience=baseline_experience,
+            deduplicate=deduplicate
+        )
+        output_lines, _ = render_full_stats(
+            stats,
+            target_role=target_role,
+            target_experience=target_experience,
+            baseline_experience=baseline_experience
+        )
 
         # Объединяем все строки
         result_text = "\n".join(output_lines)
@@ -466,7 +535,8 @@ async def get_full_stats_print(
 async def get_full_stats_plain_text(
         target_role: Optional[str] = "Автомойщик",
         target_experience: Optional[str] = "noExperience",
-        baseline_experience: Optional[str] = "noExperience"
+        baseline_experience: Optional[str] = "noExperience",
+        deduplicate: bool = False
 ):
     """
     Получение полной статистики в виде обычного текста (content-type: text/plain).
@@ -475,7 +545,8 @@ async def get_full_stats_plain_text(
     result = await get_full_stats_print(
         target_role=target_role,
         target_experience=target_experience,
-        baseline_experience=baseline_experience
+        baseline_experience=baseline_experience,
+        deduplicate=deduplicate
     )
     return result["text"]
 
@@ -509,70 +580,26 @@ class FullStatsTextResponse(BaseModel):
 async def get_full_stats_structured(
         target_role: Optional[str] = "Автомойщик",
         target_experience: Optional[str] = "noExperience",
-        baseline_experience: Optional[str] = "noExperience"
+        baseline_experience: Optional[str] = "noExperience",
+        deduplicate: bool = False
 ):
     """
     Получение полной статистики в структурированном формате
     с текстом, массивом строк и данными.
     """
     try:
-        output_lines = []
-        structured_data = {}
-
-        # 1. Целевая категория
-        if target_role and target_experience:
-            target_result = await calculate_average_salary(
-                professional_role=target_role,
-                experience_id=target_experience
-            )
-
-            exp_name = {
-                "noExperience": "без опыта",
-                "between1And3": "от 1 до 3 лет",
-                "between3And6": "от 3 до 6 лет",
-                "moreThan6": "более 6 лет"
-            }.get(target_experience, target_experience)
-
-            line = f"{target_role} {exp_name}: {target_result}"
-            output_lines.append(line)
-            structured_data["target"] = target_result
-
-        # 2. Базовая категория
-        if baseline_experience:
-            baseline_result = await calculate_average_salary(
-                experience_id=baseline_experience
-            )
-
-            exp_name = {
-                "noExperience": "без опыта",
-                "between1And3": "от 1 до 3 лет",
-                "between3And6": "от 3 до 6 лет",
-                "moreThan6": "более 6 лет"
-            }.get(baseline_experience, baseline_experience)
-
-            line = f"Все вакансии {exp_name}: {baseline_result}"
-            output_lines.append(line)
-            structured_data["baseline"] = baseline_result
-
-        # 3. По опыту
-        output_lines.append("\nПо опыту работы:")
-        experience_data = await calculate_salary_by_groups(group_by="experience")
-
-        filtered_exp = {k: v for k, v in experience_data.items() if v["count"] > 0}
-        structured_data["by_experience"] = filtered_exp
-
-        for exp_name, stats in filtered_exp.items():
-            output_lines.append(f"  {exp_name}: {stats}")
-
-        # 4. По ролям
-        output_lines.append("\nПо ролям:")
-        role_data = await calculate_salary_by_groups(group_by="professional_role")
-
-        filtered_roles = {k: v for k, v in role_data.items() if v["count"] > 0}
-        structured_data["by_professional_role"] = filtered_roles
-
-        for role_name, stats in filtered_roles.items():
-            output_lines.append(f"  {role_name}: {stats}")
+        stats = await get_full_stats(
+            target_role=target_role,
+            target_experience=target_experience,
+            baseline_experience=baseline_experience,
+            deduplicate=deduplicate
+        )
+        output_lines, structured_data = render_full_stats(
+            stats,
+            target_role=target_role,
+            target_experience=target_experience,
+            baseline_experience=baseline_experience
+        )
 
         result_text = "\n".join(output_lines)
 
@@ -587,3 +614,200 @@ async def get_full_stats_structured(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Ошибка при формировании статистики: {str(e)}"
         )
+
+
+@router.get('/stats/distribution', response_model=GroupedStatsResponse)
+async def get_salary_distribution(
+        group_by: Literal["experience", "professional_role"] = "experience",
+        currency: str = "RUR"
+):
+    """
+    Средние, перцентили (p10-p90) и гистограмма средней зарплаты по группам.
+    Перцентили оцениваются по KLL-скетчам, которые строятся после каждой загрузки.
+    """
+    try:
+        data = await stats_cache.get_or_compute(
+            ("distribution", group_by, currency),
+            lambda: get_grouped_distribution(group_by=group_by, currency=currency)
+        )
+
+        return GroupedStatsResponse(
+            group_by=group_by,
+            data=data,
+            total_groups=len(data),
+            histogram_edges=HISTOGRAM_EDGES[:-1]
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка при формировании статистики: {str(e)}"
+        )
+
+
+@router.get('/stats/trends', response_model=SalaryTrendResponse)
+async def get_salary_trends_endpoint(
+        professional_role: Optional[str] = None,
+        experience_id: Optional[str] = None,
+        currency: str = "RUR",
+        limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Динамика средних зарплат и перцентилей по сборам данных.
+    Читает только таблицу агрегатов, без пересчёта по вакансиям.
+    """
+    try:
+        points = await get_salary_trends(professional_role, experience_id, currency, limit)
+        return SalaryTrendResponse(
+            professional_role=professional_role,
+            experience_id=experience_id,
+            currency=currency,
+            points=points
+        )
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка при получении динамики зарплат: {str(e)}"
+        )
+
+
+@router.post('/vacancies/facets', response_model=FacetQueryResponse)
+async def query_vacancy_facets(request: FacetQueryRequest):
+    """
+    Фасетный поиск вакансий по навыкам, графику, занятости, опыту, ролям
+    и диапазону зарплаты. Возвращает количество найденных вакансий,
+    счётчики по значениям каждого фасета и средние зарплаты.
+    """
+    try:
+        index = await facet_index.get()
+        result = index.query(
+            filters={
+                "key_skills": request.key_skills,
+                "schedule": request.schedule,
+                "employment": request.employment,
+                "experience": request.experience,
+                "professional_roles": request.professional_roles,
+            },
+            salary_min=request.salary_min,
+            salary_max=request.salary_max,
+            currency=request.currency,
+            facet_limit=request.facet_limit
+        )
+        return FacetQueryResponse(**result)
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка фасетного поиска: {str(e)}"
+        )
+
+
+@router.get('/vacancies/search', response_model=VacancySearchResponse)
+async def search_vacancies_fulltext(
+        q: str = Query(..., min_length=2, max_length=200),
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = None
+):
+    """
+    Полнотекстовый поиск по названию, описанию и ключевым навыкам вакансий.
+    Результаты упорядочены по релевантности, для следующей страницы
+    передайте next_cursor из предыдущего ответа.
+    """
+    try:
+        return await search_vacancies(q, limit=limit, cursor=cursor)
+
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка поиска: {str(e)}"
+        )
+
+
+@router.get('/vacancies/export')
+async def export_vacancies_stream(
+        format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+        chunk_size: int = Query(5000, ge=100, le=50000),
+        include_description: bool = False
+):
+    """
+    Потоковая выгрузка всех вакансий в NDJSON, CSV или Parquet.
+    Данные читаются серверным курсором порциями по chunk_size строк,
+    поэтому память не растёт с размером таблицы.
+    """
+    # После начала стрима ошибку уже не вернуть - проверяем зависимость заранее
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_501_NOT_IMPLEMENTED,
+            detail="Выгрузка в Parquet недоступна: на сервере не установлен pyarrow"
+        )
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        export_vacancies(format, chunk_size=chunk_size, include_description=include_description),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=vacancies.{extension}"}
+    )
+
+
+@router.get('/vacancies/{vacancy_id}/description')
+async def get_vacancy_description(vacancy_id: str) -> dict:
+    """Текст описания вакансии (без HTML)"""
+    descriptions = await get_descriptions([vacancy_id])
+    if vacancy_id not in descriptions:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Вакансия не найдена")
+    return {"id": vacancy_id, "description": descriptions[vacancy_id]}
+
+
+@router.get('/vacancies/duplicates')
+async def get_duplicate_clusters(limit: int = Query(20, ge=1, le=200)) -> list:
+    """Крупнейшие кластеры почти-дублей (повторно размещённые вакансии)"""
+    return await largest_clusters(limit)
+
+
+@router.post('/vacancies/duplicates/rebuild')
+async def rebuild_duplicates() -> dict:
+    """Пересчитывает MinHash-сигнатуры и кластеры дублей для всех вакансий"""
+    result = await rebuild_duplicate_index()
+    await dataset_version.bump()
+    return result
+
+
+@router.get('/professions/match')
+async def match_profession(q: str = Query(..., min_length=2, max_length=500)):
+    """Поиск профессии в локальном каталоге (без обращения к LLM)"""
+    matcher = await profession_catalog.get()
+    return matcher.match(q)
+
+
+@router.post('/professions/catalog/refresh')
+async def refresh_professions(include_hh_roles: bool = False) -> dict:
+    """
+    Пересобирает каталог профессий из ролей загруженных вакансий.
+    С include_hh_roles=true дополнительно загружает справочник ролей hh.ru.
+    """
+    hh_roles = None
+    if include_hh_roles:
+        hh_roles = await asyncio.to_thread(HHruMassCollector().get_all_professional_roles)
+    return await refresh_profession_catalog(hh_roles)
+
+
+@router.get('/skills/top')
+async def get_top_skills(
+        role: str,
+        experience: Optional[str] = None,
+        limit: int = Query(20, ge=1, le=200)
+) -> list:
+    """Самые частые ключевые навыки в вакансиях роли (опционально - с заданным опытом)"""
+    index = await skill_index.get()
+    return index.top_skills(role, experience_id=experience, limit=limit)
+
+
+@router.get('/skills/related')
+async def get_related_skills(skill: str, limit: int = Query(20, ge=1, le=200)) -> list:
+    """Навыки, которые чаще всего встречаются в вакансиях вместе с данным"""
+    index = await skill_index.get()
+    return index.related_skills(skill, limit=limit)
@@ -1,5 +1,9 @@
+import asyncio
+import json
 import logging
+import time
 from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import StreamingResponse
 from database.models import Session
 from api.schemas.v1.ai_models import (
     InitialQueryRequest,
@@ -9,7 +13,10 @@ from api.schemas.v1.ai_models import (
     RealCaseExample,
     ChatExample,
 )
-from api.services.llm_manager import llm_service
+from api.services.llm_manager import DialogueContext, llm_service
+from api.services.llm_scheduler import LLMOverloadedError, Priority, llm_scheduler
+from api.services.single_flight import llm_single_flight
+from api.services.profile_cache import profile_cache
 from api.services.runware_manager import RunwareManager
 from settings.settings import settings
 
@@ -17,28 +24,79 @@ logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
+def _profile_response(session: Session, profile_data: dict, day_images: list) -> CareerProfileResponse:
+    """Ответ с финальным профилем из данных, сгенерированных моделью"""
+    return CareerProfileResponse(
+        session_id=session.id,
+        position_title=profile_data["position_title"],
+        sounds=profile_data["sounds"],
+        career_growth=profile_data["career_growth"],
+        balance_score=profile_data["balance_score"],
+        benefit=profile_data["benefit"],
+        typical_day=profile_data["typical_day"],
+        real_cases=[RealCaseExample(**case) for case in profile_data["real_cases"]],
+        tech_stack=profile_data["tech_stack"],
+        visual=profile_data["visual"],
+        day_images=day_images,
+        chat_examples=[ChatExample(**example) for example in profile_data["chat_examples"]],
+        created_at=session.created_at
+    )
+
+
+def _sse(event: str, data) -> str:
+    """Одно событие Server-Sent Events"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+async def _generate_day_images(prompts: list):
+    """Картинки генерируются параллельно и отдаются по мере готовности: (индекс, url)"""
+    runware_manager = RunwareManager()
+
+    async def generate(index: int, prompt: str):
+        return index, await runware_manager.generate_image(positive_prompt=prompt)
+
+    for next_image in asyncio.as_completed([generate(i, prompt) for i, prompt in enumerate(prompts)]):
+        yield await next_image
+
+
 @router.get("/health")
 async def health_check():
-    """Проверка здоровья приложения и Ollama"""
-    try:
-        test_response = await llm_service.client.generate(
-            model=settings.ollama_model,
-            prompt="test",
-            options={'num_predict': 5},
-            stream=False
-        )
+    """Проверка здоровья приложения и серверов Ollama"""
+    await llm_service.pool.check_all()
+    available = [
+        backend for backend in llm_service.pool.backends
+        if backend.healthy and backend.has_model(settings.ollama_model)
+    ]
+    return {
+        "status": "healthy" if available else "degraded",
+        "ollama": "connected" if available else "disconnected",
+        "model": settings.ollama_model,
+        **llm_service.pool.stats()
+    }
+
+
+@router.get("/profile-cache/stats")
+async def profile_cache_stats():
+    """Попадания и промахи кэша профилей"""
+    return profile_cache.stats()
 
-        return {
-            "status": "healthy",
-            "ollama": "connected",
-            "model": settings.ollama_model
-        }
-    except Exception as e:
-        return {
-            "status": "degraded",
-            "ollama": "disconnected",
-            "error": str(e)
-        }
+
+@router.get("/llm-scheduler/stats")
+async def llm_scheduler_stats():
+    """Занятые слоты, очередь по приоритетам и отказы планировщика запросов к LLM"""
+    return llm_scheduler.stats()
+
+
+@router.get("/single-flight/stats")
+async def single_flight_stats():
+    """Сколько одинаковых запросов к LLM было объединено"""
+    return llm_single_flight.stats()
+
+
+@router.get("/semantic-cache/stats")
+async def semantic_cache_stats():
+    """Попадания семантического кэша по типам запросов (точные и по близости эмбеддингов)"""
+    return {name: cache.stats() for name, cache in llm_service.semantic_caches.items()}
 
 
 @router.post("/start", response_model=ClarificationResponse, status_code=status.HTTP_200_OK)
@@ -69,11 +127,13 @@ async def start_session(request: InitialQueryRequest):
             )
 
         # Профессия реальная - начинаем уточнения
+        dialogue = DialogueContext()
         first_question = await llm_service.generate_profession_detail_question(
             profession_name=profession_check['profession_name'],
             question_number=1,
             initial_context=request.user_message,
-            previous_qa=[]
+            previous_qa=[],
+            dialogue=dialogue
         )
 
         session = await Session.create(
@@ -82,6 +142,7 @@ async def start_session(request: InitialQueryRequest):
             identified_profession=profession_check['profession_name'],
             clarification_stage="profession_details",
             clarification_history=[{"question": first_question, "answer": None}],
+            llm_context=dialogue.tokens,
             status="waiting_answer"
         )
 
@@ -92,6 +153,9 @@ async def start_session(request: InitialQueryRequest):
             alternatives=None
         )
 
+    except LLMOverloadedError:
+        # 503 с Retry-After отдаёт глобальный обработчик
+        raise
     except Exception as e:
         logger.error(f"Error in start_session: {e}", exc_info=True)
         raise HTTPException(
@@ -129,15 +193,18 @@ async def answer_clarification(request: FinalAnswerRequest):
             session.identified_profession = request.answer
             session.clarification_stage = "profession_details"
 
+            dialogue = DialogueContext()
             first_question = await llm_service.generate_profession_detail_question(
                 profession_name=request.answer,
                 question_number=1,
                 initial_context=f"{session.initial_message} (выбрана профессия: {request.answer})",
-                previous_qa=[]
+                previous_qa=[],
+                dialogue=dialogue
             )
 
             history.append({"question": first_question, "answer": None})
             session.clarification_history = history
+            session.llm_context = dialogue.tokens
             await session.save()
 
             return ClarificationResponse(
@@ -160,17 +227,20 @@ async def answer_clarification(request: FinalAnswerRequest):
 
             # Проверяем, нужны ли ещё вопросы (максимум 2)
             if len(history) < 2:
-                # Задаём следующий вопрос с учетом контекста
+                # Задаём следующий вопрос, продолжая контекст диалога в Ollama
+                dialogue = DialogueContext(session.llm_context)
                 next_question = await llm_service.generate_profession_detail_question(
                     profession_name=session.identified_profession,
                     question_number=len(history) + 1,
                     initial_context=session.initial_message,
-                    previous_qa=history
+                    previous_qa=history,
+                    dialogue=dialogue
                 )
 
                 # Добавляем новый вопрос с его реальным текстом
                 history.append({"question": next_question, "answer": None})
                 session.clarification_history = history
+                session.llm_context = dialogue.tokens
                 await session.save()
 
                 return ClarificationResponse(
@@ -190,6 +260,9 @@ async def answer_clarification(request: FinalAnswerRequest):
                 session.clarification_stage = "vibe_question"
                 history.append({"question": vibe_question, "answer": None})
                 session.clarification_history = history
+                # Контекст диалога нужен только уточняющим вопросам (см. DialogueContext):
+                # дальше промпты самодостаточные и с общим префиксом
+                session.llm_context = None
                 await session.save()
 
                 return ClarificationResponse(
@@ -232,22 +305,11 @@ async def answer_clarification(request: FinalAnswerRequest):
                 logger.info(f"Generated image: {image}")
 
             # Возвращаем профиль
-            return CareerProfileResponse(
-                session_id=session.id,
-                position_title=profile_data["position_title"],
-                sounds=profile_data["sounds"],
-                career_growth=profile_data["career_growth"],
-                balance_score=profile_data["balance_score"],
-                benefit=profile_data["benefit"],
-                typical_day=profile_data["typical_day"],
-                real_cases=[RealCaseExample(**case) for case in profile_data["real_cases"]],
-                tech_stack=profile_data["tech_stack"],
-                visual=profile_data["visual"],
-                day_images=day_images,
-                chat_examples=[ChatExample(**example) for example in profile_data["chat_examples"]],
-                created_at=session.created_at
-            )
+            return _profile_response(session, profile_data, day_images)
 
+    except LLMOverloadedError:
+        # 503 с Retry-After отдаёт глобальный обработчик
+        raise
     except Exception as e:
         logger.error(f"Error in answer_clarification: {e}", exc_info=True)
         raise HTTPException(
@@ -256,6 +318,109 @@ async def answer_clarification(request: FinalAnswerRequest):
         )
 
 
+@router.post("/answer/stream", status_code=status.HTTP_200_OK)
+async def answer_vibe_stream(request: FinalAnswerRequest):
+    """
+    Финальный шаг (ответ на вопрос про вайб) в виде Server-Sent Events:
+    - progress: сколько текста уже сгенерировано
+    - section: раздел профиля, как только модель его дописала (до валидации)
+    - image: ссылка на картинку дня по мере готовности
+    - done: итоговый профиль, как в ответе /answer
+    - error: ошибка генерации
+    """
+    session = await Session.get_or_none(id=request.session_id)
+
+    if not session:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Session {request.session_id} not found"
+        )
+
+    if session.status == "completed":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Session already completed"
+        )
+
+    if session.clarification_stage != "vibe_question":
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Streaming is available only for the answer to the vibe question"
+        )
+
+    # Переполненную очередь сообщаем до начала стрима, пока ещё можно вернуть 503
+    llm_scheduler.check_admission(Priority.PROFILE)
+
+    history = session.clarification_history or []
+    history[-1]['answer'] = request.answer
+    session.clarification_history = history
+
+    queue: asyncio.Queue = asyncio.Queue()
+    started = time.monotonic()
+    sent_sections = set()
+
+    async def on_progress(text: str):
+        await queue.put(_sse("progress", {
+            "generated_chars": len(text),
+            "elapsed": round(time.monotonic() - started, 1)
+        }))
+
+    async def on_section(key: str, value):
+        sent_sections.add(key)
+        await queue.put(_sse("section", {"name": key, "value": value}))
+
+    async def produce():
+        try:
+            profile_data = await llm_service.generate_profile(
+                profession_name=session.identified_profession,
+                clarification_history=history[:-1],
+                vibe_answer=request.answer,
+                progress_callback=on_progress,
+                section_callback=on_section
+            )
+            # Профиль из кэша (или разделы, которые не удалось выделить из потока) отдаём целиком
+            for key, value in profile_data.items():
+                if key not in sent_sections:
+                    await on_section(key, value)
+
+            session.result_data = profile_data
+            session.status = "completed"
+            session.clarification_stage = "completed"
+            await session.save()
+
+            translated_visual = await llm_service.translate_visual_to_english(profile_data["visual"])
+            day_images = [None] * len(translated_visual)
+            async for index, image in _generate_day_images(translated_visual):
+                day_images[index] = image
+                await queue.put(_sse("image", {"index": index, "url": image}))
+                logger.info(f"Generated image: {image}")
+
+            response = _profile_response(session, profile_data, day_images)
+            await queue.put(_sse("done", response.model_dump(mode="json")))
+        except LLMOverloadedError as e:
+            await queue.put(_sse("error", {"detail": str(e), "retry_after": e.retry_after}))
+        except Exception as e:
+            logger.error(f"Error in answer_vibe_stream: {e}", exc_info=True)
+            await queue.put(_sse("error", {"detail": f"Error processing answer: {str(e)}"}))
+        finally:
+            await queue.put(None)
+
+    async def events():
+        task = asyncio.create_task(produce())
+        try:
+            while (message := await queue.get()) is not None:
+                yield message
+        finally:
+            # Клиент отключился - генерацию дальше не продолжаем
+            task.cancel()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.get("/session/{session_id}", response_model=CareerProfileResponse)
 async def get_session_result(session_id: int):
     """Получить результат по ID сессии"""
@@ -287,18 +452,4 @@ async def get_session_result(session_id: int):
         day_images.append(image)
         logger.info(f"Generated image: {image}")
 
-    return CareerProfileResponse(
-        session_id=session.id,
-        position_title=profile_data["position_title"],
-        sounds=profile_data["sounds"],
-        career_growth=profile_data["career_growth"],
-        balance_score=profile_data["balance_score"],
-        benefit=profile_data["benefit"],
-        typical_day=profile_data["typical_day"],
-        real_cases=[RealCaseExample(**case) for case in profile_data["real_cases"]],
-        tech_stack=profile_data["tech_stack"],
-        visual=profile_data["visual"],
-        day_images=day_images,
-        chat_examples=[ChatExample(**example) for example in profile_data["chat_examples"]],
-        created_at=session.created_at
-    )
+    return _profile_response(session, profile_data, day_images)
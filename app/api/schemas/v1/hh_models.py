@@ -164,7 +164,15 @@ class VacancySearchParams(BaseModel):
 
 # Модели для статистики
 from pydantic import BaseModel, Field, validator
-from typing import Dict, Optional, Literal
+from typing import Any, Dict, List, Optional, Literal
+
+
+class HistogramBucket(BaseModel):
+    """Корзина гистограммы зарплат"""
+
+    lower: float = Field(..., description="Нижняя граница (включительно)")
+    upper: Optional[float] = Field(None, description="Верхняя граница (None - без ограничения)")
+    count: int = Field(..., ge=0, description="Оценка количества вакансий")
 
 
 class SalaryStats(BaseModel):
@@ -176,6 +184,14 @@ class SalaryStats(BaseModel):
     count: int = Field(..., ge=0, description="Количество вакансий")
     currency: str = Field(..., description="Валюта", max_length=3)
 
+    # Распределение средней зарплаты (оценка по квантильному скетчу)
+    p10: Optional[float] = Field(None, description="10-й перцентиль")
+    p25: Optional[float] = Field(None, description="25-й перцентиль")
+    p50: Optional[float] = Field(None, description="Медиана")
+    p75: Optional[float] = Field(None, description="75-й перцентиль")
+    p90: Optional[float] = Field(None, description="90-й перцентиль")
+    histogram: Optional[List[HistogramBucket]] = Field(None, description="Гистограмма по фиксированным корзинам")
+
     @validator('currency')
     def validate_currency(cls, v: str) -> str:
         """Валидация валюты (должна быть в верхнем регистре)"""
@@ -205,6 +221,10 @@ class GroupedStatsResponse(BaseModel):
     )
     data: Dict[str, SalaryStats] = Field(..., description="Данные по группам")
     total_groups: int = Field(..., ge=0, description="Количество групп")
+    histogram_edges: Optional[List[float]] = Field(
+        None,
+        description="Границы корзин гистограмм (последняя - без ограничения сверху)"
+    )
 
     @validator('total_groups', always=True)
     def validate_total_groups(cls, v: int, values: dict) -> int:
@@ -276,3 +296,87 @@ class CompleteStatsResponse(BaseModel):
         }
 
 
+
+
+class FacetQueryRequest(BaseModel):
+    """Фасетный запрос по вакансиям"""
+
+    key_skills: List[str] = Field(default_factory=list, description="Навыки (вакансия должна содержать все)")
+    schedule: List[str] = Field(default_factory=list, description="ID графиков работы (любой из)")
+    employment: List[str] = Field(default_factory=list, description="ID типов занятости (любой из)")
+    experience: List[str] = Field(default_factory=list, description="ID уровней опыта (любой из)")
+    professional_roles: List[str] = Field(default_factory=list, description="Названия ролей (любая из)")
+    salary_min: Optional[float] = Field(None, ge=0, description="Минимальная средняя зарплата")
+    salary_max: Optional[float] = Field(None, ge=0, description="Максимальная средняя зарплата")
+    currency: str = Field("RUR", description="Валюта", max_length=3)
+    facet_limit: int = Field(20, ge=1, le=500, description="Сколько значений фасета возвращать")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "key_skills": ["Python", "SQL"],
+                "schedule": ["remote"],
+                "experience": ["noExperience", "between1And3"],
+                "salary_min": 80000
+            }
+        }
+
+
+class FacetValueCount(BaseModel):
+    """Значение фасета и количество вакансий с ним"""
+
+    value: str
+    name: str
+    count: int = Field(..., ge=0)
+
+
+class FacetQueryResponse(BaseModel):
+    """Результат фасетного запроса"""
+
+    total: int = Field(..., ge=0, description="Количество найденных вакансий")
+    salary: SalaryStats = Field(..., description="Зарплаты по найденным вакансиям")
+    facets: Dict[str, List[FacetValueCount]] = Field(..., description="Счётчики по значениям фасетов")
+
+
+class VacancySearchHit(BaseModel):
+    """Найденная вакансия"""
+
+    id: str
+    name: str
+    rank: float = Field(..., description="Релевантность (ts_rank_cd)")
+    salary: Optional[Dict[str, Any]] = None
+    experience: Optional[Dict[str, Any]] = None
+    key_skills: List[str] = []
+
+
+class VacancySearchResponse(BaseModel):
+    """Страница результатов полнотекстового поиска"""
+
+    items: List[VacancySearchHit]
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы (None - страниц больше нет)")
+
+
+class SalaryTrendPoint(BaseModel):
+    """Агрегаты зарплат одного сбора"""
+
+    collection_id: int
+    collected_at: datetime
+    count: int = Field(..., ge=0)
+    avg_from: float
+    avg_to: float
+    avg_middle: float
+    p10: float
+    p25: float
+    p50: float = Field(..., description="Медиана")
+    p75: float
+    p90: float
+    p50_change_pct: Optional[float] = Field(None, description="Изменение медианы к предыдущему сбору, %")
+
+
+class SalaryTrendResponse(BaseModel):
+    """Динамика зарплат по сборам"""
+
+    professional_role: Optional[str] = Field(None, description="Роль (None - все роли)")
+    experience_id: Optional[str] = Field(None, description="Опыт (None - любой)")
+    currency: str
+    points: List[SalaryTrendPoint]
@@ -0,0 +1,348 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional
+import numpy as np
+from api.services.vacancy_iter import load_vacancy_columns
+from api.services.salary_snapshot import SalarySnapshot, ValueDictionary, salary_snapshot
+from api.services.stats_cache import dataset_version
+
+logger = logging.getLogger(__name__)
+
+# До стольких значений счётчики плотного фильтра считаются пересечением битмапов
+SMALL_FACET_VALUES = 64
+
+
+def _popcount(words: np.ndarray) -> int:
+    if hasattr(np, "bitwise_count"):
+        return int(np.bitwise_count(words).sum())
+    return int(np.unpackbits(words.view(np.uint8)).sum())
+
+
+class Bitmap:
+    """
+    Сжатое множество номеров строк в духе Roaring.
+
+    Разреженные множества хранятся отсортированным массивом uint32,
+    плотные - битовой картой из uint64. Представление выбирается по тому,
+    что компактнее: массив выгоднее, пока элементов меньше size / 32.
+    """
+
+    __slots__ = ("size", "rows", "words")
+
+    def __init__(self, size: int, rows: Optional[np.ndarray] = None, words: Optional[np.ndarray] = None):
+        self.size = size
+        self.rows = rows
+        self.words = words
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray, size: int) -> "Bitmap":
+        rows = np.asarray(rows, dtype=np.uint32)
+        if len(rows) * 32 < size:
+            return cls(size, rows=rows)
+        return cls(size, words=cls._rows_to_words(rows, size))
+
+    @classmethod
+    def from_mask(cls, mask: np.ndarray) -> "Bitmap":
+        return cls.from_rows(np.flatnonzero(mask), len(mask))
+
+    @classmethod
+    def full(cls, size: int) -> "Bitmap":
+        return cls.from_mask(np.ones(size, dtype=bool))
+
+    @staticmethod
+    def _rows_to_words(rows: np.ndarray, size: int) -> np.ndarray:
+        mask = np.zeros((size + 63) // 64 * 64, dtype=bool)
+        mask[rows] = True
+        return np.packbits(mask, bitorder="little").view(np.uint64)
+
+    def _as_words(self) -> np.ndarray:
+        if self.words is None:
+            return self._rows_to_words(self.rows, self.size)
+        return self.words
+
+    def _contains(self, rows: np.ndarray) -> np.ndarray:
+        words = self._as_words()
+        return ((words[rows >> 6] >> (rows & 63).astype(np.uint64)) & np.uint64(1)).astype(bool)
+
+    def __and__(self, other: "Bitmap") -> "Bitmap":
+        if self.rows is not None and other.rows is not None:
+            return Bitmap(self.size, rows=np.intersect1d(self.rows, other.rows, assume_unique=True))
+        if self.rows is not None:
+            return Bitmap(self.size, rows=self.rows[other._contains(self.rows)])
+        if other.rows is not None:
+            return Bitmap(self.size, rows=other.rows[self._contains(other.rows)])
+        return Bitmap(self.size, words=self.words & other.words)
+
+    def __or__(self, other: "Bitmap") -> "Bitmap":
+        if self.rows is not None and other.rows is not None:
+            return Bitmap.from_rows(np.union1d(self.rows, other.rows), self.size)
+        return Bitmap(self.size, words=self._as_words() | other._as_words())
+
+    def __len__(self) -> int:
+        if self.rows is not None:
+            return len(self.rows)
+        return _popcount(self.words)
+
+    def to_rows(self) -> np.ndarray:
+        """Номера строк по возрастанию"""
+        if self.rows is not None:
+            return self.rows
+        bits = np.unpackbits(self.words.view(np.uint8), bitorder="little")[:self.size]
+        return np.flatnonzero(bits).astype(np.uint32)
+
+    def to_mask(self) -> np.ndarray:
+        if self.rows is not None:
+            mask = np.zeros(self.size, dtype=bool)
+            mask[self.rows] = True
+            return mask
+        return np.unpackbits(self.words.view(np.uint8), bitorder="little")[:self.size].astype(bool)
+
+
+class Facet:
+    """
+    Один фасет: словарь значений, битмап строк для каждого значения
+    и плоские массивы (строка, код) для подсчёта значений через bincount.
+    """
+
+    def __init__(self, name: str, size: int, values: ValueDictionary, labels: Dict[str, str],
+                 flat_rows: List[int], flat_codes: List[int]):
+        self.name = name
+        self.size = size
+        self.values = values
+        self.labels = labels
+
+        # Убираем повторы значения в одной вакансии (например, дубль навыка)
+        width = max(len(values.values), 1)
+        pairs = np.unique(np.asarray(flat_rows, dtype=np.int64) * width + np.asarray(flat_codes, dtype=np.int64))
+        self.flat_rows = pairs // width
+        self.flat_codes = pairs % width
+
+        order = np.argsort(self.flat_codes, kind="stable")
+        codes, rows = self.flat_codes[order], self.flat_rows[order]
+        bounds = np.searchsorted(codes, np.arange(len(values.values) + 1))
+        self.bitmaps = [
+            Bitmap.from_rows(rows[bounds[code]:bounds[code + 1]], size)
+            for code in range(len(values.values))
+        ]
+        self.totals = np.diff(bounds).astype(np.int64)
+        # Начало пар каждой строки в flat_rows/flat_codes (CSR)
+        self.row_offsets = np.searchsorted(self.flat_rows, np.arange(size + 1)).astype(
+            np.int32 if len(self.flat_rows) < 2 ** 31 else np.int64)
+
+    def select(self, selected: List[str], match_all: bool = False) -> Optional[Bitmap]:
+        """Битмап вакансий с любым (или со всеми) из выбранных значений"""
+        if not selected:
+            return None
+        result = None
+        for value in selected:
+            code = self.values.codes.get(value)
+            if code is not None:
+                bitmap = self.bitmaps[code]
+            else:
+                bitmap = Bitmap(self.size, rows=np.empty(0, dtype=np.uint32))
+            if result is None:
+                result = bitmap
+            else:
+                result = result & bitmap if match_all else result | bitmap
+        return result
+
+    def _codes_in(self, bitmap: Bitmap) -> np.ndarray:
+        """Коды значений всех вакансий битмапа (по коду на пару вакансия-значение)"""
+        # Пары отсортированы по строке - берём отрезки нужных строк без прохода по всем парам
+        rows = bitmap.to_rows()
+        starts = self.row_offsets[rows].astype(np.int64)
+        lengths = self.row_offsets[rows + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return np.empty(0, dtype=np.int64)
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.flat_codes[offsets + np.arange(total)]
+
+    def counts(self, bitmap: Optional[Bitmap], limit: int) -> List[Dict[str, Any]]:
+        """Счётчики значений среди вакансий битмапа (None - среди всех)"""
+        if bitmap is None:
+            counts = self.totals
+        elif bitmap.rows is None and len(self.bitmaps) <= SMALL_FACET_VALUES:
+            # Мало значений и плотный фильтр: пересечение слов и popcount на каждое значение
+            counts = np.asarray([len(value & bitmap) for value in self.bitmaps], dtype=np.int64)
+        else:
+            counts = np.bincount(self._codes_in(bitmap), minlength=len(self.values.values))
+        top = np.argsort(-counts, kind="stable")[:limit]
+        return [
+            {
+                "value": self.values.values[code],
+                "name": self.labels.get(self.values.values[code], self.values.values[code]),
+                "count": int(counts[code])
+            }
+            for code in top if counts[code] > 0
+        ]
+
+
+class FacetIndex:
+    """
+    Фасетный индекс вакансий: навыки, график, занятость, опыт, роли.
+    Зарплатные колонки не дублируются - берутся из SalarySnapshot той же версии,
+    строки индекса и снимка совпадают (обе выборки идут в порядке id).
+    """
+
+    fields = ("experience", "professional_roles", "key_skills", "schedule", "employment")
+
+    # Для навыков фильтр требует все выбранные значения, для остальных - любое
+    match_all = {"key_skills"}
+
+    def __init__(self, records: List[dict], salary: SalarySnapshot):
+        if len(records) != len(salary):
+            raise ValueError(f"Facet records ({len(records)}) do not match salary snapshot ({len(salary)})")
+        self.version = salary.version
+        self.size = len(records)
+        self.salary = salary
+        self._salary_order: Dict[str, tuple] = {}
+        self._currency_rows: Dict[str, Bitmap] = {}
+        self._full_summary: Dict[str, Dict[str, Any]] = {}
+
+        self.facets: Dict[str, Facet] = {}
+        for name, extract in (
+                ("key_skills", lambda r: [(s, s) for s in r.get("key_skills") or [] if s]),
+                ("schedule", lambda r: self._id_name(r.get("schedule"))),
+                ("employment", lambda r: self._id_name(r.get("employment"))),
+                ("experience", lambda r: self._id_name(r.get("experience"))),
+                ("professional_roles", lambda r: [(x.get("name"), x.get("name"))
+                                                  for x in r.get("professional_roles") or [] if x.get("name")]),
+        ):
+            self.facets[name] = self._build_facet(name, records, extract)
+
+    @staticmethod
+    def _id_name(value: Optional[dict]) -> list:
+        if value and value.get("id"):
+            return [(value["id"], value.get("name", value["id"]))]
+        return []
+
+    def _build_facet(self, name: str, records: Iterable[dict], extract) -> Facet:
+        values = ValueDictionary()
+        labels = {}
+        flat_rows, flat_codes = [], []
+        for row, record in enumerate(records):
+            for value, label in extract(record):
+                flat_rows.append(row)
+                flat_codes.append(values.encode(value))
+                labels[value] = label
+        return Facet(name, self.size, values, labels, flat_rows, flat_codes)
+
+    def _currency_bitmap(self, currency: str) -> Bitmap:
+        bitmap = self._currency_rows.get(currency)
+        if bitmap is None:
+            bitmap = Bitmap.from_mask(self.salary.currency_mask(currency))
+            self._currency_rows[currency] = bitmap
+        return bitmap
+
+    def _salary_bitmap(self, currency: str, salary_min: Optional[float],
+                       salary_max: Optional[float]) -> Optional[Bitmap]:
+        """Вакансии с зарплатой в диапазоне: бинарный поиск по заранее отсортированным зарплатам валюты"""
+        if salary_min is None and salary_max is None:
+            return None
+        order = self._salary_order.get(currency)
+        if order is None:
+            rows = self._currency_bitmap(currency).to_rows()
+            rows = rows[~np.isnan(self.salary.salary_mid[rows])]
+            by_salary = np.argsort(self.salary.salary_mid[rows], kind="stable")
+            order = (self.salary.salary_mid[rows][by_salary], rows[by_salary])
+            self._salary_order[currency] = order
+        middles, rows = order
+        left = np.searchsorted(middles, salary_min, side="left") if salary_min is not None else 0
+        right = np.searchsorted(middles, salary_max, side="right") if salary_max is not None else len(middles)
+        return Bitmap.from_rows(np.sort(rows[left:right]), self.size)
+
+    def query(
+            self,
+            filters: Dict[str, List[str]],
+            salary_min: Optional[float] = None,
+            salary_max: Optional[float] = None,
+            currency: str = "RUR",
+            facet_limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Пересечение фасетных фильтров, счётчики по значениям фасетов и
+        средние зарплаты по найденным вакансиям.
+
+        Счётчики фасета считаются без учёта фильтра по самому фасету, чтобы
+        было видно, сколько вакансий добавит выбор ещё одного значения.
+        Всё считается на битмапах: время зависит от числа найденных вакансий,
+        а не от размера индекса.
+        """
+        selections = {
+            name: self.facets[name].select(filters.get(name) or [], name in self.match_all)
+            for name in self.facets
+        }
+        salary_bitmap = self._salary_bitmap(currency, salary_min, salary_max)
+
+        def combine(exclude: Optional[str] = None) -> Optional[Bitmap]:
+            """None - фильтров нет, подходят все вакансии"""
+            result = salary_bitmap
+            for name, bitmap in selections.items():
+                if bitmap is None or name == exclude:
+                    continue
+                result = bitmap if result is None else result & bitmap
+            return result
+
+        matched = combine()
+
+        facets = {}
+        for name, facet in self.facets.items():
+            facet_bitmap = matched if selections[name] is None else combine(exclude=name)
+            facets[name] = facet.counts(facet_bitmap, facet_limit)
+
+        return {
+            "total": len(matched) if matched is not None else self.size,
+            "salary": self._salary_summary(matched, currency),
+            "facets": facets,
+        }
+
+    def _salary_summary(self, matched: Optional[Bitmap], currency: str) -> Dict[str, Any]:
+        currency_rows = self._currency_bitmap(currency)
+        if matched is not None:
+            return self.salary.summarize((matched & currency_rows).to_rows(), currency)
+        # Без фильтров сводка по валюте одна и та же - считаем её один раз
+        summary = self._full_summary.get(currency)
+        if summary is None:
+            summary = self.salary.summarize(currency_rows.to_rows(), currency)
+            self._full_summary[currency] = summary
+        return summary
+
+
+class FacetIndexHolder:
+    """Держит актуальный фасетный индекс и атомарно подменяет его после загрузки"""
+
+    def __init__(self):
+        self.current: Optional[FacetIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def _build(self) -> FacetIndex:
+        salary = await salary_snapshot.get()
+        records = await load_vacancy_columns(FacetIndex.fields)
+        if len(records) != len(salary):
+            # Данные изменились между выборками - снимок пересобирается по текущим
+            salary = await salary_snapshot.rebuild()
+            records = await load_vacancy_columns(FacetIndex.fields)
+        index = await asyncio.to_thread(FacetIndex, records, salary)
+        self.current = index
+        logger.info(f"Facet index built: {index.size} vacancies, version {index.version}")
+        return index
+
+    async def rebuild(self) -> FacetIndex:
+        async with self._lock:
+            return await self._build()
+
+    async def get(self) -> FacetIndex:
+        await dataset_version.refresh()
+        index = self.current
+        if index is not None and index.version == dataset_version.current:
+            return index
+
+        async with self._lock:
+            index = self.current
+            if index is None or index.version != dataset_version.current:
+                index = await self._build()
+            return index
+
+
+facet_index = FacetIndexHolder()
@@ -0,0 +1,170 @@
+import json
+import re
+from typing import Any, List, Tuple
+
+WHITESPACE = " \t\r\n"
+SCALAR_START = "-0123456789tfn"
+CLOSING = {"}": "{", "]": "["}
+
+# Висячая запятая перед закрывающей скобкой - частая ошибка моделей, исправляем её
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+class MalformedJSONError(ValueError):
+    """Поток не может быть корректным JSON-объектом - генерацию дальше ждать бессмысленно"""
+
+
+class StreamingJSONParser:
+    """
+    Инкрементальный разбор JSON-объекта, приходящего кусками из стрима LLM.
+    feed() возвращает пары (ключ, значение) верхнего уровня, завершённые в этом куске.
+    Текст до первой "{" (markdown, пояснения) и после закрывающей "}" игнорируется,
+    переводы строк внутри строк и висячие запятые допускаются. Любая другая
+    структурная ошибка сразу поднимает MalformedJSONError.
+    """
+
+    def __init__(self):
+        self.result = {}
+        self.done = False
+        self.position = 0
+        self._state = "start"
+        self._key = None
+        self._token: List[str] = []
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        completed = []
+        for char in chunk:
+            self.position += 1
+            pair = self._consume(char)
+            if pair is not None:
+                completed.append(pair)
+        return completed
+
+    def _error(self, message: str, char: str):
+        raise MalformedJSONError(f"{message}, got {char!r} at position {self.position}")
+
+    def _string_char(self, char: str) -> bool:
+        """Учитывает экранирование; True - строка закрылась этим символом"""
+        if self._escape:
+            self._escape = False
+        elif char == "\\":
+            self._escape = True
+        elif char == '"':
+            return True
+        return False
+
+    def _consume(self, char: str):
+        state = self._state
+
+        if state == "start":
+            if char == "{":
+                self._state = "key"
+            return None
+
+        if state == "end":
+            return None
+
+        if state == "key":
+            if char in WHITESPACE:
+                return None
+            if char == '"':
+                self._token = []
+                self._state = "key_string"
+            elif char == "}":
+                self._finish_object()
+            else:
+                self._error("Expected a quoted key", char)
+            return None
+
+        if state == "key_string":
+            if self._string_char(char):
+                self._key = self._decode('"' + "".join(self._token) + '"')
+                self._state = "colon"
+            else:
+                self._token.append(char)
+            return None
+
+        if state == "colon":
+            if char == ":":
+                self._state = "value"
+            elif char not in WHITESPACE:
+                self._error("Expected ':' after key", char)
+            return None
+
+        if state == "value":
+            if char in WHITESPACE:
+                return None
+            self._token = [char]
+            if char in "{[":
+                self._stack = [char]
+                self._state = "container"
+            elif char == '"':
+                self._state = "string"
+            elif char in SCALAR_START:
+                self._state = "scalar"
+            else:
+                self._error("Expected a value", char)
+            return None
+
+        if state == "string":
+            self._token.append(char)
+            if self._string_char(char):
+                return self._finish_value()
+            return None
+
+        if state == "container":
+            self._token.append(char)
+            if self._in_string:
+                if self._string_char(char):
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._stack.append(char)
+            elif char in CLOSING:
+                if self._stack.pop() != CLOSING[char]:
+                    self._error("Mismatched bracket", char)
+                if not self._stack:
+                    return self._finish_value()
+            return None
+
+        if state == "scalar":
+            if char in WHITESPACE or char in ",}":
+                pair = self._finish_value()
+                self._consume(char)
+                return pair
+            self._token.append(char)
+            return None
+
+        # state == "comma"
+        if char == ",":
+            self._state = "key"
+        elif char == "}":
+            self._finish_object()
+        elif char not in WHITESPACE:
+            self._error("Expected ',' or '}'", char)
+        return None
+
+    def _decode(self, text: str) -> Any:
+        try:
+            return json.loads(text, strict=False)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(TRAILING_COMMA.sub(r"\1", text), strict=False)
+        except json.JSONDecodeError as e:
+            raise MalformedJSONError(f"Invalid value for key {self._key!r}: {e.msg}") from None
+
+    def _finish_value(self) -> Tuple[str, Any]:
+        value = self._decode("".join(self._token))
+        self._token = []
+        self.result[self._key] = value
+        self._state = "comma"
+        return self._key, value
+
+    def _finish_object(self) -> None:
+        self._state = "end"
+        self.done = True
@@ -1,52 +1,184 @@
-from ollama import AsyncClient
 from settings.settings import settings
+from api.services.profession_catalog import profession_catalog, stem_text
+from api.services.skill_index import skill_index
+from api.services.profile_cache import profile_cache
+from api.services.semantic_cache import SemanticCache
+from api.services.llm_scheduler import Priority, llm_scheduler
+from api.services.ollama_pool import OllamaBackend, OllamaPool
+from api.services.single_flight import llm_single_flight
+from api.services.json_stream import MalformedJSONError, StreamingJSONParser
+from api.services.profile_schema import (
+    PARALLEL_SECTION_GROUPS,
+    PROFILE_MIN_ITEMS,
+    SECTION_INSTRUCTIONS,
+    profile_json_schema,
+    profile_sections,
+    section_json_schema,
+    section_problem,
+    sections_json_schema,
+    valid_items,
+)
+import asyncio
 import json
 import re
+import time
 import logging
+from contextlib import asynccontextmanager
 
 logger = logging.getLogger(__name__)
 
+# Версия промпта профиля - входит в ключ кэша, увеличивайте при любом изменении промпта
+PROFILE_PROMPT_VERSION = "3"
+
+# Сколько раз генерация профиля перезапускается при битом JSON
+PROFILE_MAX_ATTEMPTS = 2
+
+# Лимит токенов на группу разделов в параллельном режиме
+PARALLEL_NUM_PREDICT = 1536
+
+
+class DialogueContext:
+    """
+    Токены контекста Ollama для диалога одной сессии (хранятся в Session.llm_context).
+    Следующий этап продолжает генерацию с них вместо повторной обработки всего
+    контекста. Если этап ответил из кэша, токены сбрасываются - следующий
+    этап отправит полный промпт.
+
+    Используется только между уточняющими вопросами о профессии
+    (generate_profession_detail_question): второй вопрос досылает к контексту
+    первого один ответ пользователя. Вопрос про вайб, профиль и перевод контекст
+    не получают: профиль генерируется параллельными запросами по группам разделов,
+    и у каждого было бы своё продолжение, а их промпты начинаются со статических
+    инструкций, которые Ollama и так берёт из кэша префиксов при закреплённом keep_alive.
+    При переходе к вопросу про вайб Session.llm_context очищается.
+    """
+
+    def __init__(self, tokens: list = None):
+        self.tokens = tokens or None
+
+    def reset(self) -> None:
+        self.tokens = None
+
 
 class OllamaService:
-    """Сервис для работы с Ollama через AsyncClient"""
+    """Сервис для работы с Ollama через пул серверов (OLLAMA_URL - один или несколько через запятую)"""
 
     def __init__(self):
-        self.client = AsyncClient(host=settings.ollama_url)
+        self.pool = OllamaPool(
+            settings.ollama_urls,
+            max_concurrency=settings.llm_max_concurrency,
+            failure_threshold=settings.ollama_failure_threshold,
+            eject_seconds=settings.ollama_eject_seconds,
+            health_interval=settings.ollama_health_interval,
+            # Слоты считаются по серверам - планировщик только раздаёт освободившиеся
+            on_capacity_change=llm_scheduler.resize
+        )
         self.model = settings.ollama_model
+        # Ответы на вопросы о профессии почти не зависят от формулировки - кэшируем по смыслу
+        self.semantic_caches = {
+            name: SemanticCache(
+                name,
+                embed=self._embed,
+                threshold=settings.semantic_cache_threshold,
+                max_entries=settings.semantic_cache_max_entries
+            )
+            for name in ("profession_reality", "detail_question", "vibe_question")
+        }
+
+    @asynccontextmanager
+    async def _client(self, priority: Priority, model: str = None, backend: OllamaBackend = None):
+        """Клиент сервера пула на время блока: слот на сервере выдаёт планировщик с приоритетом priority"""
+        model = model or self.model
+        async with llm_scheduler.slot(priority, lambda: self.pool.acquire(model, backend), self.pool.release) \
+                as chosen, self.pool.client(chosen, model) as client:
+            yield client
+
+    async def _embed(self, text: str) -> list:
+        """Эмбеддинг текста локальной моделью Ollama - фоновым приоритетом, без обгона генераций"""
+        async with self._client(Priority.BATCH, settings.ollama_embed_model) as client:
+            response = await client.embeddings(
+                model=settings.ollama_embed_model,
+                prompt=text,
+                keep_alive=settings.ollama_keep_alive
+            )
+        return response['embedding']
 
     async def _generate(
             self,
             prompt: str,
             temperature: float = None,
             num_predict: int = None,
-            stream: bool = False
+            stream: bool = False,
+            format: dict = None,
+            dialogue: "DialogueContext" = None,
+            priority: Priority = Priority.INTERACTIVE
+    ) -> str:
+        """
+        Базовая генерация текста (format - JSON-схема ответа, если нужен структурированный вывод).
+        dialogue - контекст сессии: генерация продолжается с его токенов, и он обновляется ответом.
+        Запрос ждёт слот планировщика с приоритетом priority. Одинаковые одновременные
+        запросы (модель, промпт, параметры, контекст) выполняются один раз.
+        """
+        tokens = dialogue.tokens if dialogue else None
+
+        async def generate() -> dict:
+            continuation = DialogueContext(tokens) if dialogue else None
+            async with self._client(priority) as client:
+                text = await self._generate_on(client, prompt, temperature, num_predict, stream, format, continuation)
+            return {"text": text, "context": continuation.tokens if continuation else None}
+
+        key = llm_single_flight.make_key(self.model, prompt, temperature, num_predict, format,
+                                         dialogue is not None, tokens)
+        result = await llm_single_flight.do(key, generate)
+        if dialogue:
+            dialogue.tokens = result["context"]
+        return result["text"]
+
+    async def _generate_on(
+            self,
+            client,
+            prompt: str,
+            temperature: float,
+            num_predict: int,
+            stream: bool,
+            format: dict,
+            dialogue: "DialogueContext"
     ) -> str:
-        """Базовая генерация текста"""
         options = {
             'temperature': temperature or settings.ollama_temperature,
             'num_predict': num_predict or settings.ollama_num_predict,
         }
 
         if stream:
-            response = await self.client.generate(
+            response = await client.generate(
                 model=self.model,
                 prompt=prompt,
                 options=options,
+                format=format or '',
+                context=dialogue.tokens if dialogue else None,
+                keep_alive=settings.ollama_keep_alive,
                 stream=True
             )
 
             full_text = ''
             async for chunk in response:
                 full_text += chunk.get('response', '')
+                if dialogue and chunk.get('done'):
+                    dialogue.tokens = chunk.get('context')
 
             return full_text
         else:
-            response = await self.client.generate(
+            response = await client.generate(
                 model=self.model,
                 prompt=prompt,
                 options=options,
+                format=format or '',
+                context=dialogue.tokens if dialogue else None,
+                keep_alive=settings.ollama_keep_alive,
                 stream=False
             )
+            if dialogue:
+                dialogue.tokens = response.get('context')
             return response['response']
 
     def _extract_json(self, text: str) -> dict:
@@ -72,6 +204,87 @@ class OllamaService:
             logger.error(f"JSON parse error at position {e.pos}:\n{json_str[max(0, e.pos - 50):e.pos + 50]}")
             raise ValueError(f"Invalid JSON: {e.msg}")
 
+    async def _stream_json(
+            self,
+            prompt: str,
+            options: dict,
+            format: dict = None,
+            progress_callback=None,
+            section_callback=None,
+            max_attempts: int = PROFILE_MAX_ATTEMPTS,
+            allow_partial: bool = False,
+            priority: Priority = Priority.PROFILE
+    ) -> dict:
+        """
+        Стриминговая генерация JSON-объекта: ключи верхнего уровня разбираются по мере
+        генерации. При синтаксической ошибке поток обрывается сразу и генерация
+        начинается заново, не дожидаясь оставшихся токенов. После повтора
+        section_callback получает разделы ещё раз - клиент заменяет их по ключу.
+        allow_partial - вместо ошибки вернуть уже разобранные разделы, если объект
+        оборвался или последняя попытка сломалась (недостающее дозаполнит вызывающий).
+        """
+        for attempt in range(1, max_attempts + 1):
+            parser = StreamingJSONParser()
+            full_text = ''
+            last_update = time.time()
+            update_interval = 1.0
+
+            async with self._client(priority) as client:
+                response = await client.generate(
+                    model=self.model,
+                    prompt=prompt,
+                    options=options,
+                    format=format or '',
+                    keep_alive=settings.ollama_keep_alive,
+                    stream=True
+                )
+                try:
+                    async for chunk in response:
+                        new_text = chunk.get('response', '')
+                        full_text += new_text
+
+                        for key, value in parser.feed(new_text):
+                            if section_callback:
+                                await section_callback(key, value)
+                        if parser.done:
+                            # Всё после закрывающей скобки модели не нужно
+                            break
+
+                        current_time = time.time()
+                        if progress_callback and current_time - last_update >= update_interval:
+                            await progress_callback(full_text)
+                            last_update = current_time
+                except MalformedJSONError as e:
+                    logger.warning(f"Malformed JSON after {len(full_text)} chars "
+                                   f"(attempt {attempt}/{max_attempts}): {e}")
+                    if attempt == max_attempts:
+                        if allow_partial:
+                            return parser.result
+                        raise
+                    continue
+                finally:
+                    # Закрытие стрима обрывает соединение - Ollama прекращает генерацию
+                    await response.aclose()
+
+            if parser.done:
+                return parser.result
+
+            logger.warning(f"Model output ended before JSON was closed "
+                           f"(attempt {attempt}/{max_attempts}, {len(full_text)} chars)")
+            if allow_partial:
+                return parser.result
+            if attempt == max_attempts:
+                raise ValueError("Incomplete JSON in model response")
+
+    async def _match_catalog(self, user_message: str) -> dict | None:
+        """Поиск профессии в локальном каталоге (None, если каталог недоступен)"""
+        try:
+            matcher = await profession_catalog.get()
+        except Exception as e:
+            logger.warning(f"Profession catalog unavailable: {e}")
+            return None
+        return matcher.match(user_message)
+
     async def check_profession_reality(self, user_message: str) -> dict:
         """
         Проверяет реальность профессии и возвращает:
@@ -80,12 +293,42 @@ class OllamaService:
             "profession_name": "Название профессии" или null,
             "alternatives": ["Профессия 1", "Профессия 2", "Профессия 3"] или null
         }
+        Сначала ищет в каталоге профессий hh.ru, LLM вызывается только если
+        уверенного совпадения нет.
         """
-        prompt = f"""Ты - эксперт по профессиям в любых сферах деятельности.
+        catalog_match = await self._match_catalog(user_message)
+        if catalog_match:
+            if catalog_match['status'] in ('exact', 'fuzzy'):
+                logger.info(f"Profession resolved by catalog ({catalog_match['status']}): "
+                            f"{catalog_match['profession_name']}")
+                return {
+                    "is_real": True,
+                    "profession_name": catalog_match['profession_name'],
+                    "alternatives": None
+                }
+            if catalog_match['status'] == 'near':
+                return {
+                    "is_real": False,
+                    "profession_name": None,
+                    "alternatives": catalog_match['alternatives'][:3]
+                }
+
+        # Похожая формулировка годится, только если в ней те же слова, что в найденной профессии:
+        # иначе ответ для "пилот" вернулся бы на "пилот дронов". Ответ с альтернативами
+        # относится к конкретному сообщению и по смыслу не переиспользуется
+        message_words = set(stem_text(user_message).split())
+        cache = self.semantic_caches["profession_reality"]
+        cached, embedding = await cache.get(
+            user_message,
+            accept=lambda value: bool(value.get("is_real") and value.get("profession_name"))
+                                 and set(stem_text(value["profession_name"]).split()) == message_words
+        )
+        if cached is not None:
+            return cached
 
-Пользователь написал: "{user_message}"
+        prompt = f"""Ты - эксперт по профессиям в любых сферах деятельности.
 
-Определи:
+По сообщению пользователя определи:
 1. Это реальная профессия? (да/нет)
 2. Если да - как она точно называется?
 3. Если нет - предложи 3 похожие реальные профессии
@@ -104,6 +347,8 @@ class OllamaService:
     "alternatives": ["Профессия 1", "Профессия 2", "Профессия 3"]
 }}
 
+Пользователь написал: "{user_message}"
+
 Ответ (только JSON):"""
 
         response = await self._generate(
@@ -113,14 +358,23 @@ class OllamaService:
             stream=False
         )
 
-        return self._extract_json(response)
+        result = self._extract_json(response)
+
+        # Реальные профессии из каталога надёжнее придуманных моделью
+        if catalog_match and not result.get('is_real') and catalog_match['alternatives']:
+            alternatives = catalog_match['alternatives'] + (result.get('alternatives') or [])
+            result['alternatives'] = list(dict.fromkeys(alternatives))[:3]
+
+        await cache.set(user_message, result, embedding)
+        return result
 
     async def generate_profession_detail_question(
             self,
             profession_name: str,
             question_number: int,
             initial_context: str = "",
-            previous_qa: list = None
+            previous_qa: list = None,
+            dialogue: DialogueContext = None
     ) -> str:
         """
         Генерирует уточняющий вопрос о профессии (до 2 вопросов)
@@ -141,11 +395,38 @@ class OllamaService:
 
         context_block = "\n\n".join(context_parts) if context_parts else "Контекст отсутствует."
 
-        prompt = f"""Ты помогаешь студентам и начинающим специалистам понять, как "ощущается" работа в профессии "{profession_name}".
+        # Профессия и номер вопроса - точная часть ключа, по смыслу сравниваются только
+        # исходный запрос и ответы. Тексты прошлых вопросов в ключ не входят: модель
+        # каждый раз формулирует их по-разному
+        partition = (profession_name, question_number)
+        cache_text = " | ".join([
+            initial_context or "",
+            *[qa['answer'] for qa in previous_qa or [] if qa.get('answer')]
+        ])
+        cache = self.semantic_caches["detail_question"]
+        cached, embedding = await cache.get(cache_text, partition)
+        if cached is not None:
+            if dialogue:
+                dialogue.reset()
+            return cached
+
+        answers = [qa['answer'] for qa in previous_qa or [] if qa.get('answer')]
+        if dialogue and dialogue.tokens and answers:
+            # Правила и прошлый вопрос уже в контексте диалога - досылаем только ответ
+            response = await self._generate(
+                f'Ответ пользователя: "{answers[-1]}"\n\n'
+                f'Задай вопрос #{question_number} по тем же правилам - о том, что ещё НЕ выяснено.\n\n'
+                f'Твой вопрос:',
+                temperature=0.1,
+                num_predict=200,
+                stream=False,
+                dialogue=dialogue
+            )
+            question = response.strip().strip('"\'')
+            await cache.set(cache_text, question, embedding, partition)
+            return question
 
-    {context_block}
-
-    Это вопрос #{question_number} из максимум 2.
+        prompt = f"""Ты помогаешь студентам и начинающим специалистам понять, как "ощущается" работа в профессии.
 
     ВАЖНО: Твоя цель — понять АТМОСФЕРУ и БУДНИ, а не технические детали.
 
@@ -173,23 +454,35 @@ class OllamaService:
     - "Какой уровень опыта вас интересует? (Junior / Middle / Senior / Team Lead)"
     - "Какое направление ближе? (Продуктовая аналитика / Маркетинговая / Финансовая)"
 
+    Профессия: "{profession_name}"
+
+    {context_block}
+
+    Это вопрос #{question_number} из максимум 2.
+
     Твой вопрос:"""
 
         response = await self._generate(
             prompt,
             temperature=0.1,
             num_predict=200,
-            stream=False
+            stream=False,
+            dialogue=dialogue
         )
-        return response.strip().strip('"\'')
+        question = response.strip().strip('"\'')
+        await cache.set(cache_text, question, embedding, partition)
+        return question
 
     async def generate_vibe_question(self, profession_context: str) -> str:
         """
         Генерирует финальный вопрос про "вайб" работы
         """
-        prompt = f"""Контекст профессии: "{profession_context}"
+        cache = self.semantic_caches["vibe_question"]
+        cached, embedding = await cache.get(profession_context)
+        if cached is not None:
+            return cached
 
-Задай ОДИН вопрос (до 15 слов) про общую атмосферу и стиль работы - нужно спросить пожелание пользователя.
+        prompt = f"""Задай ОДИН вопрос (до 15 слов) про общую атмосферу и стиль работы - нужно спросить пожелание пользователя.
 
 Примеры хороших вопросов:
 - "Больше креатива или рутины?"
@@ -199,6 +492,8 @@ class OllamaService:
 - "Стабильность или постоянные изменения?"
 - "Следование протоколам или свобода действий?"
 
+Контекст профессии: "{profession_context}"
+
 Ответь ТОЛЬКО текстом вопроса без кавычек."""
 
         response = await self._generate(
@@ -207,33 +502,56 @@ class OllamaService:
             num_predict=50,
             stream=False
         )
-        return response.strip().strip('"\'')
+        question = response.strip().strip('"\'')
+        await cache.set(profession_context, question, embedding)
+        return question
+
+    async def _market_skills(self, profession_name: str, limit: int = 10) -> list:
+        """Топ навыков роли из индекса вакансий (пустой список, если роли нет в данных)"""
+        try:
+            index = await skill_index.get()
+        except Exception as e:
+            logger.warning(f"Skill index unavailable: {e}")
+            return []
+        return [item['skill'] for item in index.top_skills(profession_name, limit=limit)]
 
     async def generate_profile(
             self,
             profession_name: str,
             clarification_history: list,
             vibe_answer: str,
-            progress_callback=None
+            progress_callback=None,
+            section_callback=None
     ) -> dict:
         """
-        Генерация карьерного профиля с фокусом на ОЩУЩЕНИЕ работы
+        Генерация карьерного профиля с фокусом на ОЩУЩЕНИЕ работы.
+        Повторные сочетания профессии и ответов берутся из кэша профилей.
+        progress_callback(text) вызывается раз в секунду с уже сгенерированным текстом,
+        section_callback(key, value) - как только раздел профиля сгенерирован целиком.
         """
+        cache_key = profile_cache.make_key(profession_name, clarification_history, vibe_answer,
+                                           PROFILE_PROMPT_VERSION)
+        cached = await profile_cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"Profile cache hit for '{profession_name}'")
+            return cached
+
         context_parts = [f"Q: {item['question']}\nA: {item['answer']}"
                          for item in clarification_history]
         context = "\n\n".join(context_parts)
 
+        market_skills = await self._market_skills(profession_name)
+        skills_block = ""
+        if market_skills:
+            skills_block = (
+                "\n    Навыки, которые чаще всего требуют в реальных вакансиях hh.ru "
+                f"(опирайся на них в tech_stack): {', '.join(market_skills)}\n"
+            )
+
         prompt = f"""Ты создаёшь ЖИВОЕ описание профессии для студентов и начинающих специалистов.
 
     Твоя цель: передать **ОЩУЩЕНИЕ** работы, а не сухие факты из должностной инструкции.
 
-    Профессия: "{profession_name}"
-
-    Контекст:
-    {context}
-
-    Общий вайб: "{vibe_answer}"
-
     ---
 
     Создай профиль в JSON:
@@ -347,7 +665,7 @@ class OllamaService:
        - Хорошо: "MacBook Pro с наклейками, второй монитор 27', стол у окна с видом на город" ✅
 
     6. **chat_examples** — РЕАЛЬНЫЕ диалоги из рабочих чатов (Slack, Telegram, Teams):
-       - Должно быть 2 примера
+       - Должно быть 5 примеров
        - Покажи разнообразие ситуаций: срочный баг, обычная задача, обсуждение решения, помощь коллеге, обсуждение архитектуры
        - Используй живой язык
        - Примеры:
@@ -361,77 +679,143 @@ class OllamaService:
          - **Ты:** "Ого, сейчас гляну. А в консоли браузера что-то есть? Можешь скрин кинуть?"
          - **Вайб:** "Обычный баг-репорт, но приятно, что QA тестирует тщательно" ✅
 
+    ---
+
+    Профессия: "{profession_name}"
+
+    Контекст:
+    {context}
+
+    Общий вайб: "{vibe_answer}"
+{skills_block}
     Верни ТОЛЬКО JSON без markdown блоков и пояснений."""
 
-        # Генерация со стримингом и прогрессом
-        if progress_callback:
-            response = await self.client.generate(
-                model=self.model,
-                prompt=prompt,
+        header = (f'Профессия: "{profession_name}"\n\nКонтекст:\n{context}\n\n'
+                  f'Общий вайб: "{vibe_answer}"\n{skills_block.strip()}')
+
+        if settings.profile_generation_mode == 'parallel':
+            data = await self._generate_profile_parallel(header, progress_callback, section_callback)
+        else:
+            # Генерация со стримингом: разделы разбираются по ходу, битый JSON перегенерируется
+            data = await self._stream_json(
+                prompt,
                 options={
                     'temperature': 0.3,
                     'num_predict': 3072
                 },
-                stream=True
+                format=profile_json_schema(),
+                progress_callback=progress_callback,
+                section_callback=section_callback,
+                allow_partial=True
             )
 
-            full_text = ''
-            import time
-            last_update = time.time()
-            update_interval = 1.0
+        # Схема ограничивает генерацию, но модель может не дописать раздел - чиним только его
+        data = await self._repair_profile(data, header, section_callback)
 
-            async for chunk in response:
-                new_text = chunk.get('response', '')
-                full_text += new_text
+        # Проверяем формат balance_score
+        if not re.match(r'^\d+/\d+$', data['balance_score']):
+            logger.warning(f"Invalid balance_score format: {data['balance_score']}, fixing to 50/50")
+            data['balance_score'] = "50/50"
 
-                current_time = time.time()
-                if current_time - last_update >= update_interval:
-                    await progress_callback(full_text)
-                    last_update = current_time
-        else:
-            full_text = await self._generate(
-                prompt,
-                temperature=0.3,
-                num_predict=3072,
-                stream=False
-            )
+        await profile_cache.set(cache_key, profession_name, PROFILE_PROMPT_VERSION, data)
+        return data
 
-        # Извлекаем и валидируем JSON
-        data = self._extract_json(full_text)
+    async def _generate_section(self, section: str, header: str, current=None) -> object:
+        """
+        Генерирует один раздел профиля коротким промптом со схемой только этого раздела.
+        Для списков корректные элементы сохраняются, модель дописывает недостающие.
+        """
+        kept = valid_items(section, current) if isinstance(current, list) else []
+        missing = max(PROFILE_MIN_ITEMS.get(section, 1) - len(kept), 1) if kept else None
 
-        # Базовая валидация обязательных полей
-        required_fields = [
-            'position_title', 'sounds', 'career_growth', 'balance_score',
-            'benefit', 'typical_day', 'real_cases', 'tech_stack', 'visual'
-        ]
+        task = f'Раздел "{section}": {SECTION_INSTRUCTIONS[section]}'
+        if kept:
+            task += (f"\nУже есть (не повторяй их):\n{json.dumps(kept, ensure_ascii=False, indent=2)}"
+                     f"\nДобавь ещё {missing}.")
 
-        for field in required_fields:
-            if field not in data:
-                raise ValueError(f"Missing required field: {field}")
+        prompt = f"""Ты дополняешь ЖИВОЕ описание профессии для студентов и начинающих специалистов.
 
-        # Проверяем формат balance_score
-        if not re.match(r'^\d+/\d+$', data['balance_score']):
-            logger.warning(f"Invalid balance_score format: {data['balance_score']}, fixing to 50/50")
-            data['balance_score'] = "50/50"
+{task}
 
-        # Проверяем real_cases
-        if len(data['real_cases']) < 3:
-            raise ValueError(f"Need at least 3 real_cases, got {len(data['real_cases'])}")
+{header}
 
-        for case in data['real_cases']:
-            if 'title' not in case or 'description' not in case or 'difficulty' not in case:
-                raise ValueError("Invalid real_case structure")
+Верни ТОЛЬКО JSON с единственным ключом "{section}"."""
 
-        # Проверяем chat_examples
-        if len(data['chat_examples']) < 5:
-            raise ValueError(f"Need at least 5 chat_examples, got {len(data['chat_examples'])}")
+        response = await self._generate(
+            prompt,
+            temperature=0.3,
+            num_predict=1024,
+            stream=False,
+            format=section_json_schema(section, min_items=missing),
+            priority=Priority.PROFILE
+        )
+        value = self._extract_json(response).get(section)
+        return kept + valid_items(section, value) if kept else value
+
+    async def _generate_section_group(self, sections: tuple, header: str) -> dict:
+        """Генерирует группу разделов профиля отдельным запросом с общим заголовком контекста"""
+        tasks = "\n".join(f'- "{section}": {SECTION_INSTRUCTIONS[section]}' for section in sections)
+        prompt = f"""Ты создаёшь ЖИВОЕ описание профессии для студентов и начинающих специалистов.
 
-        for example in data['chat_examples']:
-            required_chat_fields = ['colleague', 'request', 'your_response', 'vibe']
-            for field in required_chat_fields:
-                if field not in example:
-                    raise ValueError(f"Invalid chat_example structure: missing '{field}'")
+Заполни разделы профиля:
+{tasks}
 
+{header}
+
+Верни ТОЛЬКО JSON с ключами: {", ".join(sections)}."""
+
+        response = await self._generate(
+            prompt,
+            temperature=0.3,
+            num_predict=PARALLEL_NUM_PREDICT,
+            stream=False,
+            format=sections_json_schema(sections),
+            priority=Priority.PROFILE
+        )
+        return self._extract_json(response)
+
+    async def _generate_profile_parallel(self, header: str, progress_callback=None, section_callback=None) -> dict:
+        """
+        Генерирует группы разделов одновременно и собирает их в один профиль.
+        Упавшая группа не роняет остальные - её разделы дозаполнит _repair_profile.
+        """
+        data = {}
+
+        async def generate(sections: tuple):
+            try:
+                result = await self._generate_section_group(sections, header)
+            except Exception as e:
+                logger.warning(f"Profile sections {sections} failed: {e}")
+                return
+            for section in sections:
+                if section in result:
+                    data[section] = result[section]
+                    if section_callback:
+                        await section_callback(section, result[section])
+            if progress_callback:
+                await progress_callback(json.dumps(data, ensure_ascii=False))
+
+        await asyncio.gather(*(generate(sections) for sections in PARALLEL_SECTION_GROUPS))
+        return data
+
+    async def _repair_profile(self, data: dict, header: str, section_callback=None) -> dict:
+        """Перегенерирует только разделы, не прошедшие проверку; остальной профиль сохраняется"""
+        for section in profile_sections():
+            if isinstance(data.get(section), list):
+                # Битые элементы списков отбрасываем - хватит ли оставшихся, решит проверка ниже
+                data[section] = valid_items(section, data[section])
+            problem = section_problem(section, data.get(section))
+            if problem is None:
+                continue
+
+            logger.warning(f"Profile section '{section}' is invalid ({problem}), regenerating it")
+            data[section] = await self._generate_section(section, header, data.get(section))
+
+            problem = section_problem(section, data[section])
+            if problem is not None:
+                raise ValueError(f"Invalid profile section '{section}': {problem}")
+            if section_callback:
+                await section_callback(section, data[section])
         return data
 
     async def translate_visual_to_english(self, visual_descriptions: list) -> list:
@@ -452,12 +836,25 @@ class OllamaService:
             prompt,
             temperature=0.1,
             num_predict=500,
-            stream=False
+            stream=False,
+            priority=Priority.PROFILE
         )
 
         print(response)
         return json.loads(response)
 
+    async def warmup(self) -> None:
+        """Загружает модель на всех серверах заранее - с самым низким приоритетом, чтобы не мешать пользователям"""
+        async def load(backend):
+            try:
+                async with self._client(Priority.BATCH, backend=backend) as client:
+                    await client.generate(model=self.model, prompt='', keep_alive=settings.ollama_keep_alive)
+                logger.info(f"Ollama model {self.model} is loaded on {backend.url}")
+            except Exception as e:
+                logger.warning(f"Ollama warmup failed on {backend.url}: {e}")
+
+        await asyncio.gather(*(load(backend) for backend in self.pool.backends))
+
     async def close(self):
         """Закрытие клиента"""
         pass
@@ -0,0 +1,152 @@
+import asyncio
+import itertools
+import math
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Tuple
+from settings.settings import settings
+
+
+class Priority(IntEnum):
+    """Классы запросов к LLM: меньше - важнее"""
+    INTERACTIVE = 0   # вопросы диалога, пользователь ждёт ответа
+    PROFILE = 1       # генерация профиля и всё, что к ней относится
+    BATCH = 2         # прогрев и фоновые задачи
+
+
+class LLMOverloadedError(Exception):
+    """Очередь к LLM переполнена - запрос отклонён сразу, а не ждёт неограниченно"""
+
+    def __init__(self, priority: Priority, retry_after: int):
+        super().__init__(f"LLM queue is full for {priority.name.lower()} requests, retry after {retry_after}s")
+        self.priority = priority
+        self.retry_after = retry_after
+
+
+class LLMScheduler:
+    """
+    Планировщик запросов к Ollama. Слоты принадлежат серверам: запрос занимает слот через
+    take() - он возвращает занятый ресурс (сервер) или None, если все подходящие серверы
+    заняты, - и возвращает его через give_back(). Освободившийся слот получает самый
+    приоритетный (затем самый ранний) ожидающий, которому подходит свободный сервер.
+    Запрос отклоняется, если перед ним (с тем же или более высоким приоритетом)
+    уже стоят max_queue запросов, - так срочные запросы не отбрасываются из-за фоновых.
+    """
+
+    # Вес последнего замера в скользящем среднем длительности
+    DURATION_SMOOTHING = 0.2
+
+    def __init__(self, capacity: int, max_queue: int):
+        # Всего слотов на здоровых серверах - для оценки Retry-After и решения о допуске
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.running = 0
+        self._waiters: List[Tuple[int, int, Callable[[], Any], asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._avg_duration = {priority: None for priority in Priority}
+        self.metrics = {
+            "completed": {priority.name.lower(): 0 for priority in Priority},
+            "rejected": {priority.name.lower(): 0 for priority in Priority},
+        }
+
+    def _queued(self, priority: Priority = None) -> int:
+        """Сколько ожидающих стоят впереди запроса с приоритетом priority (или всего)"""
+        return sum(1 for waiter_priority, _, _, future in self._waiters
+                   if not future.done() and (priority is None or waiter_priority <= priority))
+
+    def retry_after(self, priority: Priority) -> int:
+        """Оценка, через сколько секунд очередь перед запросом успеет разойтись"""
+        durations = [value for value in self._avg_duration.values() if value is not None]
+        average = self._avg_duration[priority] or (max(durations) if durations else 10.0)
+        return max(1, math.ceil((self._queued(priority) + 1) * average / max(self.capacity, 1)))
+
+    def check_admission(self, priority: Priority) -> None:
+        if self.running >= self.capacity and self._queued(priority) >= self.max_queue:
+            self.metrics["rejected"][priority.name.lower()] += 1
+            raise LLMOverloadedError(priority, self.retry_after(priority))
+
+    def resize(self, capacity: int) -> None:
+        """Серверы вышли из пула или вернулись в него - ожидающие пробуют занять слоты заново"""
+        self.capacity = capacity
+        self._wake()
+
+    def _wake(self) -> None:
+        """Раздаёт свободные слоты ожидающим по приоритету; кому не подошёл ни один сервер, ждёт дальше"""
+        for waiter in sorted(self._waiters):
+            _, _, take, future = waiter
+            # take() может сам вызвать resize (пробное возвращение сервера) и раздать слоты раньше
+            if future.done():
+                continue
+            resource = take()
+            if resource is not None:
+                self.running += 1
+                future.set_result(resource)
+        self._waiters = [waiter for waiter in self._waiters if not waiter[3].done()]
+
+    def _release(self, resource: Any, give_back: Callable[[Any], None]) -> None:
+        give_back(resource)
+        self.running -= 1
+        self._wake()
+
+    async def _acquire(self, priority: Priority, take: Callable[[], Any], give_back: Callable[[Any], None]) -> Any:
+        # Свободный слот не простаивает при ожидающих, которым он подходит (его раздаёт _wake),
+        # поэтому занятый ресурс можно брать сразу - очередь он не обгоняет
+        resource = take()
+        if resource is not None:
+            self.running += 1
+            return resource
+
+        self.check_admission(priority)
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((int(priority), next(self._sequence), take, future))
+        try:
+            return await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Слот уже был передан - возвращаем его следующему
+                self._release(future.result(), give_back)
+            raise
+
+    @asynccontextmanager
+    async def slot(
+            self,
+            priority: Priority,
+            take: Callable[[], Any],
+            give_back: Callable[[Any], None]
+    ):
+        """
+        Занимает слот на время блока и отдаёт ресурс, который вернул take()
+        (поднимает LLMOverloadedError при переполнении очереди)
+        """
+        resource = await self._acquire(priority, take, give_back)
+        started = time.monotonic()
+        try:
+            yield resource
+        finally:
+            duration = time.monotonic() - started
+            average = self._avg_duration[priority]
+            self._avg_duration[priority] = duration if average is None else (
+                average + self.DURATION_SMOOTHING * (duration - average)
+            )
+            self.metrics["completed"][priority.name.lower()] += 1
+            self._release(resource, give_back)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "capacity": self.capacity,
+            "max_queue": self.max_queue,
+            "queued": {priority.name.lower(): sum(1 for waiter_priority, _, _, future in self._waiters
+                                                  if waiter_priority == priority and not future.done())
+                       for priority in Priority},
+            "avg_duration_seconds": {priority.name.lower(): round(value, 3) if value is not None else None
+                                     for priority, value in self._avg_duration.items()},
+            **self.metrics,
+        }
+
+
+llm_scheduler = LLMScheduler(
+    capacity=settings.llm_max_concurrency * len(settings.ollama_urls),
+    max_queue=settings.llm_max_queue
+)
@@ -0,0 +1,188 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Set
+import httpx
+from ollama import AsyncClient, ResponseError
+
+logger = logging.getLogger(__name__)
+
+
+def _model_names(name: str) -> Set[str]:
+    """Ollama показывает модель без тега как name:latest"""
+    return {name, name if ":" in name else f"{name}:latest"}
+
+
+class OllamaBackend:
+    """Один сервер Ollama: клиент, занятые слоты и состояние здоровья"""
+
+    def __init__(self, url: str, max_concurrency: int):
+        self.url = url
+        self.client = AsyncClient(host=url)
+        self.max_concurrency = max_concurrency
+        self.outstanding = 0
+        self.healthy = True
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.models: Optional[Set[str]] = None  # None - список ещё не получен
+        self.last_error: Optional[str] = None
+
+    def has_model(self, model: str) -> bool:
+        return self.models is None or bool(self.models & _model_names(model))
+
+    def has_slot(self) -> bool:
+        return self.outstanding < self.max_concurrency
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "healthy": self.healthy,
+            "outstanding": self.outstanding,
+            "max_concurrency": self.max_concurrency,
+            "failures": self.failures,
+            "models": sorted(self.models) if self.models is not None else None,
+            "last_error": self.last_error,
+        }
+
+
+class OllamaPool:
+    """
+    Пул серверов Ollama с маршрутизацией на сервер с наименьшим числом запросов в работе.
+    У каждого сервера max_concurrency слотов; их занимает планировщик через acquire/release,
+    а on_capacity_change сообщает ему, что слотов стало больше или меньше.
+    Пассивная проверка: после failure_threshold ошибок подряд сервер выводится из пула
+    на eject_seconds. Активная: раз в health_interval секунд запрашивается список моделей -
+    успешный ответ возвращает сервер в пул и обновляет, какие модели на нём есть.
+    """
+
+    def __init__(self, urls: List[str], max_concurrency: int = 1, failure_threshold: int = 3,
+                 eject_seconds: float = 30, health_interval: float = 15,
+                 on_capacity_change: Callable[[int], None] = None):
+        if not urls:
+            raise ValueError("At least one Ollama URL is required")
+        self.backends = [OllamaBackend(url, max_concurrency) for url in urls]
+        self.failure_threshold = failure_threshold
+        self.eject_seconds = eject_seconds
+        self.health_interval = health_interval
+        self.on_capacity_change = on_capacity_change
+        self._health_task: Optional[asyncio.Task] = None
+
+    def healthy_count(self) -> int:
+        return sum(1 for backend in self.backends if backend.healthy)
+
+    def capacity(self) -> int:
+        """Слотов на здоровых серверах; если здоровых нет, запросы всё равно идут на один из серверов"""
+        healthy = [backend for backend in self.backends if backend.healthy]
+        return sum(backend.max_concurrency for backend in healthy or self.backends[:1])
+
+    def _capacity_changed(self) -> None:
+        if self.on_capacity_change:
+            self.on_capacity_change(self.capacity())
+
+    def _candidates(self, model: str) -> List[OllamaBackend]:
+        """Здоровые серверы с моделью; если таких нет - любые с моделью"""
+        now = time.monotonic()
+        for backend in self.backends:
+            if not backend.healthy and backend.ejected_until <= now and backend.failures:
+                # Срок исключения истёк - пробуем сервер одним запросом до следующей проверки
+                backend.failures = self.failure_threshold - 1
+                backend.healthy = True
+                self._capacity_changed()
+
+        candidates = [backend for backend in self.backends if backend.healthy and backend.has_model(model)]
+        if not candidates:
+            candidates = [backend for backend in self.backends if backend.has_model(model)] or self.backends
+        return candidates
+
+    def acquire(self, model: str, backend: OllamaBackend = None) -> Optional[OllamaBackend]:
+        """
+        Занимает слот на наименее загруженном подходящем сервере (или на заданном backend).
+
+        Returns:
+            сервер или None, если свободных слотов на подходящих серверах нет
+        """
+        candidates = [backend] if backend else self._candidates(model)
+        free = [candidate for candidate in candidates if candidate.has_slot()]
+        if not free:
+            return None
+        chosen = min(free, key=lambda candidate: candidate.outstanding)
+        chosen.outstanding += 1
+        return chosen
+
+    def release(self, backend: OllamaBackend) -> None:
+        backend.outstanding -= 1
+
+    def _is_backend_error(self, error: Exception) -> bool:
+        if isinstance(error, (httpx.TransportError, ConnectionError)):
+            return True
+        return isinstance(error, ResponseError) and error.status_code >= 500
+
+    def _record_failure(self, backend: OllamaBackend, error: Exception) -> None:
+        backend.failures += 1
+        backend.last_error = str(error)
+        if backend.healthy and backend.failures >= self.failure_threshold:
+            backend.healthy = False
+            backend.ejected_until = time.monotonic() + self.eject_seconds
+            logger.warning(f"Ollama backend {backend.url} ejected after {backend.failures} failures: {error}")
+            self._capacity_changed()
+
+    def _record_success(self, backend: OllamaBackend) -> None:
+        backend.failures = 0
+        if not backend.healthy:
+            backend.healthy = True
+            logger.info(f"Ollama backend {backend.url} reinstated")
+            self._capacity_changed()
+
+    @asynccontextmanager
+    async def client(self, backend: OllamaBackend, model: str):
+        """Клиент занятого через acquire сервера на время блока; ошибки сервера учитываются в его здоровье"""
+        try:
+            yield backend.client
+        except Exception as e:
+            if self._is_backend_error(e):
+                self._record_failure(backend, e)
+            elif isinstance(e, ResponseError) and e.status_code == 404 and backend.models is not None:
+                # Модель пропала с сервера - не отправляем туда её запросы до следующей проверки
+                backend.models -= _model_names(model)
+                self._capacity_changed()
+            raise
+        else:
+            self._record_success(backend)
+
+    async def check(self, backend: OllamaBackend) -> None:
+        try:
+            response = await backend.client.list()
+        except Exception as e:
+            self._record_failure(backend, e)
+            return
+        models = {model.get("model") or model.get("name") for model in response.get("models", [])}
+        if models != backend.models:
+            backend.models = models
+            # Ожидающим запросам модели, появившейся на сервере, теперь есть куда идти
+            self._capacity_changed()
+        self._record_success(backend)
+
+    async def check_all(self) -> None:
+        await asyncio.gather(*(self.check(backend) for backend in self.backends))
+
+    async def _health_loop(self) -> None:
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.health_interval)
+
+    def start(self) -> None:
+        if self._health_task is None:
+            self._health_task = asyncio.create_task(self._health_loop())
+
+    async def stop(self) -> None:
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "healthy": self.healthy_count(),
+            "total": len(self.backends),
+            "backends": [backend.stats() for backend in self.backends],
+        }
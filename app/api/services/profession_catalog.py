@@ -0,0 +1,248 @@
+import asyncio
+import logging
+import re
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from tortoise.functions import Count
+from database.models import Profession, VacancyRole
+
+logger = logging.getLogger(__name__)
+
+# Вступительные обороты, которые не относятся к названию профессии
+FILLER_PATTERNS = [
+    re.compile(r"^(я\s+)?(очень\s+)?(хочу|хотел\w*\s+бы|мечтаю|планирую|думаю)\s+"),
+    re.compile(r"^(быть|стать|работать|пойти\s+работать|пойти\s+в)\s+"),
+    re.compile(r"^(кем|как)\s+(работает|работают)\s+"),
+    re.compile(r"^(профессия|работа|должность)\s+"),
+]
+
+# Окончания, которые отрезаются при грубой нормализации словоформ
+ENDINGS = sorted([
+    "ами", "ями", "ого", "его", "ому", "ему", "ыми", "ими",
+    "ом", "ем", "ой", "ей", "ою", "ею", "ам", "ям", "ах", "ях", "ым", "им", "ых", "их",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ый", "ий",
+    "а", "я", "у", "ю", "ы", "и", "е", "о",
+], key=len, reverse=True)
+
+# Разговорные синонимы, которых нет в названиях ролей hh.ru
+SYNONYMS = {
+    "айтишник": "Программист, разработчик",
+    "кодер": "Программист, разработчик",
+    "девопс": "DevOps-инженер",
+    "тестер": "Тестировщик",
+    "эйчар": "Менеджер по персоналу",
+    "hr": "Менеджер по персоналу",
+    "дальнобойщик": "Водитель",
+    "таксист": "Водитель",
+}
+
+# Роли-заглушки hh.ru, которые не являются профессиями
+IGNORED_ROLES = {"другое"}
+
+CONFIDENT_SIMILARITY = 0.8
+ALTERNATIVES_SIMILARITY = 0.6
+CANDIDATE_SIMILARITY = 0.3
+
+
+def normalize_text(text: str) -> str:
+    text = text.lower().replace("ё", "е")
+    text = re.sub(r"[^\w+#]+", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    for pattern in FILLER_PATTERNS:
+        text = pattern.sub("", text)
+    return text
+
+
+def stem_word(word: str) -> str:
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= 4:
+            return word[:-len(ending)]
+    return word
+
+
+def stem_text(text: str) -> str:
+    return " ".join(stem_word(word) for word in normalize_text(text).split())
+
+
+def trigrams(text: str) -> set:
+    """Триграммы как в pg_trgm: каждое слово дополняется двумя пробелами слева и одним справа"""
+    result = set()
+    for word in text.split():
+        padded = f"  {word} "
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+class ProfessionMatcher:
+    """
+    In-memory триграммный индекс каталога профессий.
+    Каждое название и синоним индексируется в нормализованной форме с
+    обрезанными окончаниями, поэтому "программистом" совпадает с "Программист".
+    Одно слово, с которого начинаются названия ("менеджер", "врачом"), сопоставляется
+    с этими профессиями, даже если триграммное сходство с полными названиями низкое.
+    """
+
+    def __init__(self, entries: List[Tuple[str, str]]):
+        # entries: (вариант написания, каноническое название профессии)
+        self.exact: Dict[str, str] = {}
+        self.keys: List[str] = []
+        self.names: List[str] = []
+        self.key_trigrams: List[set] = []
+        self.postings: Dict[str, List[int]] = {}
+
+        # Первое слово названия -> профессии: "менеджер" -> все "Менеджер по ..."
+        self.head_words: Dict[str, List[str]] = {}
+
+        for alias, name in entries:
+            key = stem_text(alias)
+            if not key or key in self.exact:
+                continue
+            self.exact[key] = name
+            head_names = self.head_words.setdefault(key.split()[0], [])
+            if name not in head_names:
+                head_names.append(name)
+            if len(key) < 3:
+                # Короткие синонимы ("hr") ищутся только точно - в триграммах они дают шум
+                continue
+            index = len(self.keys)
+            self.keys.append(key)
+            self.names.append(name)
+            grams = trigrams(key)
+            self.key_trigrams.append(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def candidates(self, text: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Профессии, похожие на текст, по убыванию триграммного сходства"""
+        query_grams = trigrams(text)
+        if not query_grams:
+            return []
+
+        common = Counter()
+        for gram in query_grams:
+            common.update(self.postings.get(gram, ()))
+
+        best: Dict[str, float] = {}
+        for index, shared in common.items():
+            similarity = shared / (len(query_grams) + len(self.key_trigrams[index]) - shared)
+            name = self.names[index]
+            if similarity > best.get(name, 0.0):
+                best[name] = similarity
+
+        ranked = sorted(best.items(), key=lambda item: item[1], reverse=True)
+        return [(name, round(score, 3)) for name, score in ranked[:limit] if score >= CANDIDATE_SIMILARITY]
+
+    def match(self, user_message: str) -> Dict:
+        """
+        Сопоставляет сообщение пользователя с каталогом.
+
+        Returns:
+            Dict с полями:
+            - status: "exact", "fuzzy" (уверенное совпадение), "near" (есть похожие) или "none"
+            - profession_name: найденная профессия (для exact/fuzzy)
+            - alternatives: ранжированный список похожих профессий
+        """
+        key = stem_text(user_message)
+        if key in self.exact:
+            return {"status": "exact", "profession_name": self.exact[key], "alternatives": []}
+
+        head_names = self.head_words.get(key) if " " not in key else None
+        if head_names:
+            # Общее название без уточнения: единственная профессия или выбор из них
+            if len(head_names) == 1:
+                return {"status": "fuzzy", "profession_name": head_names[0], "alternatives": []}
+            return {"status": "near", "profession_name": None, "alternatives": head_names[:5]}
+
+        candidates = self.candidates(key)
+        alternatives = [name for name, _ in candidates]
+        if candidates and candidates[0][1] >= CONFIDENT_SIMILARITY:
+            return {"status": "fuzzy", "profession_name": candidates[0][0], "alternatives": alternatives[1:]}
+        if candidates and candidates[0][1] >= ALTERNATIVES_SIMILARITY:
+            return {"status": "near", "profession_name": None, "alternatives": alternatives}
+        return {"status": "none", "profession_name": None, "alternatives": alternatives}
+
+
+def catalog_entries(professions: List[dict]) -> List[Tuple[str, str]]:
+    """Варианты написания: полное название, части через запятую, синонимы"""
+    entries = []
+    for profession in professions:
+        name = profession["name"]
+        if name.lower() in IGNORED_ROLES:
+            continue
+        entries.append((name, name))
+        # "Программист, разработчик" -> "Программист", "разработчик"
+        for part in name.split(","):
+            entries.append((part.strip(), name))
+        for synonym in profession.get("synonyms") or []:
+            entries.append((synonym, name))
+
+    known = {profession["name"] for profession in professions}
+    for synonym, name in SYNONYMS.items():
+        if name in known:
+            entries.append((synonym, name))
+    return entries
+
+
+class ProfessionCatalogHolder:
+    """Держит матчер, построенный по таблице profession_catalog"""
+
+    def __init__(self):
+        self.current: Optional[ProfessionMatcher] = None
+        self._lock = asyncio.Lock()
+
+    async def rebuild(self) -> ProfessionMatcher:
+        async with self._lock:
+            professions = await Profession.all().values("name", "synonyms")
+            matcher = ProfessionMatcher(catalog_entries(professions))
+            self.current = matcher
+            logger.info(f"Profession catalog loaded: {len(professions)} professions, {len(matcher)} spellings")
+            return matcher
+
+    async def get(self) -> ProfessionMatcher:
+        if self.current is None:
+            return await self.rebuild()
+        return self.current
+
+
+profession_catalog = ProfessionCatalogHolder()
+
+
+async def refresh_profession_catalog(hh_roles: Optional[List[dict]] = None) -> dict:
+    """
+    Пополняет каталог ролями из vacancy_roles (и, опционально, справочником ролей hh.ru)
+    и обновляет количество вакансий по каждой роли.
+    """
+    counts = await VacancyRole.annotate(vacancies=Count("id")) \
+        .group_by("role_name", "role_id") \
+        .values("role_name", "role_id", "vacancies")
+
+    roles: Dict[str, dict] = {}
+    for role in hh_roles or []:
+        if role.get("name"):
+            roles[role["name"]] = {"hh_role_id": role.get("id"), "source": "hh_role", "vacancies_count": 0}
+    for row in counts:
+        entry = roles.setdefault(row["role_name"], {"hh_role_id": row["role_id"], "source": "vacancy_role",
+                                                    "vacancies_count": 0})
+        entry["vacancies_count"] += row["vacancies"]
+
+    existing = {p.name: p for p in await Profession.all()}
+    created, updated = [], 0
+    for name, data in roles.items():
+        if name.lower() in IGNORED_ROLES:
+            continue
+        profession = existing.get(name)
+        if profession is None:
+            created.append(Profession(name=name, **data))
+        elif profession.vacancies_count != data["vacancies_count"]:
+            profession.vacancies_count = data["vacancies_count"]
+            await profession.save(update_fields=["vacancies_count", "updated_at"])
+            updated += 1
+
+    if created:
+        await Profession.bulk_create(created)
+
+    await profession_catalog.rebuild()
+    return {"created": len(created), "updated": updated, "total": len(existing) + len(created)}
@@ -0,0 +1,122 @@
+import copy
+import hashlib
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from tortoise.expressions import F
+from database.models import ProfileCacheEntry
+from settings.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_answer(text: Optional[str]) -> str:
+    """Регистр, ё, пунктуация и лишние пробелы не влияют на ключ кэша"""
+    text = (text or "").lower().replace("ё", "е")
+    text = re.sub(r"[^\w+#/]+", " ", text)
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _timestamp(value: datetime) -> float:
+    """Наивные даты из БД - в UTC (timezone Tortoise по умолчанию)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class ProfileCache:
+    """
+    Двухуровневый кэш сгенерированных профилей: LRU в памяти процесса
+    и таблица profile_cache в Postgres (общая для всех воркеров и рестартов).
+    Обе записи живут не дольше ttl секунд.
+    """
+
+    def __init__(self, ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self.metrics = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "errors": 0}
+
+    @staticmethod
+    def make_key(profession_name: str, clarification_history: List[dict], vibe_answer: str,
+                 prompt_version: str) -> str:
+        """
+        Ключ из профессии, ответов на уточнения и ответа про вайб.
+        Тексты вопросов не входят в ключ: модель формулирует их каждый раз по-разному.
+        """
+        canonical = json.dumps([
+            prompt_version,
+            normalize_answer(profession_name),
+            [normalize_answer(item.get("answer")) for item in clarification_history],
+            normalize_answer(vibe_answer),
+        ], ensure_ascii=False)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    def _remember(self, key: str, expires_at: float, profile: dict) -> None:
+        self._entries[key] = (expires_at, profile)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get(self, key: str) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, profile = entry
+            if expires_at > time.time():
+                self._entries.move_to_end(key)
+                self.metrics["memory_hits"] += 1
+                return copy.deepcopy(profile)
+            del self._entries[key]
+
+        try:
+            # Срок проверяется в запросе: Tortoise без use_tz может вернуть наивную дату
+            row = await ProfileCacheEntry.get_or_none(key=key, expires_at__gt=datetime.now(timezone.utc))
+            if row is not None:
+                await ProfileCacheEntry.filter(key=key).update(hits=F("hits") + 1)
+                self._remember(key, _timestamp(row.expires_at), row.profile)
+                self.metrics["db_hits"] += 1
+                return copy.deepcopy(row.profile)
+        except Exception as e:
+            # Кэш не должен ломать генерацию - при недоступной БД просто промах
+            self.metrics["errors"] += 1
+            logger.warning(f"Profile cache lookup failed: {e}")
+
+        self.metrics["misses"] += 1
+        return None
+
+    async def set(self, key: str, profession_name: str, prompt_version: str, profile: dict) -> None:
+        expires_at = datetime.now(timezone.utc) + timedelta(seconds=self.ttl)
+        self._remember(key, expires_at.timestamp(), copy.deepcopy(profile))
+        try:
+            await ProfileCacheEntry.update_or_create(
+                key=key,
+                defaults={
+                    "prompt_version": prompt_version,
+                    "profession": profession_name[:200],
+                    "profile": profile,
+                    "expires_at": expires_at,
+                }
+            )
+            self.metrics["stores"] += 1
+            # Просроченные записи удаляются при записи новых - чтения их уже не видят
+            await ProfileCacheEntry.filter(expires_at__lte=datetime.now(timezone.utc)).delete()
+        except Exception as e:
+            self.metrics["errors"] += 1
+            logger.warning(f"Profile cache store failed: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.metrics["memory_hits"] + self.metrics["db_hits"] + self.metrics["misses"]
+        hits = self.metrics["memory_hits"] + self.metrics["db_hits"]
+        return {
+            **self.metrics,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._entries),
+            "ttl_seconds": self.ttl,
+        }
+
+
+profile_cache = ProfileCache(ttl=settings.profile_cache_ttl, max_entries=settings.profile_cache_max_entries)
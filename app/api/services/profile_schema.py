@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import Any, List, Optional
+from api.schemas.v1.ai_models import CareerProfileResponse
+
+# Поля ответа, которые заполняет сервис, а не модель
+SERVICE_FIELDS = ("session_id", "day_images", "created_at")
+
+# Минимальное число элементов в списочных разделах
+PROFILE_MIN_ITEMS = {"real_cases": 3, "chat_examples": 5}
+
+# Группы независимых разделов для параллельной генерации: мелкие разделы идут одним запросом
+PARALLEL_SECTION_GROUPS = [
+    ("position_title", "career_growth", "balance_score", "benefit"),
+    ("sounds", "tech_stack", "visual"),
+    ("typical_day",),
+    ("real_cases",),
+    ("chat_examples",),
+]
+
+DIFFICULTIES = ["easy", "medium", "hard"]
+BALANCE_SCORE_PATTERN = r"^\d+/\d+$"
+
+# Короткие инструкции для генерации отдельного раздела
+SECTION_INSTRUCTIONS = {
+    "position_title": "Название должности с контекстом (например: 'Junior Frontend-разработчик в стартапе финтеха').",
+    "sounds": "РЕАЛЬНЫЕ звуки рабочего дня, а не метафоры (например: 'Уведомление Build failed в CI/CD').",
+    "career_growth": "Реалистичный путь роста с временными рамками "
+                     "(например: 'Junior (0-2 года) → Middle (2-4 года) → Senior (4-6 лет)').",
+    "balance_score": "Баланс работы и личной жизни в формате XX/YY.",
+    "benefit": "Главная эмоциональная ценность работы: не 'высокая зарплата', а что даёт кайф.",
+    "typical_day": "ИСТОРИЯ дня от пробуждения до сна, минимум 7-10 предложений, с конкретными деталями.",
+    "real_cases": "КОНКРЕТНЫЕ задачи с РЕАЛЬНЫМИ сложностями: title - задача, description - что сделать, "
+                  "какие сложности и что может пойти не так, difficulty - easy, medium или hard.",
+    "tech_stack": "Инструменты с контекстом использования (не просто 'React', а 'React - пишешь компоненты весь день').",
+    "visual": "Три описания: что перед тобой, что вокруг, что получается в результате - так, чтобы можно было "
+              "представить картинку.",
+    "chat_examples": "Живые диалоги из рабочих чатов: colleague - имя и роль коллеги, request - его сообщение, "
+                     "your_response - твой ответ, vibe - эмоциональный окрас. Ситуации должны быть разными.",
+}
+
+
+def _inline_refs(node: Any, defs: dict) -> Any:
+    """Подставляет $defs вместо $ref - так схему понимает генератор грамматики Ollama"""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline_refs(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+        return {key: _inline_refs(value, defs) for key, value in node.items() if key not in ("$defs", "example")}
+    if isinstance(node, list):
+        return [_inline_refs(item, defs) for item in node]
+    return node
+
+
+@lru_cache(maxsize=1)
+def profile_json_schema() -> dict:
+    """JSON-схема профиля для параметра format: поля CareerProfileResponse без служебных"""
+    schema = CareerProfileResponse.model_json_schema()
+    schema = _inline_refs(schema, schema.get("$defs", {}))
+    for field in SERVICE_FIELDS:
+        schema["properties"].pop(field, None)
+    schema["required"] = [field for field in schema.get("required", []) if field not in SERVICE_FIELDS]
+
+    properties = schema["properties"]
+    for section, min_items in PROFILE_MIN_ITEMS.items():
+        properties[section]["minItems"] = min_items
+    properties["real_cases"]["items"]["properties"]["difficulty"]["enum"] = DIFFICULTIES
+    properties["balance_score"]["pattern"] = BALANCE_SCORE_PATTERN
+    return schema
+
+
+def profile_sections() -> List[str]:
+    return list(profile_json_schema()["properties"])
+
+
+def section_json_schema(section: str, min_items: Optional[int] = None) -> dict:
+    """Схема ответа {section: ...} для генерации одного раздела"""
+    schema = dict(profile_json_schema()["properties"][section])
+    if min_items is not None:
+        schema["minItems"] = min_items
+    return {"type": "object", "properties": {section: schema}, "required": [section]}
+
+
+def sections_json_schema(sections) -> dict:
+    """Схема ответа с несколькими разделами профиля"""
+    properties = profile_json_schema()["properties"]
+    return {
+        "type": "object",
+        "properties": {section: properties[section] for section in sections},
+        "required": list(sections),
+    }
+
+
+def _is_valid(schema: dict, value: Any) -> bool:
+    if schema.get("type") == "string":
+        return isinstance(value, str) and bool(value.strip())
+    if schema.get("type") == "object":
+        return isinstance(value, dict) and all(
+            _is_valid(schema["properties"][field], value.get(field)) for field in schema.get("required", [])
+        )
+    return value is not None
+
+
+def valid_items(section: str, value: Any) -> list:
+    """Корректные элементы списочного раздела"""
+    schema = profile_json_schema()["properties"][section]
+    if schema.get("type") != "array" or not isinstance(value, list):
+        return []
+    return [item for item in value if _is_valid(schema["items"], item)]
+
+
+def section_problem(section: str, value: Any) -> Optional[str]:
+    """Описание проблемы раздела или None, если раздел корректен"""
+    schema = profile_json_schema()["properties"][section]
+    if value is None:
+        return "missing"
+    if schema.get("type") == "array":
+        items = valid_items(section, value)
+        min_items = PROFILE_MIN_ITEMS.get(section, 1)
+        if len(items) < min_items:
+            return f"need at least {min_items} valid items, got {len(items)}"
+        return None
+    if not _is_valid(schema, value):
+        return f"expected {schema.get('type')}"
+    return None
@@ -0,0 +1,115 @@
+import math
+import random
+from typing import Iterable, List, Optional, Sequence
+import numpy as np
+
+
+class KLLSketch:
+    """
+    Объединяемый квантильный скетч KLL (Karnin, Lang, Liberty).
+
+    Элементы уровня h имеют вес 2**h. Когда уровень переполняется, он
+    сортируется и каждый второй элемент (со случайным смещением) переносится
+    на уровень выше. Память - O(k * log(n / k)), ошибка ранга - около 1.7 / k.
+    Два скетча объединяются поуровневой конкатенацией с последующим сжатием.
+    """
+
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: Optional[int] = None):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self.compactors: List[List[float]] = []
+        self._rng = random.Random(seed)
+        self._max_size = 0
+        self._grow()
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.c ** depth * self.k)) + 1
+
+    def _grow(self) -> None:
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _size(self) -> int:
+        return sum(len(c) for c in self.compactors)
+
+    def _compress(self) -> None:
+        while self._size() >= self._max_size:
+            for level, compactor in enumerate(self.compactors):
+                if len(compactor) >= self._capacity(level):
+                    if level + 1 >= len(self.compactors):
+                        self._grow()
+                    compactor.sort()
+                    # При нечётной длине наименьший элемент остаётся на уровне
+                    keep = compactor[:len(compactor) % 2]
+                    rest = compactor[len(keep):]
+                    self.compactors[level + 1].extend(rest[self._rng.random() < 0.5::2])
+                    self.compactors[level] = keep
+                    break
+
+    def update(self, value: float) -> None:
+        self.compactors[0].append(float(value))
+        self.count += 1
+        if len(self.compactors[0]) >= self._capacity(0):
+            self._compress()
+
+    def update_many(self, values: Iterable[float]) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.compactors[0].extend(values.tolist())
+        self.count += len(values)
+        self._compress()
+
+    def merge(self, other: "KLLSketch") -> "KLLSketch":
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        self._compress()
+        return self
+
+    def _weighted(self):
+        items, weights = [], []
+        for level, compactor in enumerate(self.compactors):
+            items.extend(compactor)
+            weights.extend([1 << level] * len(compactor))
+        items = np.asarray(items, dtype=np.float64)
+        weights = np.asarray(weights, dtype=np.float64)
+        order = np.argsort(items, kind="stable")
+        return items[order], weights[order]
+
+    def quantiles(self, fractions: Sequence[float]) -> List[Optional[float]]:
+        """Значения для долей fractions (0..1)"""
+        items, weights = self._weighted()
+        if not len(items):
+            return [None] * len(fractions)
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        result = []
+        for q in fractions:
+            index = int(np.searchsorted(cumulative, q * total, side="left"))
+            result.append(float(items[min(index, len(items) - 1)]))
+        return result
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        return self.quantiles([fraction])[0]
+
+    def histogram(self, edges: Sequence[float]) -> List[int]:
+        """
+        Оценка числа значений в корзинах [edges[i], edges[i + 1]).
+        Последняя корзина включает правую границу.
+        """
+        items, weights = self._weighted()
+        counts = []
+        if not len(items):
+            return [0] * (len(edges) - 1)
+        cumulative = np.concatenate(([0.0], np.cumsum(weights)))
+        positions = np.searchsorted(items, edges, side="left")
+        positions[-1] = np.searchsorted(items, edges[-1], side="right")
+        for left, right in zip(positions[:-1], positions[1:]):
+            counts.append(int(round(cumulative[right] - cumulative[left])))
+        return counts
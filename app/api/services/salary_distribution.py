@@ -0,0 +1,117 @@
+import asyncio
+import logging
+import math
+from typing import Any, Dict, Optional, Tuple
+import numpy as np
+from api.services.quantile_sketch import KLLSketch
+from api.services.salary_snapshot import SalarySnapshot, salary_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Квантили, которые отдаются вместе со средними
+QUANTILES = {"p10": 0.10, "p25": 0.25, "p50": 0.50, "p75": 0.75, "p90": 0.90}
+
+# Фиксированные границы корзин гистограммы (средняя зарплата вакансии)
+HISTOGRAM_EDGES = [0, 25_000, 50_000, 75_000, 100_000, 150_000, 200_000, 300_000, 500_000, math.inf]
+
+
+class SalaryDistributionIndex:
+    """
+    Квантильные скетчи средней зарплаты по группам опыта и ролей.
+    Ключ скетча - (group_by, currency, название группы).
+    """
+
+    def __init__(self, version: int = 0):
+        self.version = version
+        self.sketches: Dict[Tuple[str, str, str], KLLSketch] = {}
+
+    def update_from(self, snapshot: SalarySnapshot, start: int, stop: int) -> None:
+        """Добавляет в скетчи строки снимка [start, stop) - одну загруженную порцию"""
+        for group_by in ("experience", "professional_role"):
+            group_rows, group_codes, labels = snapshot.grouping(group_by)
+
+            # Пары (строка, группа) упорядочены по строкам - берём срез порции
+            left, right = np.searchsorted(group_rows, [start, stop])
+            rows, codes = group_rows[left:right], group_codes[left:right]
+            middle = snapshot.salary_mid[rows]
+            currency_codes = snapshot.currency_codes[rows]
+            valid = ~np.isnan(middle)
+
+            for currency_code, currency in enumerate(snapshot.currencies.values):
+                mask = valid & (currency_codes == currency_code)
+                if not mask.any():
+                    continue
+
+                # Раскладываем значения по группам одной сортировкой
+                order = np.argsort(codes[mask], kind="stable")
+                batch_codes, batch_values = codes[mask][order], middle[mask][order]
+                bounds = np.flatnonzero(np.diff(batch_codes)) + 1
+                for chunk_codes, chunk_values in zip(np.split(batch_codes, bounds), np.split(batch_values, bounds)):
+                    batch = KLLSketch()
+                    batch.update_many(chunk_values)
+                    key = (group_by, currency, labels[chunk_codes[0]])
+                    if key in self.sketches:
+                        self.sketches[key].merge(batch)
+                    else:
+                        self.sketches[key] = batch
+
+    @classmethod
+    def from_snapshot(cls, snapshot: SalarySnapshot, batch_size: int = 50_000) -> "SalaryDistributionIndex":
+        index = cls(version=snapshot.version)
+        for start in range(0, len(snapshot), batch_size):
+            index.update_from(snapshot, start, min(start + batch_size, len(snapshot)))
+        return index
+
+    def describe(self, group_by: str, currency: str, group: str) -> Dict[str, Any]:
+        """Квантили и гистограмма для группы"""
+        sketch = self.sketches.get((group_by, currency, group))
+        if sketch is None:
+            return {}
+
+        values = sketch.quantiles(list(QUANTILES.values()))
+        result = {name: round(value, 2) for name, value in zip(QUANTILES, values)}
+        counts = sketch.histogram(HISTOGRAM_EDGES)
+        result["histogram"] = [
+            {
+                "lower": HISTOGRAM_EDGES[i],
+                "upper": HISTOGRAM_EDGES[i + 1] if math.isfinite(HISTOGRAM_EDGES[i + 1]) else None,
+                "count": count
+            }
+            for i, count in enumerate(counts)
+        ]
+        return result
+
+
+class SalaryDistributionHolder:
+    """Держит индекс скетчей, согласованный с текущим снимком зарплат"""
+
+    def __init__(self):
+        self.current: Optional[SalaryDistributionIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> Tuple[SalarySnapshot, SalaryDistributionIndex]:
+        snapshot = await salary_snapshot.get()
+        index = self.current
+        if index is not None and index.version == snapshot.version:
+            return snapshot, index
+
+        async with self._lock:
+            index = self.current
+            if index is None or index.version != snapshot.version:
+                index = await asyncio.to_thread(SalaryDistributionIndex.from_snapshot, snapshot)
+                self.current = index
+                logger.info(f"Salary distribution index built: {len(index.sketches)} groups")
+            return snapshot, index
+
+
+salary_distributions = SalaryDistributionHolder()
+
+
+async def get_grouped_distribution(group_by: str, currency: str = "RUR") -> Dict[str, Dict[str, Any]]:
+    """Средние, квантили и гистограммы по группам"""
+    snapshot, index = await salary_distributions.get()
+    result = {}
+    for group, stats in snapshot.salary_by_groups(group_by, currency).items():
+        if stats["count"] > 0:
+            result[group] = {**stats, **index.describe(group_by, currency, group)}
+    return result
@@ -0,0 +1,297 @@
+import asyncio
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+from api.services.vacancy_iter import SALARY_FIELDS, load_vacancy_columns
+from api.services.vacancy_dedup import duplicate_vacancy_ids
+from api.services.stats_cache import dataset_version
+
+logger = logging.getLogger(__name__)
+
+NOT_SPECIFIED = "Не указано"
+
+
+class ValueDictionary:
+    """Словарное кодирование строк в int-коды в порядке первого появления"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.codes[value] = code
+            self.values.append(value)
+        return code
+
+
+class SalarySnapshot:
+    """
+    Колоночный снимок таблицы vacancies для аналитики по зарплатам.
+
+    Зарплаты хранятся в массивах float64 (NaN - значение отсутствует),
+    валюта, опыт и роли - в виде int-кодов словарей. Роли вакансии лежат
+    в плоском массиве role_codes, границы строк задаёт role_offsets.
+    Маска unique_mask отмечает вакансии, не являющиеся повтором другой.
+    """
+
+    def __init__(self, records: Iterable[dict], version: int = 0, duplicate_ids: Optional[Set[str]] = None):
+        self.version = version
+        duplicate_ids = duplicate_ids or set()
+
+        currencies = ValueDictionary()
+        experience_ids = ValueDictionary()
+        experience_names = ValueDictionary()
+        roles = ValueDictionary()
+
+        salary_from, salary_to = [], []
+        currency_codes, experience_id_codes, experience_name_codes = [], [], []
+        role_codes, role_offsets = [], [0]
+        group_role_rows, group_role_codes = [], []
+        unique = []
+
+        for row, record in enumerate(records):
+            unique.append(record.get("id") not in duplicate_ids)
+
+            salary = record.get("salary") or {}
+            from_val = salary.get("from")
+            to_val = salary.get("to")
+            salary_from.append(float(from_val) if from_val is not None else np.nan)
+            salary_to.append(float(to_val) if to_val is not None else np.nan)
+
+            # -1 - вакансия без зарплаты, не попадает ни в одну валюту
+            currency = salary.get("currency")
+            currency_codes.append(currencies.encode(currency) if salary and currency else -1)
+
+            exp = record.get("experience") or {}
+            exp_id = exp.get("id")
+            experience_id_codes.append(experience_ids.encode(exp_id) if exp_id is not None else -1)
+            experience_name_codes.append(experience_names.encode(exp.get("name", NOT_SPECIFIED)))
+
+            vacancy_roles = record.get("professional_roles") or []
+            for role in vacancy_roles:
+                # Роли без названия пропускаются, как в vacancy_roles
+                if role.get("name"):
+                    role_codes.append(roles.encode(role["name"]))
+            role_offsets.append(len(role_codes))
+
+            # Для группировки вакансия попадает в каждую свою роль (без ролей - в "Не указано")
+            vacancy_role_codes = set(role_codes[role_offsets[-2]:]) or {roles.encode(NOT_SPECIFIED)}
+            for code in sorted(vacancy_role_codes):
+                group_role_rows.append(row)
+                group_role_codes.append(code)
+
+        self.salary_from = np.asarray(salary_from, dtype=np.float64)
+        self.salary_to = np.asarray(salary_to, dtype=np.float64)
+        self.salary_mid = np.where(
+            np.isnan(self.salary_from),
+            self.salary_to,
+            np.where(np.isnan(self.salary_to), self.salary_from, (self.salary_from + self.salary_to) / 2)
+        )
+
+        self.currency_codes = np.asarray(currency_codes, dtype=np.int32)
+        self.experience_id_codes = np.asarray(experience_id_codes, dtype=np.int32)
+        self.experience_name_codes = np.asarray(experience_name_codes, dtype=np.int32)
+        self.role_codes = np.asarray(role_codes, dtype=np.int32)
+        self.role_offsets = np.asarray(role_offsets, dtype=np.int64)
+        # Номер строки для каждого элемента role_codes
+        self.role_rows = np.repeat(np.arange(len(self), dtype=np.int64), np.diff(self.role_offsets))
+        self.group_role_rows = np.asarray(group_role_rows, dtype=np.int64)
+        self.group_role_codes = np.asarray(group_role_codes, dtype=np.int32)
+        self.unique_mask = np.asarray(unique, dtype=bool)
+
+        self.currencies = currencies
+        self.experience_ids = experience_ids
+        self.experience_names = experience_names
+        self.roles = roles
+
+    def __len__(self) -> int:
+        return len(self.salary_from)
+
+    # --- Маски ---
+
+    def currency_mask(self, currency: str) -> np.ndarray:
+        code = self.currencies.codes.get(currency)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.currency_codes == code
+
+    def experience_mask(self, experience_id: str) -> np.ndarray:
+        code = self.experience_ids.codes.get(experience_id)
+        if code is None:
+            return np.zeros(len(self), dtype=bool)
+        return self.experience_id_codes == code
+
+    def role_mask(self, professional_role: str) -> np.ndarray:
+        mask = np.zeros(len(self), dtype=bool)
+        code = self.roles.codes.get(professional_role)
+        if code is not None:
+            mask[self.role_rows[self.role_codes == code]] = True
+        return mask
+
+    def filter_mask(
+            self,
+            professional_role: Optional[str] = None,
+            experience_id: Optional[str] = None,
+            currency: str = "RUR",
+            deduplicate: bool = False
+    ) -> np.ndarray:
+        mask = self.currency_mask(currency)
+        if deduplicate:
+            mask &= self.unique_mask
+        if professional_role:
+            mask &= self.role_mask(professional_role)
+        if experience_id:
+            mask &= self.experience_mask(experience_id)
+        return mask
+
+    # --- Агрегаты ---
+
+    @staticmethod
+    def _mean(values: np.ndarray) -> float:
+        values = values[~np.isnan(values)]
+        return round(float(values.sum() / len(values)), 2) if len(values) else 0.0
+
+    def summarize(self, mask: np.ndarray, currency: str) -> Dict[str, Any]:
+        """Средние зарплаты по строкам маски (или массиву номеров строк) в формате calculate_average_salary"""
+        middle = self.salary_mid[mask]
+        return {
+            "avg_from": self._mean(self.salary_from[mask]),
+            "avg_to": self._mean(self.salary_to[mask]),
+            "avg_middle": self._mean(middle),
+            "count": int(np.count_nonzero(~np.isnan(middle))),
+            "currency": currency
+        }
+
+    def average_salary(
+            self,
+            professional_role: Optional[str] = None,
+            experience_id: Optional[str] = None,
+            currency: str = "RUR",
+            deduplicate: bool = False
+    ) -> Dict[str, Any]:
+        return self.summarize(self.filter_mask(professional_role, experience_id, currency, deduplicate), currency)
+
+    def grouping(self, group_by: str) -> Optional[Tuple[np.ndarray, np.ndarray, List[str]]]:
+        """
+        Пары (строка, код группы) и названия групп.
+        Для ролей вакансия с несколькими ролями даёт несколько пар.
+        """
+        if group_by == "experience":
+            return np.arange(len(self), dtype=np.int64), self.experience_name_codes, self.experience_names.values
+        if group_by == "professional_role":
+            return self.group_role_rows, self.group_role_codes, self.roles.values
+        return None
+
+    def salary_by_groups(self, group_by: str = "experience", currency: str = "RUR",
+                         deduplicate: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Аналог calculate_salary_by_groups на векторных операциях"""
+        grouping = self.grouping(group_by)
+        if grouping is None:
+            return {}
+        group_rows, group_codes, labels = grouping
+
+        row_mask = self.currency_mask(currency)
+        if deduplicate:
+            row_mask &= self.unique_mask
+        selected = row_mask[group_rows]
+        rows = group_rows[selected]
+        codes = group_codes[selected]
+        if not len(codes):
+            return {}
+        size = len(labels)
+
+        def sums_and_counts(values: np.ndarray):
+            values = values[rows]
+            valid = ~np.isnan(values)
+            return (
+                np.bincount(codes[valid], weights=values[valid], minlength=size),
+                np.bincount(codes[valid], minlength=size),
+            )
+
+        sum_from, n_from = sums_and_counts(self.salary_from)
+        sum_to, n_to = sums_and_counts(self.salary_to)
+        sum_mid, n_mid = sums_and_counts(self.salary_mid)
+
+        # Порядок групп - по первому появлению в выборке, как в Python-версии
+        present, first_index = np.unique(codes, return_index=True)
+        result = {}
+        for code in present[np.argsort(first_index)]:
+            result[labels[code]] = {
+                "avg_from": round(float(sum_from[code] / n_from[code]), 2) if n_from[code] else 0.0,
+                "avg_to": round(float(sum_to[code] / n_to[code]), 2) if n_to[code] else 0.0,
+                "avg_middle": round(float(sum_mid[code] / n_mid[code]), 2) if n_mid[code] else 0.0,
+                "count": int(n_mid[code]),
+                "currency": currency
+            }
+        return result
+
+    def full_stats(
+            self,
+            target_role: Optional[str] = None,
+            target_experience: Optional[str] = None,
+            baseline_experience: Optional[str] = None,
+            currency: str = "RUR",
+            deduplicate: bool = False
+    ) -> Dict[str, Any]:
+        """Результат в формате эталонной реализации из benchmarks/salary_snapshot_bench.py"""
+        target = None
+        if target_role and target_experience:
+            target = self.average_salary(target_role, target_experience, currency, deduplicate)
+
+        baseline = None
+        if baseline_experience:
+            baseline = self.average_salary(experience_id=baseline_experience, currency=currency,
+                                           deduplicate=deduplicate)
+
+        return {
+            "target": target,
+            "baseline": baseline,
+            "by_experience": self.salary_by_groups("experience", currency, deduplicate),
+            "by_professional_role": self.salary_by_groups("professional_role", currency, deduplicate),
+        }
+
+
+class SalarySnapshotHolder:
+    """
+    Держит актуальный снимок. Новый снимок строится целиком и подменяется
+    одной операцией присваивания, читатели всегда видят согласованные данные.
+    """
+
+    fields = SALARY_FIELDS
+
+    def __init__(self):
+        self.current: Optional[SalarySnapshot] = None
+        self._lock = asyncio.Lock()
+
+    async def _build(self) -> SalarySnapshot:
+        version = dataset_version.current
+        records = await load_vacancy_columns(self.fields)
+        duplicate_ids = await duplicate_vacancy_ids()
+        snapshot = await asyncio.to_thread(SalarySnapshot, records, version, duplicate_ids)
+        self.current = snapshot
+        logger.info(f"Salary snapshot built: {len(snapshot)} vacancies, version {version}")
+        return snapshot
+
+    async def rebuild(self) -> SalarySnapshot:
+        """Принудительная пересборка (вызывается после загрузки данных)"""
+        async with self._lock:
+            return await self._build()
+
+    async def get(self) -> SalarySnapshot:
+        """Возвращает снимок, перестраивая его, если данные успели обновиться"""
+        await dataset_version.refresh()
+        snapshot = self.current
+        if snapshot is not None and snapshot.version == dataset_version.current:
+            return snapshot
+
+        async with self._lock:
+            snapshot = self.current
+            if snapshot is None or snapshot.version != dataset_version.current:
+                snapshot = await self._build()
+            return snapshot
+
+
+salary_snapshot = SalarySnapshotHolder()
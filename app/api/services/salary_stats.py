@@ -0,0 +1,100 @@
+from typing import Any, Dict, List, Optional, Tuple
+from api.services.salary_snapshot import salary_snapshot
+from api.services.stats_cache import stats_cache
+
+
+# Человекочитаемые названия уровней опыта hh.ru
+EXPERIENCE_LABELS = {
+    "noExperience": "без опыта",
+    "between1And3": "от 1 до 3 лет",
+    "between3And6": "от 3 до 6 лет",
+    "moreThan6": "более 6 лет"
+}
+
+
+async def compute_full_stats(
+        target_role: Optional[str] = None,
+        target_experience: Optional[str] = None,
+        baseline_experience: Optional[str] = None,
+        currency: str = "RUR",
+        deduplicate: bool = False
+) -> Dict[str, Any]:
+    """Полная статистика по зарплатам на колоночном снимке вакансий"""
+    snapshot = await salary_snapshot.get()
+    return snapshot.full_stats(
+        target_role=target_role,
+        target_experience=target_experience,
+        baseline_experience=baseline_experience,
+        currency=currency,
+        deduplicate=deduplicate
+    )
+
+
+async def get_full_stats(
+        target_role: Optional[str] = None,
+        target_experience: Optional[str] = None,
+        baseline_experience: Optional[str] = None,
+        currency: str = "RUR",
+        deduplicate: bool = False
+) -> Dict[str, Any]:
+    """
+    Полная статистика с кэшированием по параметрам и версии данных.
+    С deduplicate=True каждый кластер почти-дублей считается один раз.
+    """
+    key = (target_role, target_experience, baseline_experience, currency, deduplicate)
+    return await stats_cache.get_or_compute(
+        key,
+        lambda: compute_full_stats(
+            target_role=target_role,
+            target_experience=target_experience,
+            baseline_experience=baseline_experience,
+            currency=currency,
+            deduplicate=deduplicate
+        )
+    )
+
+
+def render_full_stats(
+        stats: Dict[str, Any],
+        target_role: Optional[str] = None,
+        target_experience: Optional[str] = None,
+        baseline_experience: Optional[str] = None
+) -> Tuple[List[str], Dict[str, Any]]:
+    """
+    Формирует текстовые строки и структурированные данные для /stats/full*.
+
+    Returns:
+        (строки вывода, структурированные данные)
+    """
+    output_lines = []
+    structured_data = {}
+
+    # 1. Целевая категория (например, Автомойщики без опыта)
+    if stats["target"] is not None:
+        exp_name = EXPERIENCE_LABELS.get(target_experience, target_experience)
+        output_lines.append(f"{target_role} {exp_name}: {stats['target']}")
+        structured_data["target"] = stats["target"]
+
+    # 2. Базовая категория (все вакансии без опыта)
+    if stats["baseline"] is not None:
+        exp_name = EXPERIENCE_LABELS.get(baseline_experience, baseline_experience)
+        output_lines.append(f"Все вакансии {exp_name}: {stats['baseline']}")
+        structured_data["baseline"] = stats["baseline"]
+
+    # 3. По опыту работы (только непустые группы)
+    output_lines.append("\nПо опыту работы:")
+    filtered_exp = {k: v for k, v in stats["by_experience"].items() if v["count"] > 0}
+    structured_data["by_experience"] = filtered_exp
+
+    for exp_name, group_stats in filtered_exp.items():
+        output_lines.append(f"  {exp_name}: {group_stats}")
+
+    # 4. По профессиональным ролям
+    output_lines.append("\nПо ролям:")
+    filtered_roles = {k: v for k, v in stats["by_professional_role"].items() if v["count"] > 0}
+    structured_data["by_professional_role"] = filtered_roles
+
+    for role_name, group_stats in filtered_roles.items():
+        output_lines.append(f"  {role_name}: {group_stats}")
+
+    return output_lines, structured_data
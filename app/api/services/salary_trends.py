@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+import numpy as np
+from database.models import CollectionMetadata, SalaryAggregate
+from api.services.salary_snapshot import SalarySnapshot, salary_snapshot
+
+logger = logging.getLogger(__name__)
+
+# Перцентили, которые сохраняются в агрегатах снимка
+TREND_PERCENTILES = {"p10": 0.10, "p25": 0.25, "p50": 0.50, "p75": 0.75, "p90": 0.90}
+
+
+def _group_means(values: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    """Средние по сегментам [starts[i], starts[i+1]) без учёта NaN"""
+    valid = ~np.isnan(values)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), 0.0)
+
+
+def snapshot_aggregates(snapshot: SalarySnapshot) -> List[Dict[str, Any]]:
+    """
+    Агрегаты зарплат снимка по (роль, опыт, валюта), включая итоги "все роли"
+    и "любой опыт" (role / experience_id = None). Одна сортировка на валюту,
+    перцентили - линейной интерполяцией по отсортированным сегментам.
+    """
+    n_roles = len(snapshot.roles.values)
+    n_experience = len(snapshot.experience_ids.values)
+    all_roles, any_experience = n_roles, n_experience
+
+    # Пары (строка, роль): каждая роль вакансии плюс "все роли"
+    pair_rows = np.concatenate([np.arange(len(snapshot), dtype=np.int64), snapshot.role_rows])
+    pair_roles = np.concatenate([np.full(len(snapshot), all_roles, dtype=np.int64), snapshot.role_codes])
+
+    result = []
+    for currency_code, currency in enumerate(snapshot.currencies.values):
+        selected = (snapshot.currency_codes[pair_rows] == currency_code) & ~np.isnan(snapshot.salary_mid[pair_rows])
+        rows, roles = pair_rows[selected], pair_roles[selected]
+
+        # Каждая пара попадает в свой опыт (если указан) и в "любой опыт"
+        experience = snapshot.experience_id_codes[rows].astype(np.int64)
+        known = experience >= 0
+        rows = np.concatenate([rows, rows[known]])
+        keys = np.concatenate([roles * (n_experience + 1) + any_experience,
+                               roles[known] * (n_experience + 1) + experience[known]])
+        if not len(keys):
+            continue
+
+        middle = snapshot.salary_mid[rows]
+        order = np.lexsort((middle, keys))
+        keys, rows, middle = keys[order], rows[order], middle[order]
+
+        starts = np.flatnonzero(np.r_[True, np.diff(keys) != 0])
+        lengths = np.diff(np.r_[starts, len(keys)])
+        avg_from = _group_means(snapshot.salary_from[rows], starts)
+        avg_to = _group_means(snapshot.salary_to[rows], starts)
+        avg_middle = np.add.reduceat(middle, starts) / lengths
+
+        percentiles = {}
+        for name, q in TREND_PERCENTILES.items():
+            position = starts + q * (lengths - 1)
+            low = np.floor(position).astype(np.int64)
+            high = np.ceil(position).astype(np.int64)
+            percentiles[name] = middle[low] + (middle[high] - middle[low]) * (position - low)
+
+        for i, key in enumerate(keys[starts]):
+            role_code, exp_code = divmod(int(key), n_experience + 1)
+            result.append({
+                "role": snapshot.roles.values[role_code] if role_code != all_roles else None,
+                "experience_id": snapshot.experience_ids.values[exp_code] if exp_code != any_experience else None,
+                "currency": currency,
+                "count": int(lengths[i]),
+                "avg_from": round(float(avg_from[i]), 2),
+                "avg_to": round(float(avg_to[i]), 2),
+                "avg_middle": round(float(avg_middle[i]), 2),
+                **{name: round(float(values[i]), 2) for name, values in percentiles.items()},
+            })
+    return result
+
+
+async def record_salary_aggregates(collection_id: int) -> int:
+    """
+    Сохраняет агрегаты текущего снимка для сбора collection_id.
+    Считается по уже построенному колоночному снимку, история не пересканируется.
+    """
+    collection = await CollectionMetadata.get_or_none(id=collection_id)
+    if collection is None:
+        return 0
+
+    snapshot = await salary_snapshot.get()
+    aggregates = await asyncio.to_thread(snapshot_aggregates, snapshot)
+
+    await SalaryAggregate.filter(collection_id=collection_id).delete()
+    await SalaryAggregate.bulk_create(
+        [SalaryAggregate(collection_id=collection_id, collected_at=collection.collection_time, **row)
+         for row in aggregates],
+        batch_size=1000
+    )
+    logger.info(f"Salary aggregates recorded for collection {collection_id}: {len(aggregates)} groups")
+    return len(aggregates)
+
+
+async def delete_salary_aggregates(collection_id: Optional[int]) -> None:
+    if collection_id is not None:
+        await SalaryAggregate.filter(collection_id=collection_id).delete()
+
+
+async def get_salary_trends(
+        professional_role: Optional[str] = None,
+        experience_id: Optional[str] = None,
+        currency: str = "RUR",
+        limit: int = 100
+) -> List[Dict[str, Any]]:
+    """
+    Динамика зарплат по сборам: средние и перцентили для роли и опыта
+    (None - по всем) и изменение медианы относительно предыдущего сбора.
+    """
+    rows = await SalaryAggregate.filter(
+        role=professional_role,
+        experience_id=experience_id,
+        currency=currency
+    ).order_by("-collected_at", "-collection_id").limit(limit).values(
+        "collection_id", "collected_at", "count", "avg_from", "avg_to", "avg_middle", *TREND_PERCENTILES
+    )
+    rows.reverse()
+
+    previous = None
+    for row in rows:
+        row["p50_change_pct"] = None
+        if previous and previous["p50"]:
+            row["p50_change_pct"] = round((row["p50"] - previous["p50"]) / previous["p50"] * 100, 2)
+        previous = row
+    return rows
@@ -0,0 +1,176 @@
+import copy
+import logging
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from api.services.profession_catalog import stem_text
+
+logger = logging.getLogger(__name__)
+
+Embedder = Callable[[str], Awaitable[Optional[np.ndarray]]]
+
+
+class VectorIndex:
+    """
+    Плоский индекс нормированных эмбеддингов в памяти процесса: по строке матрицы
+    на ключ, поиск - одно матричное умножение. Повторный add ключа перезаписывает
+    его строку, строки удалённых ключей переиспользуются.
+    """
+
+    def __init__(self, initial_capacity: int = 16):
+        self.initial_capacity = initial_capacity
+        self.vectors: Optional[np.ndarray] = None
+        self.keys: list = []
+        self._slots: Dict[Hashable, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def add(self, key: Hashable, vector: np.ndarray) -> None:
+        if self.vectors is None or self.vectors.shape[1] != len(vector):
+            # Первый вектор или сменилась модель эмбеддингов - старые строки несравнимы
+            self.vectors = np.zeros((self.initial_capacity, len(vector)), dtype=np.float32)
+            self.keys, self._slots, self._free = [], {}, []
+
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = len(self.keys)
+                self.keys.append(None)
+                if slot == len(self.vectors):
+                    self.vectors = np.concatenate([self.vectors, np.zeros_like(self.vectors)])
+            self._slots[key] = slot
+        self.vectors[slot] = vector
+        self.keys[slot] = key
+
+    def remove(self, key: Hashable) -> None:
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self.vectors[slot] = 0
+        self.keys[slot] = None
+        self._free.append(slot)
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[Hashable], float]:
+        if not self._slots or self.vectors.shape[1] != len(vector):
+            return None, 0.0
+        # Свободные строки нулевые: они побеждают, только если всё остальное ниже нуля (ключ None)
+        scores = self.vectors[:len(self.keys)] @ vector
+        best = int(np.argmax(scores))
+        return self.keys[best], float(scores[best])
+
+
+class SemanticCache:
+    """
+    Кэш ответов LLM с двумя уровнями:
+    1. точное совпадение раздела и нормализованного текста запроса;
+    2. ближайший по косинусу эмбеддинг (Ollama) исходного текста выше порога similarity.
+
+    Раздел (partition) - точная часть ключа, например (профессия, номер вопроса):
+    семантический поиск идёт только внутри раздела, поэтому похожий текст
+    не может вернуть ответ для другой профессии. Если эмбеддинги недоступны,
+    работает только первый уровень.
+    """
+
+    def __init__(self, name: str, embed: Embedder, threshold: float, max_entries: int):
+        self.name = name
+        self.embed = embed
+        self.threshold = threshold
+        self.max_entries = max_entries
+        # Единственная структура вытеснения: ключ уходит из LRU - уходит и из индекса раздела
+        self._values: "OrderedDict[Tuple[Hashable, str], Any]" = OrderedDict()
+        self._indexes: Dict[Hashable, VectorIndex] = {}
+        self.metrics = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "embedding_errors": 0}
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Нормализация как у каталога профессий: без вводных оборотов и окончаний"""
+        return stem_text(text)
+
+    async def _embedding(self, text: str) -> Optional[np.ndarray]:
+        try:
+            vector = await self.embed(text)
+        except Exception as e:
+            self.metrics["embedding_errors"] += 1
+            logger.warning(f"Embedding failed for {self.name} cache: {e}")
+            return None
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else None
+
+    async def get(
+            self,
+            text: str,
+            partition: Hashable = None,
+            accept: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[Optional[Any], Optional[np.ndarray]]:
+        """
+        Args:
+            text: свободная часть запроса - по ней ищется близкий эмбеддинг
+            partition: точная часть ключа
+            accept: дополнительная проверка значения при семантическом совпадении
+
+        Returns:
+            (закэшированное значение или None, эмбеддинг запроса - чтобы не считать его повторно в set)
+        """
+        key = (partition, self.normalize(text))
+        if key in self._values:
+            self._values.move_to_end(key)
+            self.metrics["exact_hits"] += 1
+            return copy.deepcopy(self._values[key]), None
+
+        vector = await self._embedding(text)
+        index = self._indexes.get(partition)
+        if vector is not None and index is not None:
+            nearest, score = index.nearest(vector)
+            if nearest is not None and score >= self.threshold and nearest in self._values \
+                    and (accept is None or accept(self._values[nearest])):
+                self.metrics["semantic_hits"] += 1
+                logger.info(f"Semantic {self.name} cache hit ({score:.3f}): '{key[1]}' ~ '{nearest[1]}'")
+                return copy.deepcopy(self._values[nearest]), vector
+
+        self.metrics["misses"] += 1
+        return None, vector
+
+    async def set(
+            self,
+            text: str,
+            value: Any,
+            vector: Optional[np.ndarray] = None,
+            partition: Hashable = None
+    ) -> None:
+        key = (partition, self.normalize(text))
+        self._values[key] = copy.deepcopy(value)
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_entries:
+            evicted, _ = self._values.popitem(last=False)
+            self._drop_vector(evicted)
+
+        if vector is None:
+            vector = await self._embedding(text)
+        if vector is not None and key in self._values:
+            self._indexes.setdefault(partition, VectorIndex()).add(key, vector)
+
+    def _drop_vector(self, key: Tuple[Hashable, str]) -> None:
+        index = self._indexes.get(key[0])
+        if index is None:
+            return
+        index.remove(key)
+        if not len(index):
+            del self._indexes[key[0]]
+
+    def stats(self) -> Dict[str, Any]:
+        hits = self.metrics["exact_hits"] + self.metrics["semantic_hits"]
+        lookups = hits + self.metrics["misses"]
+        return {
+            **self.metrics,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._values),
+            "partitions": len(self._indexes),
+            "threshold": self.threshold,
+        }
@@ -0,0 +1,140 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+from tortoise.exceptions import IntegrityError
+from tortoise.expressions import Q
+from database.models import LLMResult
+from settings.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Как часто воркер без аренды проверяет, не готов ли результат у другого воркера
+POLL_INTERVAL = 0.2
+
+
+class SingleFlight:
+    """
+    Объединение одинаковых одновременных запросов: первый вызов с ключом запускает
+    работу, остальные ждут её результат. Работа идёт в отдельной задаче, поэтому
+    отмена первого вызывающего (клиент отключился) не обрывает её для остальных.
+
+    mode="postgres" объединяет запросы и между воркерами: работу выполняет тот,
+    кто взял аренду строки ключа в llm_results, результат на ttl секунд кладётся
+    туда же, остальные воркеры забирают его оттуда. Генерация идёт вне транзакций,
+    соединения пула заняты только на время коротких запросов. Результат должен
+    сериализоваться в JSON.
+    """
+
+    def __init__(self, mode: str = "local", ttl: float = 60, wait_timeout: float = 120):
+        self.mode = mode
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.metrics = {"executed": 0, "coalesced": 0, "shared_hits": 0, "shared_errors": 0}
+
+    @staticmethod
+    def make_key(*parts) -> str:
+        canonical = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(canonical.encode()).hexdigest()
+
+    async def do(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is None:
+            runner = self._shared(key, work) if self.mode == "postgres" else self._execute(work)
+            task = asyncio.ensure_future(runner)
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.metrics["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    async def _execute(self, work: Callable[[], Awaitable[Any]]) -> Any:
+        self.metrics["executed"] += 1
+        return await work()
+
+    def _fresh(self):
+        return LLMResult.filter(result__isnull=False,
+                                created_at__gt=datetime.now(timezone.utc) - timedelta(seconds=self.ttl))
+
+    async def _stored(self, key: str) -> Optional[Any]:
+        row = await self._fresh().filter(key=key).first()
+        return row.result if row is not None else None
+
+    async def _acquire_lease(self, key: str) -> bool:
+        """
+        Берёт аренду на генерацию по ключу одним коротким запросом: строку без свежего
+        результата и с истёкшей арендой (или без неё) обновляет только один воркер
+        """
+        now = datetime.now(timezone.utc)
+        lease_until = now + timedelta(seconds=self.wait_timeout)
+        updated = await LLMResult.filter(
+            Q(lease_until__isnull=True) | Q(lease_until__lte=now),
+            Q(result__isnull=True) | Q(created_at__lte=now - timedelta(seconds=self.ttl)),
+            key=key,
+        ).update(result=None, created_at=now, lease_until=lease_until)
+        if updated:
+            return True
+        try:
+            await LLMResult.create(key=key, result=None, created_at=now, lease_until=lease_until)
+        except IntegrityError:
+            # Строка уже есть: аренда у другого воркера или результат свежий
+            return False
+        return True
+
+    async def _shared(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            try:
+                stored = await self._stored(key)
+                if stored is not None:
+                    self.metrics["shared_hits"] += 1
+                    return stored
+                leased = await self._acquire_lease(key)
+            except Exception as e:
+                # Общий режим - оптимизация: при недоступной БД работаем как без него
+                self.metrics["shared_errors"] += 1
+                logger.warning(f"Shared single-flight failed, executing locally: {e}")
+                return await self._execute(work)
+
+            if leased:
+                return await self._produce(key, work)
+
+            if time.monotonic() >= deadline:
+                logger.warning(f"Single-flight wait timed out for {key[:12]}, executing locally")
+                return await self._execute(work)
+            await asyncio.sleep(POLL_INTERVAL)
+
+    async def _produce(self, key: str, work: Callable[[], Awaitable[Any]]) -> Any:
+        """Генерация вне транзакции, затем короткая запись результата со снятием аренды"""
+        try:
+            result = await self._execute(work)
+        except BaseException:
+            # Снимаем аренду, чтобы ждущие воркеры не ждали её истечения
+            try:
+                await LLMResult.filter(key=key, result__isnull=True).delete()
+            except Exception as e:
+                logger.warning(f"Could not release single-flight lease: {e}")
+            raise
+
+        try:
+            now = datetime.now(timezone.utc)
+            await LLMResult.filter(key=key).update(result=result, created_at=now, lease_until=None)
+            await LLMResult.filter(created_at__lt=now - timedelta(seconds=self.ttl),
+                                   lease_until__isnull=True).delete()
+        except Exception as e:
+            self.metrics["shared_errors"] += 1
+            logger.warning(f"Could not share single-flight result: {e}")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {"mode": self.mode, "inflight": len(self._inflight), **self.metrics}
+
+
+llm_single_flight = SingleFlight(
+    mode=settings.llm_single_flight_mode,
+    ttl=settings.llm_single_flight_ttl
+)
@@ -0,0 +1,164 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from api.services.facet_index import Facet, FacetIndex, facet_index
+
+logger = logging.getLogger(__name__)
+
+# Код "любой опыт" в ключах частот навыков
+ANY_EXPERIENCE = -1
+
+
+def _row_pairs(a_rows: np.ndarray, a_codes: np.ndarray, b_rows: np.ndarray, b_codes: np.ndarray,
+               size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Все пары (код a, код b, строка) внутри одной строки - векторный join
+    двух CSR-списков, отсортированных по строке.
+    """
+    b_offsets = np.searchsorted(b_rows, np.arange(size + 1))
+    b_start = b_offsets[a_rows]
+    b_len = b_offsets[a_rows + 1] - b_start
+
+    left = np.repeat(np.arange(len(a_rows)), b_len)
+    within = np.arange(len(left)) - np.repeat(np.cumsum(b_len) - b_len, b_len)
+    right = np.repeat(b_start, b_len) + within
+    return a_codes[left], b_codes[right], a_rows[left]
+
+
+def _count_keys(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    return np.unique(keys, return_counts=True)
+
+
+class SkillIndex:
+    """
+    Частоты навыков по ролям и уровням опыта и разреженная матрица
+    совместной встречаемости навыков (в формате CSR).
+    """
+
+    def __init__(self, facets: FacetIndex, chunk_rows: int = 100_000):
+        self.version = facets.version
+        skills: Facet = facets.facets["key_skills"]
+        roles: Facet = facets.facets["professional_roles"]
+        experience: Facet = facets.facets["experience"]
+
+        self.skill_names = skills.values.values
+        self.skill_codes = skills.values.codes
+        self.role_codes = roles.values.codes
+        self.experience_codes = experience.values.codes
+        n_skills = max(len(self.skill_names), 1)
+        n_experience = len(experience.values.values) + 1
+
+        self.skill_totals = np.bincount(skills.flat_codes, minlength=len(self.skill_names))
+
+        # Опыт у вакансии один: код опыта по строке (-1 - не указан)
+        row_experience = np.full(facets.size, ANY_EXPERIENCE, dtype=np.int64)
+        row_experience[experience.flat_rows] = experience.flat_codes
+
+        # --- Навыки по (роль, опыт) ---
+        role_codes, skill_codes, pair_rows = _row_pairs(roles.flat_rows, roles.flat_codes,
+                                                        skills.flat_rows, skills.flat_codes, facets.size)
+        exp_codes = row_experience[pair_rows] + 1  # 0 - опыт не указан
+
+        self.role_skill_counts: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray]] = {}
+        for with_experience in (True, False):
+            exp_part = exp_codes if with_experience else np.zeros_like(exp_codes)
+            keys, counts = _count_keys((role_codes * n_experience + exp_part) * n_skills + skill_codes)
+            group_keys = keys // n_skills
+            bounds = np.flatnonzero(np.diff(group_keys)) + 1
+            for group, group_skills, group_counts in zip(
+                    np.split(group_keys, bounds), np.split(keys % n_skills, bounds), np.split(counts, bounds)):
+                if not len(group):
+                    continue
+                role_code, exp_code = divmod(int(group[0]), n_experience)
+                exp_code = exp_code - 1 if with_experience else ANY_EXPERIENCE
+                order = np.argsort(-group_counts, kind="stable")
+                self.role_skill_counts[(role_code, exp_code)] = (group_skills[order], group_counts[order])
+
+        # Вакансии на (роль, опыт) - знаменатель для долей
+        role_rows_exp = row_experience[roles.flat_rows] + 1
+        keys, counts = _count_keys(roles.flat_codes * n_experience + role_rows_exp)
+        self.role_vacancies = {(int(k // n_experience), int(k % n_experience) - 1): int(c) for k, c in zip(keys, counts)}
+        for role_code, count in enumerate(np.bincount(roles.flat_codes, minlength=len(roles.values.values))):
+            self.role_vacancies[(role_code, ANY_EXPERIENCE)] = int(count)
+
+        # --- Совместная встречаемость навыков, порциями по строкам ---
+        pair_keys, pair_counts = [], []
+        for start in range(0, facets.size, chunk_rows):
+            left, right = np.searchsorted(skills.flat_rows, [start, start + chunk_rows])
+            rows, codes = skills.flat_rows[left:right], skills.flat_codes[left:right]
+            a, b, _ = _row_pairs(rows, codes, rows, codes, facets.size)
+            keys, counts = _count_keys(a[a != b] * n_skills + b[a != b])
+            pair_keys.append(keys)
+            pair_counts.append(counts)
+
+        keys = np.concatenate(pair_keys) if pair_keys else np.empty(0, dtype=np.int64)
+        counts = np.concatenate(pair_counts) if pair_counts else np.empty(0, dtype=np.int64)
+        keys, inverse = np.unique(keys, return_inverse=True)
+        counts = np.bincount(inverse, weights=counts).astype(np.int64)
+
+        self.co_indptr = np.searchsorted(keys // n_skills, np.arange(len(self.skill_names) + 1))
+        self.co_indices = keys % n_skills
+        self.co_counts = counts
+
+    def top_skills(self, role: str, experience_id: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        role_code = self.role_codes.get(role)
+        if role_code is None:
+            return []
+        exp_code = ANY_EXPERIENCE
+        if experience_id:
+            exp_code = self.experience_codes.get(experience_id)
+            if exp_code is None:
+                return []
+
+        skills, counts = self.role_skill_counts.get((role_code, exp_code), (np.empty(0, int), np.empty(0, int)))
+        total = self.role_vacancies.get((role_code, exp_code), 0)
+        return [
+            {"skill": self.skill_names[code], "count": int(count), "share": round(float(count / total), 4) if total else 0.0}
+            for code, count in zip(skills[:limit], counts[:limit])
+        ]
+
+    def related_skills(self, skill: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Навыки, которые чаще всего встречаются вместе с данным (с мерой Жаккара)"""
+        code = self.skill_codes.get(skill)
+        if code is None:
+            return []
+        start, stop = self.co_indptr[code], self.co_indptr[code + 1]
+        neighbours, together = self.co_indices[start:stop], self.co_counts[start:stop]
+        order = np.argsort(-together, kind="stable")[:limit]
+
+        total = self.skill_totals[code]
+        result = []
+        for neighbour, count in zip(neighbours[order], together[order]):
+            union = total + self.skill_totals[neighbour] - count
+            result.append({
+                "skill": self.skill_names[neighbour],
+                "count": int(count),
+                "jaccard": round(float(count / union), 4) if union else 0.0
+            })
+        return result
+
+
+class SkillIndexHolder:
+    """Держит индекс навыков, согласованный с текущим фасетным индексом"""
+
+    def __init__(self):
+        self.current: Optional[SkillIndex] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> SkillIndex:
+        facets = await facet_index.get()
+        index = self.current
+        if index is not None and index.version == facets.version:
+            return index
+
+        async with self._lock:
+            index = self.current
+            if index is None or index.version != facets.version:
+                index = await asyncio.to_thread(SkillIndex, facets)
+                self.current = index
+                logger.info(f"Skill index built: {len(index.skill_names)} skills")
+            return index
+
+
+skill_index = SkillIndexHolder()
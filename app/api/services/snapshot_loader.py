@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import re
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+from tortoise import Tortoise
+from tortoise.transactions import in_transaction
+from database.models import CollectionMetadata, DatasetSnapshot
+from api.services.vacancy_dedup import band_hashes, cluster_signatures, minhash_signature, vacancy_text
+from api.services.vacancy_descriptions import description_params, upsert_sql
+
+logger = logging.getLogger(__name__)
+
+# Таблицы, которые подменяются вместе: вакансии и всё, что из них выводится
+SNAPSHOT_TABLES = ("vacancies", "vacancy_roles", "vacancy_descriptions", "vacancy_signatures", "vacancy_lsh_buckets")
+
+# Суффиксы имён таблиц и индексов: живая - без суффикса, загружаемая и предыдущая
+SHADOW_SUFFIX = "_next"
+PREVIOUS_SUFFIX = "_previous"
+SWAP_SUFFIX = "_swap"
+
+INSERT_BATCH = 1000
+
+# Подмена ждёт блокировку не дольше этого - длинный читатель не должен подвесить всех остальных
+SWAP_LOCK_TIMEOUT = "5s"
+
+INDEX_DEFINITION = re.compile(r"^CREATE (UNIQUE )?INDEX (\S+) ON (?:ONLY )?(\S+) (USING .*)$")
+
+# Загрузки вакансий (инкрементальная и полная) не должны идти одновременно
+load_lock = asyncio.Lock()
+
+
+async def create_collection_metadata(metadata: dict) -> Optional[CollectionMetadata]:
+    """Сохраняет метаданные сбора из JSON-файла"""
+    if not metadata:
+        return None
+    collection_time_str = metadata.get('collection_time', '')
+    # Парсим ISO формат datetime
+    collection_time = datetime.fromisoformat(collection_time_str) if collection_time_str else datetime.now()
+    return await CollectionMetadata.create(
+        collection_time=collection_time,
+        source=metadata.get('source', 'hh.ru'),
+        total_vacancies=metadata.get('total_vacancies', 0),
+        vacancies_per_profession=metadata.get('vacancies_per_profession', 0),
+        version=metadata.get('version', '1.0'),
+        extra_data=metadata
+    )
+
+
+async def _table_indexes(connection, table: str) -> List[dict]:
+    return await connection.execute_query_dict(
+        """
+        SELECT i.relname AS name, pg_get_indexdef(i.oid) AS definition, ix.indisprimary AS is_primary
+        FROM pg_index ix
+        JOIN pg_class i ON i.oid = ix.indexrelid
+        WHERE ix.indrelid = $1::text::regclass
+        ORDER BY i.relname
+        """,
+        [table]
+    )
+
+
+async def _prepare_shadow_tables(connection) -> None:
+    """
+    Пустые копии живых таблиц без индексов - индексы строятся после заливки.
+    Последовательности serial-колонок отвязываются от таблиц, иначе удаление
+    старого поколения удалило бы последовательность, нужную новому.
+    """
+    for table in SNAPSHOT_TABLES:
+        rows = await connection.execute_query_dict(
+            """
+            SELECT pg_get_serial_sequence($1::text, column_name::text) AS sequence
+            FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name::text = $1::text
+              AND column_default LIKE 'nextval(%'
+            """,
+            [table]
+        )
+        for row in rows:
+            if row["sequence"]:
+                await connection.execute_script(f"ALTER SEQUENCE {row['sequence']} OWNED BY NONE")
+
+        await connection.execute_script(f"""
+            DROP TABLE IF EXISTS {table}{SHADOW_SUFFIX};
+            CREATE TABLE {table}{SHADOW_SUFFIX} (LIKE {table} INCLUDING ALL EXCLUDING INDEXES);
+        """)
+
+
+async def _build_shadow_indexes(connection) -> None:
+    """Индексы теневых таблиц - по определениям индексов живых, с суффиксом в имени"""
+    for table in SNAPSHOT_TABLES:
+        for index in await _table_indexes(connection, table):
+            match = INDEX_DEFINITION.match(index["definition"])
+            if match is None:
+                raise RuntimeError(f"Unexpected index definition: {index['definition']}")
+            unique, name, _, rest = match.groups()
+            shadow_name = f"{name}{SHADOW_SUFFIX}"
+            await connection.execute_script(
+                f"CREATE {unique or ''}INDEX {shadow_name} ON {table}{SHADOW_SUFFIX} {rest}"
+            )
+            if index["is_primary"]:
+                await connection.execute_script(
+                    f"ALTER TABLE {table}{SHADOW_SUFFIX} ADD CONSTRAINT {shadow_name} PRIMARY KEY USING INDEX {shadow_name}"
+                )
+        await connection.execute_script(f"ANALYZE {table}{SHADOW_SUFFIX}")
+
+
+async def _rename_generation(connection, from_suffix: str, to_suffix: str) -> None:
+    """Переименовывает поколение таблиц (и их индексы) с одного суффикса на другой"""
+    for table in SNAPSHOT_TABLES:
+        for index in await _table_indexes(connection, f"{table}{from_suffix}"):
+            base = index["name"][:len(index["name"]) - len(from_suffix)] if from_suffix else index["name"]
+            await connection.execute_script(f"ALTER INDEX {index['name']} RENAME TO {base}{to_suffix}")
+        await connection.execute_script(f"ALTER TABLE {table}{from_suffix} RENAME TO {table}{to_suffix}")
+
+
+async def _generation_exists(connection, suffix: str) -> bool:
+    rows = await connection.execute_query_dict("SELECT to_regclass($1::text) IS NOT NULL AS present",
+                                               [f"vacancies{suffix}"])
+    return bool(rows[0]["present"])
+
+
+def _snapshot_rows(vacancies: List[dict]) -> tuple:
+    """
+    Строки для теневых таблиц, MinHash-сигнатуры и кластеры дублей:
+    (rows, roles, descriptions, signatures, bands, clusters).
+    Чистые вычисления без БД - выполняются в отдельном потоке, чтобы не блокировать чтения.
+    """
+    rows, roles, descriptions = [], [], []
+    signatures, bands = {}, {}
+    seen = set()
+    for vacancy_data in vacancies:
+        vacancy_id = vacancy_data.get('id')
+        if not vacancy_id or vacancy_id in seen:
+            continue
+        seen.add(vacancy_id)
+
+        name = vacancy_data.get('name', '')
+        salary = vacancy_data.get('salary')
+        rows.append([
+            vacancy_id, name,
+            *[json.dumps(vacancy_data.get(field, default), ensure_ascii=False) for field, default in (
+                ('professional_roles', []), ('key_skills', []), ('specializations', []), ('experience', {}),
+            )],
+            json.dumps(salary, ensure_ascii=False) if salary is not None else None,
+            *[json.dumps(vacancy_data.get(field, {}), ensure_ascii=False) for field in ('employment', 'schedule')],
+        ])
+        roles.extend(
+            [vacancy_id, role.get('id'), role['name']]
+            for role in vacancy_data.get('professional_roles') or [] if role.get('name')
+        )
+        descriptions.append(description_params(vacancy_id, name, vacancy_data.get('key_skills', []),
+                                               vacancy_data.get('description')))
+
+        signature = minhash_signature(vacancy_text(name, vacancy_data.get('description')))
+        if signature is not None:
+            signatures[vacancy_id] = signature
+            bands[vacancy_id] = band_hashes(signature)
+
+    return rows, roles, descriptions, signatures, bands, cluster_signatures(signatures, bands)
+
+
+async def _insert_snapshot(connection, vacancies: List[dict]) -> int:
+    """Заливает вакансии и производные таблицы в теневое поколение"""
+    rows, roles, descriptions, signatures, bands, clusters = await asyncio.to_thread(_snapshot_rows, vacancies)
+
+    statements = [
+        (f"""
+        INSERT INTO vacancies{SHADOW_SUFFIX}
+            (id, name, professional_roles, key_skills, specializations, experience, salary, employment, schedule,
+             created_at, updated_at)
+        VALUES ($1, $2, $3::jsonb, $4::jsonb, $5::jsonb, $6::jsonb, $7::jsonb, $8::jsonb, $9::jsonb, now(), now())
+        """, rows),
+        (f"INSERT INTO vacancy_roles{SHADOW_SUFFIX} (vacancy_id, role_id, role_name) VALUES ($1, $2, $3)", roles),
+        (upsert_sql(f"vacancy_descriptions{SHADOW_SUFFIX}", on_conflict=False), descriptions),
+        (f"INSERT INTO vacancy_signatures{SHADOW_SUFFIX} (vacancy_id, signature, cluster_id) VALUES ($1, $2, $3)",
+         [[vacancy_id, signature.tobytes(), clusters[vacancy_id]] for vacancy_id, signature in signatures.items()]),
+        (f"INSERT INTO vacancy_lsh_buckets{SHADOW_SUFFIX} (vacancy_id, band, bucket) VALUES ($1, $2, $3)",
+         [[vacancy_id, band, bucket] for vacancy_id, keys in bands.items() for band, bucket in enumerate(keys)]),
+    ]
+    for sql, values in statements:
+        for start in range(0, len(values), INSERT_BATCH):
+            await connection.execute_many(sql, values[start:start + INSERT_BATCH])
+    return len(rows)
+
+
+def _read_json(path: str) -> dict:
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+async def load_snapshot(json_file_path: str) -> DatasetSnapshot:
+    """
+    Полная загрузка снимка: вакансии из файла заливаются в теневые таблицы *_next,
+    для них строятся индексы, затем одна транзакция переименованием подменяет
+    живое поколение. Читатели до подмены видят старые данные целиком, после - новые;
+    прежнее поколение сохраняется как *_previous для мгновенного отката.
+    """
+    data = await asyncio.to_thread(_read_json, json_file_path)
+
+    async with load_lock:
+        collection = await create_collection_metadata(data.get('metadata', {}))
+        snapshot = await DatasetSnapshot.create(
+            collection_id=collection.id if collection else None,
+            source_path=json_file_path
+        )
+        connection = Tortoise.get_connection('default')
+        try:
+            await _prepare_shadow_tables(connection)
+            snapshot.vacancies_count = await _insert_snapshot(connection, data.get('vacancies', []))
+            await _build_shadow_indexes(connection)
+
+            async with in_transaction() as transaction:
+                await transaction.execute_script(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+                if await _generation_exists(transaction, PREVIOUS_SUFFIX):
+                    for table in SNAPSHOT_TABLES:
+                        await transaction.execute_script(f"DROP TABLE IF EXISTS {table}{PREVIOUS_SUFFIX}")
+                await _rename_generation(transaction, "", PREVIOUS_SUFFIX)
+                await _rename_generation(transaction, SHADOW_SUFFIX, "")
+
+                await DatasetSnapshot.filter(status="previous").using_db(transaction).update(status="retired")
+                await DatasetSnapshot.filter(status="live").using_db(transaction).update(status="previous")
+                snapshot.status = "live"
+                snapshot.activated_at = datetime.now(timezone.utc)
+                await snapshot.save(using_db=transaction)
+
+        except Exception as e:
+            snapshot.status = "failed"
+            snapshot.error = str(e)
+            await snapshot.save()
+            raise
+
+    logger.info(f"Snapshot {snapshot.id} is live: {snapshot.vacancies_count} vacancies")
+    return snapshot
+
+
+async def rollback_snapshot() -> Optional[DatasetSnapshot]:
+    """
+    Возвращает предыдущее поколение таблиц (три переименования в одной транзакции).
+    Откатиться можно и к данным, загруженным до первого снимка, - тогда previous_snapshot None.
+    """
+    async with load_lock:
+        connection = Tortoise.get_connection('default')
+        if not await _generation_exists(connection, PREVIOUS_SUFFIX):
+            raise ValueError("No previous snapshot to roll back to")
+        previous = await DatasetSnapshot.filter(status="previous").order_by("-activated_at").first()
+
+        async with in_transaction() as transaction:
+            await transaction.execute_script(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT}'")
+            await _rename_generation(transaction, "", SWAP_SUFFIX)
+            await _rename_generation(transaction, PREVIOUS_SUFFIX, "")
+            await _rename_generation(transaction, SWAP_SUFFIX, PREVIOUS_SUFFIX)
+
+            await DatasetSnapshot.filter(status="live").using_db(transaction).update(status="rolled_back")
+            if previous is not None:
+                previous.status = "live"
+                previous.activated_at = datetime.now(timezone.utc)
+                await previous.save(using_db=transaction)
+
+    logger.info(f"Rolled back to snapshot {previous.id if previous else 'loaded before snapshots'}")
+    return previous
+
+
+async def snapshot_history(limit: int = 20) -> List[Dict]:
+    return await DatasetSnapshot.all().order_by("-id").limit(limit).values(
+        "id", "collection_id", "source_path", "status", "vacancies_count", "error", "created_at", "activated_at"
+    )
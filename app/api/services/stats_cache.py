@@ -0,0 +1,118 @@
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Awaitable, Hashable, Optional
+from tortoise.expressions import F
+from tortoise.signals import post_save
+from database.models import CollectionMetadata, DatasetState
+
+logger = logging.getLogger(__name__)
+
+
+class DatasetVersion:
+    """
+    Номер версии набора вакансий. Хранится в таблице dataset_state, поэтому
+    загрузка в одном воркере видна всем остальным: refresh() перечитывает номер
+    не чаще раза в check_interval секунд и вызывается перед выдачей кэшей и индексов.
+    """
+
+    STATE_ID = 1
+
+    def __init__(self, check_interval: float = 1.0):
+        self.current = 0
+        self.check_interval = check_interval
+        self._checked_at: Optional[float] = None
+
+    async def refresh(self) -> int:
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return self.current
+        self._checked_at = now
+
+        try:
+            state = await DatasetState.get_or_none(id=self.STATE_ID)
+        except Exception as e:
+            # Без БД остаёмся на известной версии - данные всё равно не могли обновиться
+            logger.warning(f"Dataset version check failed: {e}")
+            return self.current
+
+        version = state.version if state is not None else 0
+        if version != self.current:
+            logger.info(f"Dataset version changed from {self.current} to {version}")
+            self.current = version
+        return self.current
+
+    async def bump(self) -> int:
+        try:
+            await DatasetState.get_or_create(id=self.STATE_ID)
+            await DatasetState.filter(id=self.STATE_ID).update(version=F("version") + 1)
+            state = await DatasetState.get(id=self.STATE_ID)
+            self.current = state.version
+        except Exception as e:
+            # Хотя бы этот воркер сбросит свои кэши
+            logger.warning(f"Could not persist dataset version: {e}")
+            self.current += 1
+        self._checked_at = time.monotonic()
+        logger.info(f"Dataset version bumped to {self.current}")
+        return self.current
+
+
+class StatsResultCache:
+    """
+    LRU-кэш результатов статистики в памяти процесса.
+    Ключ включает номер версии данных, поэтому после загрузки старые записи
+    больше не выдаются и вытесняются.
+    """
+
+    def __init__(self, version: DatasetVersion, max_entries: int = 256):
+        self.version = version
+        self.max_entries = max_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._entries_version = version.current
+        self.hits = 0
+        self.misses = 0
+
+    def _sync_version(self) -> None:
+        if self._entries_version != self.version.current:
+            self._entries.clear()
+            self._entries_version = self.version.current
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        self._sync_version()
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+        self.misses += 1
+        return None
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._sync_version()
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        """Возвращает закэшированный результат или считает и сохраняет новый"""
+        version = await self.version.refresh()
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = await compute()
+
+        # Пока считали, могла пройти загрузка - такой результат не сохраняем
+        if version == self.version.current:
+            self.set(key, value)
+        return value
+
+
+dataset_version = DatasetVersion()
+stats_cache = StatsResultCache(dataset_version)
+
+
+@post_save(CollectionMetadata)
+async def _on_collection_metadata_saved(sender, instance, created, using_db, update_fields) -> None:
+    if created:
+        await dataset_version.bump()
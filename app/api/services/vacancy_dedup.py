@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import re
+import zlib
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from tortoise.expressions import Q
+from database.models import VacancyLSHBucket, VacancySignature
+from api.services.vacancy_descriptions import get_descriptions, strip_html
+from api.services.vacancy_iter import iter_vacancy_chunks
+
+logger = logging.getLogger(__name__)
+
+# 128 перестановок = 16 полос по 8 строк: пара с похожестью 0.85 становится
+# кандидатом с вероятностью > 0.99, с похожестью 0.5 - примерно в 6% случаев
+NUM_PERM = 128
+BANDS = 16
+ROWS_PER_BAND = NUM_PERM // BANDS
+
+SHINGLE_SIZE = 3
+# Короткие тексты (только название) не сравниваем - иначе все "Водитель" окажутся дублями
+MIN_SHINGLES = 20
+DUPLICATE_SIMILARITY = 0.85
+
+# Перестановки - multiply-add-shift хэширование: (a * h + b) mod 2^64, старшие 32 бита.
+# Переполнение uint64 в numpy как раз даёт mod 2^64; a - случайное нечётное 64-битное
+_rng = np.random.default_rng(20240601)
+PERM_A = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+PERM_B = _rng.integers(0, 1 << 63, NUM_PERM, dtype=np.uint64) * np.uint64(2)
+HASH_SHIFT = np.uint64(32)
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """32-битные хэши словесных шинглов текста"""
+    words = WORD_PATTERN.findall(text.lower().replace("ё", "е"))
+    shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    return np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+
+def minhash_signature(text: str) -> Optional[np.ndarray]:
+    """MinHash-сигнатура из NUM_PERM значений uint32 или None для слишком короткого текста"""
+    hashes = shingle_hashes(text)
+    if len(hashes) < MIN_SHINGLES:
+        return None
+    permuted = (hashes[:, None] * PERM_A + PERM_B) >> HASH_SHIFT
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_hashes(signature: np.ndarray) -> List[int]:
+    """Ключ LSH-корзины для каждой полосы сигнатуры (знаковый int64 под BIGINT)"""
+    return [
+        int.from_bytes(hashlib.blake2b(band.tobytes(), digest_size=8).digest(), "little", signed=True)
+        for band in signature.reshape(BANDS, ROWS_PER_BAND)
+    ]
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Оценка коэффициента Жаккара по доле совпавших минимумов"""
+    return float(np.mean(a == b))
+
+
+def vacancy_text(name: str, description: Optional[str]) -> str:
+    return f"{name or ''} {strip_html(description) or ''}"
+
+
+def cluster_signatures(signatures: Dict[str, np.ndarray],
+                       bands: Dict[str, List[int]]) -> Dict[str, str]:
+    """
+    Кластеризация целого набора сигнатур в памяти (полная загрузка снимка):
+    те же LSH-корзины, но в словаре, и объединение кластеров через union-find.
+
+    Returns:
+        cluster_id для каждой вакансии - минимальный id в её кластере
+    """
+    parent = {vacancy_id: vacancy_id for vacancy_id in signatures}
+
+    def find(vacancy_id: str) -> str:
+        while parent[vacancy_id] != vacancy_id:
+            parent[vacancy_id] = parent[parent[vacancy_id]]
+            vacancy_id = parent[vacancy_id]
+        return vacancy_id
+
+    buckets: Dict[Tuple[int, int], List[str]] = {}
+    for vacancy_id, signature in signatures.items():
+        candidates = set()
+        for band, bucket in enumerate(bands[vacancy_id]):
+            members = buckets.setdefault((band, bucket), [])
+            candidates.update(members)
+            members.append(vacancy_id)
+        for other in candidates:
+            if similarity(signature, signatures[other]) >= DUPLICATE_SIMILARITY:
+                left, right = find(vacancy_id), find(other)
+                if left != right:
+                    parent[max(left, right)] = min(left, right)
+
+    return {vacancy_id: find(vacancy_id) for vacancy_id in signatures}
+
+
+async def register_vacancy(vacancy_id: str, name: str, description: Optional[str]) -> str:
+    """
+    Сохраняет сигнатуру вакансии, ищет почти-дубли через LSH-корзины
+    и присоединяет вакансию к их кластеру.
+
+    Кандидаты - только вакансии, совпавшие с новой хотя бы в одной полосе,
+    поэтому попарного сравнения со всей таблицей нет.
+
+    Returns:
+        cluster_id - id канонической вакансии кластера (для уникальной - её собственный id)
+    """
+    await VacancyLSHBucket.filter(vacancy_id=vacancy_id).delete()
+
+    signature = minhash_signature(vacancy_text(name, description))
+    if signature is None:
+        await VacancySignature.filter(vacancy_id=vacancy_id).delete()
+        return vacancy_id
+
+    bands = band_hashes(signature)
+    candidate_ids = await VacancyLSHBucket.filter(
+        Q(*[Q(band=band, bucket=bucket) for band, bucket in enumerate(bands)], join_type="OR")
+    ).distinct().values_list("vacancy_id", flat=True)
+
+    clusters: Set[str] = set()
+    if candidate_ids:
+        for candidate in await VacancySignature.filter(vacancy_id__in=list(candidate_ids)) \
+                .values("signature", "cluster_id"):
+            other = np.frombuffer(candidate["signature"], dtype=np.uint32)
+            if similarity(signature, other) >= DUPLICATE_SIMILARITY:
+                clusters.add(candidate["cluster_id"])
+
+    cluster_id = min(clusters) if clusters else vacancy_id
+    # Вакансия связала несколько кластеров (или сама была канонической) - сливаем их в один
+    merged = (clusters | {vacancy_id}) - {cluster_id}
+    if merged:
+        await VacancySignature.filter(cluster_id__in=list(merged)).update(cluster_id=cluster_id)
+
+    await VacancySignature.update_or_create(
+        vacancy_id=vacancy_id,
+        defaults={"signature": signature.tobytes(), "cluster_id": cluster_id}
+    )
+    await VacancyLSHBucket.bulk_create([
+        VacancyLSHBucket(vacancy_id=vacancy_id, band=band, bucket=bucket)
+        for band, bucket in enumerate(bands)
+    ])
+    return cluster_id
+
+
+async def duplicate_vacancy_ids() -> Set[str]:
+    """Вакансии-повторы: все члены кластеров, кроме канонической"""
+    rows = await VacancySignature.all().values_list("vacancy_id", "cluster_id")
+    return {vacancy_id for vacancy_id, cluster_id in rows if vacancy_id != cluster_id}
+
+
+async def rebuild_duplicate_index(chunk_size: int = 1000) -> Dict[str, int]:
+    """Пересчитывает сигнатуры и кластеры для всех загруженных вакансий"""
+    await VacancyLSHBucket.all().delete()
+    await VacancySignature.all().delete()
+
+    processed, duplicates = 0, 0
+    async for chunk in iter_vacancy_chunks(("name",), chunk_size=chunk_size):
+        descriptions = await get_descriptions([vacancy["id"] for vacancy in chunk])
+        for vacancy in chunk:
+            cluster_id = await register_vacancy(vacancy["id"], vacancy["name"], descriptions.get(vacancy["id"]))
+            processed += 1
+            duplicates += cluster_id != vacancy["id"]
+
+    logger.info(f"Duplicate index rebuilt: {processed} vacancies, {duplicates} duplicates")
+    return {"processed": processed, "duplicates": duplicates}
+
+
+async def largest_clusters(limit: int = 20) -> List[Dict]:
+    """Самые крупные кластеры дублей"""
+    rows = await VacancySignature.all().values_list("vacancy_id", "cluster_id")
+    clusters: Dict[str, List[str]] = {}
+    for vacancy_id, cluster_id in rows:
+        clusters.setdefault(cluster_id, []).append(vacancy_id)
+    ranked = sorted((item for item in clusters.items() if len(item[1]) > 1), key=lambda item: len(item[1]), reverse=True)
+    return [
+        {"cluster_id": cluster_id, "size": len(ids), "vacancy_ids": sorted(ids)}
+        for cluster_id, ids in ranked[:limit]
+    ]
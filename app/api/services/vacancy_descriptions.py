@@ -0,0 +1,56 @@
+import html
+import json
+import re
+from typing import Dict, List, Optional
+from database import SEARCH_VECTOR_SQL
+from database.models import VacancyDescription
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+SPACE_PATTERN = re.compile(r"\s+")
+
+DESCRIPTIONS_TABLE = "vacancy_descriptions"
+
+
+def upsert_sql(table: str = DESCRIPTIONS_TABLE, on_conflict: bool = True) -> str:
+    """
+    Вставка описания с пересчётом поискового вектора. table - живая или теневая
+    таблица; у теневой на время заливки нет индексов, поэтому там без ON CONFLICT.
+    """
+    vector = SEARCH_VECTOR_SQL.format(name='$3::text', key_skills='$4::jsonb', text='$2::text')
+    sql = f"""
+    INSERT INTO {table} (vacancy_id, text, search_vector, updated_at)
+    VALUES ($1, $2, {vector}, now())
+    """
+    if on_conflict:
+        sql += """
+    ON CONFLICT (vacancy_id) DO UPDATE
+    SET text = EXCLUDED.text, search_vector = EXCLUDED.search_vector, updated_at = EXCLUDED.updated_at
+    """
+    return sql
+
+
+def strip_html(description: Optional[str]) -> Optional[str]:
+    """Текст описания без тегов и HTML-сущностей, с нормализованными пробелами"""
+    if not description:
+        return None
+    text = SPACE_PATTERN.sub(" ", html.unescape(TAG_PATTERN.sub(" ", description))).strip()
+    return text or None
+
+
+def description_params(vacancy_id: str, name: str, key_skills: list, description: Optional[str]) -> list:
+    return [vacancy_id, strip_html(description), name or "", json.dumps(key_skills or [], ensure_ascii=False)]
+
+
+async def save_description(connection, vacancy_id: str, name: str, key_skills: list,
+                           description: Optional[str]) -> None:
+    """
+    Сохраняет описание вакансии и пересчитывает её поисковый вектор.
+    Строка создаётся и для вакансий без описания - по ней ищется название и навыки.
+    """
+    await connection.execute_query(upsert_sql(), description_params(vacancy_id, name, key_skills, description))
+
+
+async def get_descriptions(vacancy_ids: List[str]) -> Dict[str, Optional[str]]:
+    """Описания для набора вакансий одним запросом"""
+    rows = await VacancyDescription.filter(vacancy_id__in=vacancy_ids).values("vacancy_id", "text")
+    return {row["vacancy_id"]: row["text"] for row in rows}
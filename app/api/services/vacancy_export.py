@@ -0,0 +1,156 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List
+from tortoise import Tortoise
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Плоские колонки выгрузки: JSON-поля раскладываются на скаляры на стороне БД
+EXPORT_COLUMNS = [
+    ("id", "v.id"),
+    ("name", "v.name"),
+    ("salary_from", "(v.salary->>'from')::double precision"),
+    ("salary_to", "(v.salary->>'to')::double precision"),
+    ("salary_currency", "v.salary->>'currency'"),
+    ("salary_gross", "(v.salary->>'gross')::boolean"),
+    ("experience_id", "v.experience->>'id'"),
+    ("experience_name", "v.experience->>'name'"),
+    ("employment_id", "v.employment->>'id'"),
+    ("employment_name", "v.employment->>'name'"),
+    ("schedule_id", "v.schedule->>'id'"),
+    ("schedule_name", "v.schedule->>'name'"),
+    ("professional_roles", "(SELECT string_agg(r->>'name', '; ') "
+                           "FROM jsonb_array_elements(CASE WHEN jsonb_typeof(v.professional_roles) = 'array' "
+                           "THEN v.professional_roles ELSE '[]'::jsonb END) r)"),
+    ("key_skills", "(SELECT string_agg(s, '; ') "
+                   "FROM jsonb_array_elements_text(CASE WHEN jsonb_typeof(v.key_skills) = 'array' "
+                   "THEN v.key_skills ELSE '[]'::jsonb END) s)"),
+    ("updated_at", "v.updated_at"),
+]
+DESCRIPTION_COLUMN = ("description", "d.text")
+
+
+def parquet_available() -> bool:
+    """pyarrow - необязательная зависимость, нужна только для Parquet"""
+    try:
+        import pyarrow  # noqa: F401
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _columns(include_description: bool) -> List[tuple]:
+    return EXPORT_COLUMNS + ([DESCRIPTION_COLUMN] if include_description else [])
+
+
+async def iter_export_rows(chunk_size: int = 5000, include_description: bool = False) -> AsyncIterator[List[Dict[str, Any]]]:
+    """
+    Читает vacancies серверным курсором и отдаёт порции по chunk_size строк.
+    В памяти одновременно находится не больше одной порции.
+    """
+    columns = _columns(include_description)
+    sql = "SELECT " + ", ".join(f"{expr} AS {name}" for name, expr in columns) + " FROM vacancies v"
+    if include_description:
+        # Описания лежат в отдельной таблице и подтягиваются только по запросу
+        sql += " LEFT JOIN vacancy_descriptions d ON d.vacancy_id = v.id"
+    sql += " ORDER BY v.id"
+
+    client = Tortoise.get_connection('default')
+    async with client.acquire_connection() as connection:
+        # Серверный курсор asyncpg работает только внутри транзакции
+        async with connection.transaction():
+            chunk = []
+            async for record in connection.cursor(sql, prefetch=chunk_size):
+                chunk.append(dict(record))
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+
+class _ChunkSink:
+    """Файлоподобный буфер для ParquetWriter: накопленное забирается после каждой row group"""
+
+    def __init__(self):
+        self.buffer = io.BytesIO()
+        self.position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        self.buffer.write(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        data = self.buffer.getvalue()
+        self.buffer = io.BytesIO()
+        return data
+
+
+async def export_vacancies(export_format: str, chunk_size: int = 5000,
+                           include_description: bool = False) -> AsyncIterator[bytes]:
+    """
+    Потоковая выгрузка вакансий в NDJSON, CSV или Parquet.
+
+    Args:
+        export_format: ndjson, csv или parquet
+        chunk_size: строк в порции (и в row group для Parquet)
+        include_description: добавлять ли полный текст описания
+
+    Yields:
+        байты очередной порции файла
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    column_names = [name for name, _ in _columns(include_description)]
+    rows = iter_export_rows(chunk_size=chunk_size, include_description=include_description)
+
+    if export_format == "ndjson":
+        async for chunk in rows:
+            yield "".join(json.dumps(row, ensure_ascii=False, default=str) + "\n" for row in chunk).encode()
+
+    elif export_format == "csv":
+        header = io.StringIO()
+        csv.writer(header).writerow(column_names)
+        yield header.getvalue().encode()
+        async for chunk in rows:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                writer.writerow([row[name] for name in column_names])
+            yield buffer.getvalue().encode()
+
+    else:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        schema = pa.schema([
+            (name, pa.float64() if name in ("salary_from", "salary_to")
+             else pa.bool_() if name == "salary_gross"
+             else pa.timestamp("us", tz="UTC") if name == "updated_at"
+             else pa.string())
+            for name in column_names
+        ])
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema, compression="zstd")
+        async for chunk in rows:
+            writer.write_table(pa.Table.from_pylist(chunk, schema=schema))
+            yield sink.take()
+        writer.close()
+        yield sink.take()
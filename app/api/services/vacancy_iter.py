@@ -0,0 +1,59 @@
+from typing import AsyncIterator, List, Optional, Sequence
+from tortoise.queryset import QuerySet
+from database.models import Vacancy
+
+# Колонки, которых достаточно для зарплатной аналитики
+SALARY_FIELDS = ("salary", "experience", "professional_roles")
+
+
+async def iter_vacancy_chunks(
+        fields: Sequence[str] = SALARY_FIELDS,
+        chunk_size: int = 5000,
+        query: Optional[QuerySet] = None
+) -> AsyncIterator[List[dict]]:
+    """
+    Обходит вакансии порциями с keyset-пагинацией по id.
+
+    Из БД читаются только перечисленные колонки (плюс id для пагинации),
+    поэтому тяжёлое описание не передаётся, а в памяти одновременно
+    находится не больше одной порции.
+
+    Args:
+        fields: колонки Vacancy, которые нужны обработчику
+        chunk_size: строк в порции
+        query: базовая выборка с фильтрами (по умолчанию - все вакансии)
+
+    Yields:
+        списки словарей с ключом id и запрошенными колонками
+    """
+    base = query if query is not None else Vacancy.all()
+    columns = ("id", *[field for field in fields if field != "id"])
+    last_id = None
+    while True:
+        page = base if last_id is None else base.filter(id__gt=last_id)
+        chunk = await page.order_by("id").limit(chunk_size).values(*columns)
+        if not chunk:
+            return
+        yield chunk
+        if len(chunk) < chunk_size:
+            return
+        last_id = chunk[-1]["id"]
+
+
+async def iter_vacancies(
+        fields: Sequence[str] = SALARY_FIELDS,
+        chunk_size: int = 5000,
+        query: Optional[QuerySet] = None
+) -> AsyncIterator[dict]:
+    """То же, что iter_vacancy_chunks, но по одной вакансии"""
+    async for chunk in iter_vacancy_chunks(fields, chunk_size, query):
+        for vacancy in chunk:
+            yield vacancy
+
+
+async def load_vacancy_columns(fields: Sequence[str], chunk_size: int = 5000) -> List[dict]:
+    """Все вакансии в порядке id, но только с нужными колонками - для построения in-memory индексов"""
+    records = []
+    async for chunk in iter_vacancy_chunks(fields, chunk_size):
+        records.extend(chunk)
+    return records
@@ -0,0 +1,70 @@
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+from tortoise import Tortoise
+
+# Поиск по предвычисленному search_vector из vacancy_descriptions (GIN-индекс),
+# ранжирование ts_rank_cd, keyset-пагинация по паре (rank DESC, id ASC)
+SEARCH_SQL = """
+WITH query AS (
+    SELECT websearch_to_tsquery('russian', $1) || websearch_to_tsquery('english', $1) AS q
+)
+SELECT *
+FROM (
+    SELECT v.id, v.name, v.salary, v.experience, v.key_skills,
+           ts_rank_cd(d.search_vector, query.q) AS rank
+    FROM vacancy_descriptions d
+    JOIN vacancies v ON v.id = d.vacancy_id, query
+    WHERE d.search_vector @@ query.q
+) ranked
+WHERE $2::real IS NULL OR ranked.rank < $2::real OR (ranked.rank = $2::real AND ranked.id > $3)
+ORDER BY ranked.rank DESC, ranked.id
+LIMIT $4
+"""
+
+JSON_COLUMNS = ("salary", "experience", "key_skills")
+
+
+def encode_cursor(rank: float, vacancy_id: str) -> str:
+    raw = json.dumps([rank, vacancy_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    try:
+        rank, vacancy_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return float(rank), str(vacancy_id)
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+async def search_vacancies(query: str, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Полнотекстовый поиск вакансий по названию, описанию и навыкам.
+
+    Args:
+        query: поисковый запрос (синтаксис websearch: "фразы", OR, -исключение)
+        limit: размер страницы
+        cursor: курсор следующей страницы из предыдущего ответа
+
+    Returns:
+        Dict с найденными вакансиями (items) и курсором следующей страницы (next_cursor)
+    """
+    after_rank, after_id = decode_cursor(cursor) if cursor else (None, None)
+
+    connection = Tortoise.get_connection('default')
+    # Берём на одну строку больше, чтобы понять, есть ли следующая страница
+    rows = await connection.execute_query_dict(SEARCH_SQL, [query, after_rank, after_id, limit + 1])
+
+    items: List[Dict[str, Any]] = []
+    for row in rows[:limit]:
+        for column in JSON_COLUMNS:
+            if isinstance(row[column], str):
+                row[column] = json.loads(row[column])
+        items.append(row)
+
+    next_cursor = None
+    if len(rows) > limit and items:
+        next_cursor = encode_cursor(items[-1]["rank"], items[-1]["id"])
+
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,215 @@
+"""
+Бенчмарк: колоночный снимок (SalarySnapshot) против Python-цикла по вакансиям.
+
+Запуск из каталога app:
+    python -m benchmarks.salary_snapshot_bench --size 200000
+"""
+import argparse
+import random
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+from api.services.salary_snapshot import SalarySnapshot
+
+EXPERIENCES = [
+    {"id": "noExperience", "name": "Нет опыта"},
+    {"id": "between1And3", "name": "От 1 года до 3 лет"},
+    {"id": "between3And6", "name": "От 3 до 6 лет"},
+    {"id": "moreThan6", "name": "Более 6 лет"},
+]
+CURRENCIES = ["RUR"] * 18 + ["USD", "EUR"]
+
+
+class SalaryAccumulator:
+    """Накопитель сумм по зарплатам одной группы"""
+
+    __slots__ = ("sum_from", "n_from", "sum_to", "n_to", "sum_middle", "n_middle")
+
+    def __init__(self):
+        self.sum_from = 0.0
+        self.n_from = 0
+        self.sum_to = 0.0
+        self.n_to = 0
+        self.sum_middle = 0.0
+        self.n_middle = 0
+
+    def add(self, from_val: Optional[float], to_val: Optional[float]) -> None:
+        if from_val is not None:
+            self.sum_from += from_val
+            self.n_from += 1
+        if to_val is not None:
+            self.sum_to += to_val
+            self.n_to += 1
+
+        # Средняя для вакансии
+        if from_val is not None and to_val is not None:
+            self.sum_middle += (from_val + to_val) / 2
+            self.n_middle += 1
+        elif from_val is not None:
+            self.sum_middle += from_val
+            self.n_middle += 1
+        elif to_val is not None:
+            self.sum_middle += to_val
+            self.n_middle += 1
+
+    def to_dict(self, currency: str) -> Dict[str, Any]:
+        return {
+            "avg_from": round(self.sum_from / self.n_from, 2) if self.n_from else 0.0,
+            "avg_to": round(self.sum_to / self.n_to, 2) if self.n_to else 0.0,
+            "avg_middle": round(self.sum_middle / self.n_middle, 2) if self.n_middle else 0.0,
+            "count": self.n_middle,
+            "currency": currency
+        }
+
+
+def _salary_bounds(salary: dict) -> Tuple[Optional[float], Optional[float]]:
+    from_val = salary.get("from")
+    to_val = salary.get("to")
+    return (
+        float(from_val) if from_val is not None else None,
+        float(to_val) if to_val is not None else None,
+    )
+
+
+def aggregate_vacancies(
+        vacancies: Iterable[dict],
+        target_role: Optional[str] = None,
+        target_experience: Optional[str] = None,
+        baseline_experience: Optional[str] = None,
+        currency: str = "RUR"
+) -> Dict[str, Any]:
+    """
+    Считает все агрегаты полной статистики за один проход по вакансиям.
+    Эталонная Python-реализация, с которой сверяется SalarySnapshot.full_stats.
+
+    Args:
+        vacancies: словари с полями salary, experience, professional_roles
+        target_role: целевая профессиональная роль
+        target_experience: ID опыта для целевой роли
+        baseline_experience: ID опыта для базовой статистики
+        currency: валюта для расчета
+
+    Returns:
+        Dict с ключами target, baseline (None, если не запрошены),
+        by_experience и by_professional_role
+    """
+    with_target = bool(target_role and target_experience)
+    target = SalaryAccumulator()
+    baseline = SalaryAccumulator()
+    by_experience: Dict[str, SalaryAccumulator] = {}
+    by_role: Dict[str, SalaryAccumulator] = {}
+
+    for vacancy in vacancies:
+        salary = vacancy.get("salary")
+
+        # Пропускаем вакансии без зарплаты или с неподходящей валютой
+        if not salary or salary.get("currency") != currency:
+            continue
+
+        from_val, to_val = _salary_bounds(salary)
+        exp = vacancy.get("experience") or {}
+        roles = vacancy.get("professional_roles") or []
+
+        if with_target and exp.get("id") == target_experience \
+                and any(role.get("name") == target_role for role in roles):
+            target.add(from_val, to_val)
+
+        if baseline_experience and exp.get("id") == baseline_experience:
+            baseline.add(from_val, to_val)
+
+        exp_key = exp.get("name", "Не указано")
+        by_experience.setdefault(exp_key, SalaryAccumulator()).add(from_val, to_val)
+
+        # Вакансия учитывается в каждой из своих ролей
+        role_keys = {role["name"] for role in roles if role.get("name")} or {"Не указано"}
+        for role_key in role_keys:
+            by_role.setdefault(role_key, SalaryAccumulator()).add(from_val, to_val)
+
+    return {
+        "target": target.to_dict(currency) if with_target else None,
+        "baseline": baseline.to_dict(currency) if baseline_experience else None,
+        "by_experience": {k: v.to_dict(currency) for k, v in by_experience.items()},
+        "by_professional_role": {k: v.to_dict(currency) for k, v in by_role.items()},
+    }
+
+
+def generate_vacancies(size: int, roles_count: int, seed: int = 42) -> list:
+    rnd = random.Random(seed)
+    roles = [{"id": str(i), "name": f"Роль {i}"} for i in range(roles_count)]
+    vacancies = []
+    for _ in range(size):
+        salary = None
+        if rnd.random() > 0.1:
+            low = rnd.randrange(20_000, 300_000, 1_000)
+            salary = {
+                "from": low if rnd.random() > 0.2 else None,
+                "to": low + rnd.randrange(0, 150_000, 1_000) if rnd.random() > 0.3 else None,
+                "currency": rnd.choice(CURRENCIES),
+            }
+        vacancies.append({
+            "salary": salary,
+            "experience": rnd.choice(EXPERIENCES),
+            "professional_roles": rnd.sample(roles, rnd.choice([1, 1, 1, 2, 3])),
+        })
+    return vacancies
+
+
+def timed(func, repeat: int):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def assert_close(expected: dict, actual: dict, path: str = "") -> None:
+    assert expected.keys() == actual.keys(), f"{path}: {expected.keys()} != {actual.keys()}"
+    for key, value in expected.items():
+        if isinstance(value, dict):
+            assert_close(value, actual[key], f"{path}.{key}")
+        elif isinstance(value, float):
+            assert abs(value - actual[key]) <= 0.01, f"{path}.{key}: {value} != {actual[key]}"
+        else:
+            assert value == actual[key], f"{path}.{key}: {value} != {actual[key]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--roles", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    vacancies = generate_vacancies(args.size, args.roles)
+    params = {
+        "target_role": "Роль 7",
+        "target_experience": "noExperience",
+        "baseline_experience": "noExperience",
+    }
+
+    build_time, snapshot = timed(lambda: SalarySnapshot(vacancies), 1)
+    loop_time, loop_result = timed(lambda: aggregate_vacancies(vacancies, **params), args.repeat)
+    snap_time, snap_result = timed(lambda: snapshot.full_stats(**params), args.repeat)
+    assert_close(loop_result, snap_result)
+
+    loop_avg_time, loop_avg = timed(
+        lambda: aggregate_vacancies(vacancies, baseline_experience="between1And3")["baseline"], args.repeat
+    )
+    snap_avg_time, snap_avg = timed(lambda: snapshot.average_salary(experience_id="between1And3"), args.repeat)
+    assert_close(loop_avg, snap_avg)
+
+    print(f"Вакансий: {args.size}, ролей: {args.roles}")
+    rows = [
+        ("Сборка снимка", build_time, None),
+        ("Полная статистика, цикл", loop_time, None),
+        ("Полная статистика, снимок", snap_time, loop_time),
+        ("Средняя по опыту, цикл", loop_avg_time, None),
+        ("Средняя по опыту, снимок", snap_avg_time, loop_avg_time),
+    ]
+    for title, seconds, baseline in rows:
+        speedup = f"  (x{baseline / seconds:.1f})" if baseline else ""
+        print(f"{title:<28}{seconds * 1000:10.2f} ms{speedup}")
+
+if __name__ == '__main__':
+    main()
@@ -16,9 +16,92 @@ config_mask = {
     }
 }
 
+# Вектор полнотекстового поиска: название (A), навыки (B) и описание без HTML (C),
+# русская и английская морфология. Подставляются SQL-выражения колонок или параметров.
+SEARCH_VECTOR_SQL = """
+    setweight(to_tsvector('russian', coalesce({name}, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce({name}, '')), 'A') ||
+    setweight(jsonb_to_tsvector('russian', coalesce({key_skills}, '[]'::jsonb), '["string"]'), 'B') ||
+    setweight(jsonb_to_tsvector('english', coalesce({key_skills}, '[]'::jsonb), '["string"]'), 'B') ||
+    setweight(to_tsvector('russian', coalesce({text}, '')), 'C') ||
+    setweight(to_tsvector('english', coalesce({text}, '')), 'C')
+"""
+
+# Грубая очистка HTML на стороне БД - только для переноса старых данных
+STRIP_HTML_SQL = r"btrim(regexp_replace(regexp_replace({column}, '<[^>]*>', ' ', 'g'), '\s+', ' ', 'g'))"
+
+# Индексы и объекты БД, которые Tortoise не умеет создавать сам
+DDL_STATEMENTS = [
+    "ALTER TABLE sessions ADD COLUMN IF NOT EXISTS llm_context JSONB",
+    "ALTER TABLE llm_results ADD COLUMN IF NOT EXISTS lease_until TIMESTAMPTZ",
+    "ALTER TABLE llm_results ALTER COLUMN result DROP NOT NULL",
+    # Поиск вакансий по роли через containment: professional_roles @> '[{"name": "..."}]'
+    """
+    CREATE INDEX IF NOT EXISTS idx_vacancies_professional_roles
+        ON vacancies USING GIN (professional_roles jsonb_path_ops)
+    """,
+    "ALTER TABLE vacancy_descriptions ADD COLUMN IF NOT EXISTS search_vector tsvector",
+    # Описания сжимаются lz4 при TOAST (PostgreSQL 14+), иначе остаётся стандартный pglz
+    """
+    DO $$
+    BEGIN
+        ALTER TABLE vacancy_descriptions ALTER COLUMN text SET COMPRESSION lz4;
+    EXCEPTION WHEN OTHERS THEN
+        NULL;
+    END $$
+    """,
+    # Перенос описаний из старой схемы, где они лежали в vacancies.description
+    f"""
+    DO $$
+    BEGIN
+        IF EXISTS (
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'vacancies' AND column_name = 'description'
+        ) THEN
+            INSERT INTO vacancy_descriptions (vacancy_id, text, updated_at)
+            SELECT v.id, {STRIP_HTML_SQL.format(column='v.description')}, now()
+            FROM vacancies v
+            ON CONFLICT (vacancy_id) DO NOTHING;
+
+            ALTER TABLE vacancies DROP COLUMN IF EXISTS search_vector;
+            ALTER TABLE vacancies DROP COLUMN description;
+        END IF;
+    END $$
+    """,
+    f"""
+    UPDATE vacancy_descriptions d
+    SET search_vector = {SEARCH_VECTOR_SQL.format(name='v.name', key_skills='v.key_skills', text='d.text')}
+    FROM vacancies v
+    WHERE v.id = d.vacancy_id AND d.search_vector IS NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_vacancy_descriptions_search_vector
+        ON vacancy_descriptions USING GIN (search_vector)
+    """,
+    # Первичное заполнение vacancy_roles для данных, загруженных до её появления
+    """
+    INSERT INTO vacancy_roles (vacancy_id, role_id, role_name)
+    SELECT v.id, r->>'id', r->>'name'
+    FROM vacancies v
+    CROSS JOIN LATERAL jsonb_array_elements(
+        CASE WHEN jsonb_typeof(v.professional_roles) = 'array' THEN v.professional_roles ELSE '[]'::jsonb END
+    ) r
+    WHERE r->>'name' IS NOT NULL
+      AND NOT EXISTS (SELECT 1 FROM vacancy_roles)
+    """,
+]
+
+
 async def start(conn: dict):
     await Tortoise.init(config=conn)
     await Tortoise.generate_schemas()
+    await apply_ddl()
+
+
+async def apply_ddl():
+    connection = Tortoise.get_connection('default')
+    for statement in DDL_STATEMENTS:
+        await connection.execute_script(statement)
 
 
 async def teardown():
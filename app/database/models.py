@@ -1,3 +1,4 @@
+from typing import Optional
 from tortoise import fields
 from tortoise.models import Model
 
@@ -20,6 +21,9 @@ class Session(Model):
     # Определённая профессия
     identified_profession = fields.CharField(max_length=200, null=True)
 
+    # Токены контекста Ollama после последнего уточняющего вопроса
+    llm_context = fields.JSONField(null=True)
+
     # Результат
     result_data = fields.JSONField(null=True)
 
@@ -33,13 +37,39 @@ class Session(Model):
         table = "sessions"
 
 
+class LLMResult(Model):
+    """Недавний ответ LLM, общий для воркеров: ключ - хэш модели, промпта и параметров"""
+    key = fields.CharField(max_length=64, pk=True)
+    result = fields.JSONField(null=True)  # None - результат ещё генерируется
+    created_at = fields.DatetimeField(auto_now_add=True, index=True)
+    # До какого момента воркер, взявший ключ, генерирует результат
+    lease_until = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "llm_results"
+
+
+class ProfileCacheEntry(Model):
+    """Закэшированный профиль профессии (ключ - хэш профессии, ответов и версии промпта)"""
+    key = fields.CharField(max_length=64, pk=True)
+    prompt_version = fields.CharField(max_length=20)
+    profession = fields.CharField(max_length=200)
+    profile = fields.JSONField()
+    hits = fields.IntField(default=0)
+
+    created_at = fields.DatetimeField(auto_now_add=True)
+    expires_at = fields.DatetimeField(index=True)
+
+    class Meta:
+        table = "profile_cache"
+
+
 class Vacancy(Model):
-    """Вакансия - все данные в одной модели"""
+    """Вакансия. Полное описание хранится отдельно, в VacancyDescription"""
 
     # Основные поля
     id = fields.CharField(max_length=100, pk=True)
     name = fields.CharField(max_length=1000)
-    description = fields.TextField(null=True)
 
     # JSON поля для сложных структур
     professional_roles = fields.JSONField(default=list)  # List[Dict]
@@ -60,6 +90,74 @@ class Vacancy(Model):
     def __str__(self):
         return f"Vacancy({self.id}): {self.name}"
 
+    async def fetch_description(self) -> Optional[str]:
+        """Текст описания подгружается отдельным запросом, только когда он действительно нужен"""
+        description = await VacancyDescription.get_or_none(vacancy_id=self.id)
+        return description.text if description else None
+
+
+class VacancyDescription(Model):
+    """
+    Описание вакансии без HTML. Вынесено из vacancies, чтобы основная таблица
+    оставалась узкой; здесь же хранится search_vector для полнотекстового поиска
+    (колонка создаётся в database.DDL_STATEMENTS).
+    """
+    vacancy_id = fields.CharField(max_length=100, pk=True)
+    text = fields.TextField(null=True)
+
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "vacancy_descriptions"
+
+
+class VacancyRole(Model):
+    """Профессиональная роль вакансии - по строке на каждую роль из professional_roles"""
+    id = fields.IntField(pk=True)
+    vacancy_id = fields.CharField(max_length=100, index=True)
+    role_id = fields.CharField(max_length=50, null=True)
+    role_name = fields.CharField(max_length=500, index=True)
+
+    class Meta:
+        table = "vacancy_roles"
+
+
+class VacancySignature(Model):
+    """MinHash-сигнатура описания вакансии и кластер почти-дублей, к которому она относится"""
+    vacancy_id = fields.CharField(max_length=100, pk=True)
+    signature = fields.BinaryField()  # NUM_PERM значений uint32
+    cluster_id = fields.CharField(max_length=100, index=True)  # id канонической вакансии кластера
+
+    class Meta:
+        table = "vacancy_signatures"
+
+
+class VacancyLSHBucket(Model):
+    """LSH-корзина: одна строка на каждую полосу сигнатуры вакансии"""
+    id = fields.BigIntField(pk=True)
+    vacancy_id = fields.CharField(max_length=100, index=True)
+    band = fields.SmallIntField()
+    bucket = fields.BigIntField()
+
+    class Meta:
+        table = "vacancy_lsh_buckets"
+        indexes = (("band", "bucket"),)
+
+
+class Profession(Model):
+    """Каталог реальных профессий (роли hh.ru и их синонимы)"""
+    id = fields.IntField(pk=True)
+    name = fields.CharField(max_length=500, unique=True)
+    hh_role_id = fields.CharField(max_length=50, null=True)
+    source = fields.CharField(max_length=50, default="vacancy_role")  # vacancy_role, hh_role, manual
+    synonyms = fields.JSONField(default=list)  # List[str]
+    vacancies_count = fields.IntField(default=0)
+
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "profession_catalog"
+
 
 class CollectionMetadata(Model):
     """Метаданные сбора данных"""
@@ -75,3 +173,57 @@ class CollectionMetadata(Model):
 
     class Meta:
         table = "collection_metadata"
+
+
+class SalaryAggregate(Model):
+    """
+    Агрегаты зарплат одного сбора по роли и опыту - для динамики во времени.
+    role / experience_id = NULL - итог по всем ролям / любому опыту.
+    """
+    id = fields.IntField(pk=True)
+    collection_id = fields.IntField(index=True)  # CollectionMetadata.id
+    collected_at = fields.DatetimeField()
+    role = fields.CharField(max_length=500, null=True)
+    experience_id = fields.CharField(max_length=50, null=True)
+    currency = fields.CharField(max_length=10)
+
+    count = fields.IntField()
+    avg_from = fields.FloatField()
+    avg_to = fields.FloatField()
+    avg_middle = fields.FloatField()
+    p10 = fields.FloatField()
+    p25 = fields.FloatField()
+    p50 = fields.FloatField()
+    p75 = fields.FloatField()
+    p90 = fields.FloatField()
+
+    class Meta:
+        table = "salary_aggregates"
+        indexes = (("role", "experience_id", "currency", "collected_at"),)
+
+
+class DatasetState(Model):
+    """Единственная строка с номером версии набора вакансий - общая для всех воркеров"""
+    id = fields.IntField(pk=True)
+    version = fields.IntField(default=0)
+    updated_at = fields.DatetimeField(auto_now=True)
+
+    class Meta:
+        table = "dataset_state"
+
+
+class DatasetSnapshot(Model):
+    """Полная загрузка снимка вакансий через теневые таблицы (blue/green)"""
+    id = fields.IntField(pk=True)
+    collection_id = fields.IntField(null=True)  # CollectionMetadata.id
+    source_path = fields.CharField(max_length=1000)
+    status = fields.CharField(max_length=20, default="loading")
+    # Значения: loading, live, previous, retired, failed, rolled_back
+    vacancies_count = fields.IntField(default=0)
+    error = fields.TextField(null=True)
+
+    created_at = fields.DatetimeField(auto_now_add=True)
+    activated_at = fields.DatetimeField(null=True)
+
+    class Meta:
+        table = "dataset_snapshots"
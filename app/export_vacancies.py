@@ -0,0 +1,31 @@
+import argparse
+import asyncio
+import database
+from api.services.vacancy_export import EXPORT_FORMATS, export_vacancies
+
+
+async def main(export_format: str, output: str, chunk_size: int, include_description: bool):
+    await database.start(database.get_config(database.get_connection()))
+    try:
+        with open(output, "wb") as file:
+            async for data in export_vacancies(export_format, chunk_size=chunk_size,
+                                               include_description=include_description):
+                file.write(data)
+    finally:
+        await database.teardown()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Выгрузка вакансий в NDJSON, CSV или Parquet")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--output", help="путь к файлу (по умолчанию vacancies.<формат>)")
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--include-description", action="store_true")
+    args = parser.parse_args()
+
+    asyncio.run(main(
+        args.format,
+        args.output or f"vacancies.{EXPORT_FORMATS[args.format][1]}",
+        args.chunk_size,
+        args.include_description
+    ))
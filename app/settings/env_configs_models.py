@@ -1,3 +1,4 @@
+from typing import List, Literal
 from pydantic import BaseModel, Field, SecretStr, field_validator
 
 
@@ -21,10 +22,37 @@ class RestAPISettings(BaseModel):
 
 
 class OllamaSettings(BaseModel):
+    # Один сервер или несколько через запятую
     ollama_url: str = Field(alias='OLLAMA_URL')
     ollama_model: str = Field(alias='OLLAMA_MODEL')
     ollama_temperature: float = Field(alias='OLLAMA_TEMPERATURE')
     ollama_num_predict: int = Field(alias='OLLAMA_NUM_PREDICT')
+    ollama_embed_model: str = Field(alias='OLLAMA_EMBED_MODEL', default='nomic-embed-text')
+    # Сколько модель остаётся загруженной после запроса - вместе с ней живёт кэш промптов
+    ollama_keep_alive: str = Field(alias='OLLAMA_KEEP_ALIVE', default='30m')
+    # Одновременных генераций на сервер (обычно равно его OLLAMA_NUM_PARALLEL) и допустимая очередь перед запросом
+    llm_max_concurrency: int = Field(alias='LLM_MAX_CONCURRENCY', default=2)
+    llm_max_queue: int = Field(alias='LLM_MAX_QUEUE', default=32)
+    # Сервер исключается из пула после стольких ошибок подряд и возвращается проверкой здоровья
+    ollama_failure_threshold: int = Field(alias='OLLAMA_FAILURE_THRESHOLD', default=3)
+    ollama_eject_seconds: float = Field(alias='OLLAMA_EJECT_SECONDS', default=30)
+    ollama_health_interval: float = Field(alias='OLLAMA_HEALTH_INTERVAL', default=15)
+    # local - одинаковые одновременные запросы объединяются в воркере, postgres - и между воркерами
+    llm_single_flight_mode: Literal['local', 'postgres'] = Field(alias='LLM_SINGLE_FLIGHT_MODE', default='local')
+    llm_single_flight_ttl: float = Field(alias='LLM_SINGLE_FLIGHT_TTL', default=60)
+    # parallel - разделы профиля генерируются независимыми запросами одновременно
+    profile_generation_mode: Literal['single', 'parallel'] = Field(alias='PROFILE_GENERATION_MODE', default='single')
+
+    @property
+    def ollama_urls(self) -> List[str]:
+        return [url.strip() for url in self.ollama_url.split(',') if url.strip()]
+
+
+class CacheSettings(BaseModel):
+    profile_cache_ttl: int = Field(alias='PROFILE_CACHE_TTL', default=7 * 24 * 3600)
+    profile_cache_max_entries: int = Field(alias='PROFILE_CACHE_MAX_ENTRIES', default=1000)
+    semantic_cache_threshold: float = Field(alias='SEMANTIC_CACHE_THRESHOLD', default=0.92)
+    semantic_cache_max_entries: int = Field(alias='SEMANTIC_CACHE_MAX_ENTRIES', default=5000)
 
 
 class Settings(
@@ -32,5 +60,6 @@ class Settings(
     DataBaseConfigsModel,
     RestAPISettings,
     OllamaSettings,
+    CacheSettings,
 ):
     pass
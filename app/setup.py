@@ -1,4 +1,6 @@
-from fastapi import FastAPI, Security, HTTPException, Depends
+import asyncio
+from fastapi import FastAPI, Request, Security, HTTPException, Depends
+from fastapi.responses import JSONResponse
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
@@ -8,6 +10,8 @@ from database import get_config as get_db_config
 from database import get_connection, start, teardown
 from settings.settings import settings
 from api import router
+from api.services.llm_manager import llm_service
+from api.services.llm_scheduler import LLMOverloadedError
 
 
 async def verify_api_key(api_key: str = Security(APIKeyHeader(name='X-API-KEY'))):
@@ -18,11 +22,17 @@ async def verify_api_key(api_key: str = Security(APIKeyHeader(name='X-API-KEY'))
 @asynccontextmanager
 async def lifespan(_: FastAPI):
     await start(conn=get_db_config(get_connection()))
+    # Активная проверка здоровья серверов Ollama
+    llm_service.pool.start()
+    # Прогрев модели в фоне: старт приложения его не ждёт
+    warmup_task = asyncio.create_task(llm_service.warmup())
 
 
     # Для использования в других модулях
     yield
 
+    warmup_task.cancel()
+    await llm_service.pool.stop()
     await teardown()
 
 app = FastAPI(title='AI hh.ru', lifespan=lifespan, debug=settings.prod_mode, dependencies=[Depends(verify_api_key)])
@@ -36,4 +46,12 @@ app.add_middleware(
 )
 
 app.include_router(router)
+
+
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded_handler(_: Request, error: LLMOverloadedError):
+    return JSONResponse(status_code=503, content={"detail": str(error)},
+                        headers={"Retry-After": str(error.retry_after)})
+
+
 register_tortoise(app=app, config=get_db_config(get_connection()), generate_schemas=True)
@@ -0,0 +1,22 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Минимальное окружение, чтобы settings импортировались без .env
+for _name, _value in {
+    'X_AUTH_TOKEN': 'test',
+    'RUNWARE_API_KEY': 'test',
+    'POSTGRES_USER': 'test',
+    'POSTGRES_HOST': 'localhost',
+    'POSTGRES_PORT': '5432',
+    'POSTGRES_PASSWORD': 'test',
+    'POSTGRES_DATABASE': 'test',
+    'REST_HOST': '127.0.0.1',
+    'REST_PORT': '8000',
+    'OLLAMA_URL': 'http://localhost:11434',
+    'OLLAMA_MODEL': 'test',
+    'OLLAMA_TEMPERATURE': '0.7',
+    'OLLAMA_NUM_PREDICT': '1024',
+}.items():
+    os.environ.setdefault(_name, _value)
@@ -0,0 +1,64 @@
+from api.services.facet_index import FacetIndex
+from api.services.salary_snapshot import SalarySnapshot
+
+REMOTE = {"id": "remote", "name": "Удалённая работа"}
+OFFICE = {"id": "fullDay", "name": "Полный день"}
+NO_EXPERIENCE = {"id": "noExperience", "name": "Нет опыта"}
+
+RECORDS = [
+    {"salary": {"from": 100_000, "to": 140_000, "currency": "RUR"}, "experience": NO_EXPERIENCE,
+     "professional_roles": [{"name": "Программист"}], "key_skills": ["Python", "SQL"], "schedule": REMOTE},
+    {"salary": {"from": 80_000, "to": None, "currency": "RUR"}, "experience": NO_EXPERIENCE,
+     "professional_roles": [{"name": "Программист"}], "key_skills": ["Python"], "schedule": OFFICE},
+    {"salary": {"from": 2_000, "to": 3_000, "currency": "USD"}, "experience": NO_EXPERIENCE,
+     "professional_roles": [{"name": "Аналитик"}], "key_skills": ["SQL"], "schedule": REMOTE},
+    {"salary": None, "experience": NO_EXPERIENCE,
+     "professional_roles": [{"name": "Аналитик"}], "key_skills": ["SQL", "Excel", "SQL"], "schedule": OFFICE},
+]
+
+
+def make_index() -> FacetIndex:
+    return FacetIndex(RECORDS, SalarySnapshot(RECORDS, version=3))
+
+
+def counts(result: dict, facet: str) -> dict:
+    return {item["value"]: item["count"] for item in result["facets"][facet]}
+
+
+def test_index_reuses_salary_snapshot():
+    salary = SalarySnapshot(RECORDS, version=3)
+    index = FacetIndex(RECORDS, salary)
+    assert index.salary is salary
+    assert index.version == 3
+
+
+def test_without_filters_counts_everything():
+    result = make_index().query({})
+    assert result["total"] == 4
+    assert counts(result, "key_skills") == {"SQL": 3, "Python": 2, "Excel": 1}
+    assert result["salary"]["count"] == 2
+    assert result["salary"]["avg_middle"] == 100_000
+
+
+def test_skills_require_all_values_and_facet_ignores_own_filter():
+    result = make_index().query({"key_skills": ["Python", "SQL"]})
+    assert result["total"] == 1
+    # Счётчики навыков - без учёта фильтра по навыкам
+    assert counts(result, "key_skills") == {"SQL": 3, "Python": 2, "Excel": 1}
+    assert counts(result, "schedule") == {"remote": 1}
+
+
+def test_schedule_matches_any_value_and_salary_range():
+    result = make_index().query({"schedule": ["remote", "fullDay"]}, salary_min=90_000)
+    assert result["total"] == 1
+    assert result["salary"]["avg_middle"] == 120_000
+
+    usd = make_index().query({}, salary_max=5_000, currency="USD")
+    assert usd["total"] == 1
+    assert counts(usd, "professional_roles") == {"Аналитик": 1}
+
+
+def test_unknown_value_matches_nothing():
+    result = make_index().query({"key_skills": ["Rust"]})
+    assert result["total"] == 0
+    assert result["salary"]["count"] == 0
@@ -0,0 +1,62 @@
+import pytest
+from api.services.json_stream import MalformedJSONError, StreamingJSONParser
+
+
+def feed_by_char(parser: StreamingJSONParser, text: str) -> list:
+    completed = []
+    for char in text:
+        completed.extend(parser.feed(char))
+    return completed
+
+
+def test_pairs_are_reported_as_soon_as_complete():
+    parser = StreamingJSONParser()
+    assert parser.feed('{"title": "Разработчик", "sounds": ["a",') == [("title", "Разработчик")]
+    assert parser.feed(' "b"], "score": 7') == [("sounds", ["a", "b"])]
+    assert parser.feed("}") == [("score", 7)]
+    assert parser.done
+    assert parser.result == {"title": "Разработчик", "sounds": ["a", "b"], "score": 7}
+
+
+def test_scalars_followed_by_closing_brace():
+    parser = StreamingJSONParser()
+    completed = feed_by_char(parser, '{"a": true, "b": null, "c": -1.5}')
+    assert completed == [("a", True), ("b", None), ("c", -1.5)]
+    assert parser.done
+
+
+def test_brackets_and_quotes_inside_strings():
+    parser = StreamingJSONParser()
+    text = '{"cases": [{"title": "Баг в [prod] {срочно}", "note": "он сказал \\"ок]\\""}], "x": "}"}'
+    completed = feed_by_char(parser, text)
+    assert completed == [
+        ("cases", [{"title": "Баг в [prod] {срочно}", "note": 'он сказал "ок]"'}]),
+        ("x", "}"),
+    ]
+
+
+def test_text_around_object_is_ignored():
+    parser = StreamingJSONParser()
+    parser.feed('Вот профиль:\n```json\n{"a": 1}\n```\nГотово {')
+    assert parser.result == {"a": 1}
+    assert parser.done
+
+
+def test_trailing_commas_and_raw_newlines_are_tolerated():
+    parser = StreamingJSONParser()
+    parser.feed('{"items": [1, 2, ], "day": "утро\nвечер", }')
+    assert parser.result == {"items": [1, 2], "day": "утро\nвечер"}
+    assert parser.done
+
+
+@pytest.mark.parametrize("text", [
+    '{title: "x"}',
+    '{"a" 1}',
+    '{"a": 1 "b": 2}',
+    '{"a": [1, 2}',
+    '{"a": @}',
+    '{"a": tru}',
+])
+def test_malformed_input_raises(text):
+    with pytest.raises(MalformedJSONError):
+        StreamingJSONParser().feed(text)
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import pytest
+from api.services.llm_scheduler import LLMOverloadedError, LLMScheduler, Priority
+
+
+class Slots:
+    """Слоты одного сервера: take занимает свободный, give_back освобождает"""
+
+    def __init__(self, free: int, name: str = "server"):
+        self.free = free
+        self.name = name
+
+    def take(self):
+        if not self.free:
+            return None
+        self.free -= 1
+        return self.name
+
+    def give_back(self, resource):
+        assert resource == self.name
+        self.free += 1
+
+
+async def hold(scheduler: LLMScheduler, slots: Slots, name: str, priority: Priority, order: list,
+               release: asyncio.Event):
+    async with scheduler.slot(priority, slots.take, slots.give_back):
+        order.append(name)
+        await release.wait()
+
+
+def test_free_slot_goes_to_highest_priority_then_earliest():
+    async def scenario():
+        scheduler = LLMScheduler(capacity=1, max_queue=10)
+        slots = Slots(1)
+        order, release = [], asyncio.Event()
+        first = asyncio.create_task(hold(scheduler, slots, "first", Priority.PROFILE, order, release))
+        await asyncio.sleep(0)
+        waiting = [
+            asyncio.create_task(hold(scheduler, slots, name, priority, order, release))
+            for name, priority in [("batch", Priority.BATCH), ("profile", Priority.PROFILE),
+                                   ("interactive-1", Priority.INTERACTIVE), ("interactive-2", Priority.INTERACTIVE)]
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(first, *waiting)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["first", "interactive-1", "interactive-2", "profile", "batch"]
+    assert scheduler.running == 0
+    assert scheduler.stats()["completed"] == {"interactive": 2, "profile": 2, "batch": 1}
+
+
+def test_admission_rejects_only_when_queue_ahead_is_full():
+    async def scenario():
+        scheduler = LLMScheduler(capacity=1, max_queue=1)
+        slots = Slots(1)
+        order, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, slots, "running", Priority.INTERACTIVE, order, release))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.create_task(hold(scheduler, slots, "queued", Priority.BATCH, order, release)))
+        await asyncio.sleep(0)
+
+        # Перед срочным запросом фоновый не стоит - его очередь пуста
+        scheduler.check_admission(Priority.INTERACTIVE)
+        with pytest.raises(LLMOverloadedError) as error:
+            scheduler.check_admission(Priority.BATCH)
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return scheduler, error.value
+
+    scheduler, error = asyncio.run(scenario())
+    assert error.priority == Priority.BATCH
+    assert error.retry_after >= 1
+    assert scheduler.stats()["rejected"]["batch"] == 1
+
+
+def test_cancelled_waiter_does_not_leak_slot():
+    async def scenario():
+        scheduler = LLMScheduler(capacity=1, max_queue=10)
+        slots = Slots(1)
+        order, release = [], asyncio.Event()
+        running = asyncio.create_task(hold(scheduler, slots, "running", Priority.PROFILE, order, release))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(hold(scheduler, slots, "cancelled", Priority.INTERACTIVE, order, release))
+        last = asyncio.create_task(hold(scheduler, slots, "last", Priority.BATCH, order, release))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        release.set()
+        await asyncio.gather(running, cancelled, last, return_exceptions=True)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order == ["running", "last"]
+    assert scheduler.running == 0
+
+
+def test_overload_is_served_as_503_with_retry_after():
+    from setup import llm_overloaded_handler
+
+    response = asyncio.run(llm_overloaded_handler(None, LLMOverloadedError(Priority.PROFILE, retry_after=12)))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "12"
+    assert "profile" in json.loads(response.body)["detail"]
+
+
+def test_resize_hands_new_slots_to_waiters():
+    async def scenario():
+        scheduler = LLMScheduler(capacity=1, max_queue=10)
+        slots = Slots(1)
+        order, release = [], asyncio.Event()
+        tasks = [asyncio.create_task(hold(scheduler, slots, f"job-{i}", Priority.PROFILE, order, release)) for i in range(3)]
+        await asyncio.sleep(0)
+        assert order == ["job-0"]
+
+        # В пул вернулся сервер ещё с двумя слотами
+        slots.free += 2
+        scheduler.resize(3)
+        await asyncio.sleep(0)
+        assert order == ["job-0", "job-1", "job-2"] and scheduler.running == 3
+
+        release.set()
+        await asyncio.gather(*tasks)
+        return scheduler, slots
+
+    scheduler, slots = asyncio.run(scenario())
+    assert scheduler.running == 0
+    assert slots.free == 3
+
+
+def test_waiter_for_busy_backend_does_not_block_other_backend():
+    async def scenario():
+        scheduler = LLMScheduler(capacity=2, max_queue=10)
+        first, second = Slots(1, "first"), Slots(1, "second")
+        order, release_first, release_second = [], asyncio.Event(), asyncio.Event()
+        tasks = [
+            asyncio.create_task(hold(scheduler, first, "first-running", Priority.BATCH, order, release_first)),
+            asyncio.create_task(hold(scheduler, second, "second-running", Priority.BATCH, order, release_second)),
+        ]
+        await asyncio.sleep(0)
+        tasks += [
+            asyncio.create_task(hold(scheduler, first, "first-waiting", Priority.INTERACTIVE, order, release_first)),
+            asyncio.create_task(hold(scheduler, second, "second-waiting", Priority.BATCH, order, release_first)),
+        ]
+        await asyncio.sleep(0)
+
+        # Освободился слот второго сервера - его получает тот, кому он подходит, хоть и с меньшим приоритетом
+        release_second.set()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        assert order == ["first-running", "second-running", "second-waiting"]
+
+        release_first.set()
+        await asyncio.gather(*tasks)
+        return order, scheduler
+
+    order, scheduler = asyncio.run(scenario())
+    assert order[-1] == "first-waiting"
+    assert scheduler.running == 0
@@ -0,0 +1,132 @@
+import asyncio
+import httpx
+import pytest
+from ollama import ResponseError
+from api.services.ollama_pool import OllamaPool
+
+
+class FakeClient:
+    def __init__(self, models=None, error: Exception = None):
+        self.models = models or []
+        self.error = error
+
+    async def list(self):
+        if self.error:
+            raise self.error
+        return {"models": [{"model": name} for name in self.models]}
+
+
+def make_pool(**kwargs) -> OllamaPool:
+    return OllamaPool(["http://a:11434", "http://b:11434"], **kwargs)
+
+
+def pick(pool: OllamaPool, model: str = "llama3"):
+    """Сервер, на который ушёл бы запрос (слот сразу освобождается)"""
+    backend = pool.acquire(model)
+    if backend is not None:
+        pool.release(backend)
+    return backend
+
+
+async def use(pool: OllamaPool, model: str = "llama3", error: Exception = None):
+    backend = pool.acquire(model)
+    try:
+        async with pool.client(backend, model) as client:
+            if error:
+                raise error
+            return client
+    finally:
+        pool.release(backend)
+
+
+def test_requires_at_least_one_url():
+    with pytest.raises(ValueError):
+        OllamaPool([])
+
+
+def test_routes_to_least_outstanding_backend():
+    pool = make_pool(max_concurrency=4)
+    first, second = pool.backends
+    first.outstanding = 2
+    assert pick(pool) is second
+    second.outstanding = 3
+    assert pick(pool) is first
+
+
+def test_acquire_waits_for_a_free_slot_on_a_backend_with_the_model():
+    pool = make_pool(max_concurrency=1)
+    first, second = pool.backends
+    first.models = {"llama3:latest"}
+    second.models = {"mistral:latest"}
+
+    assert pool.acquire("llama3") is first
+    # Свободный слот есть только на сервере без модели - запрос должен ждать
+    assert pool.acquire("llama3") is None
+    assert pool.acquire("mistral") is second
+    assert pool.acquire("mistral", backend=first) is None
+
+    pool.release(first)
+    assert pool.acquire("llama3") is first
+    assert pool.capacity() == 2
+
+
+def test_backend_is_ejected_after_consecutive_failures_and_reinstated_on_trial():
+    capacity = []
+    pool = make_pool(failure_threshold=2, eject_seconds=60, on_capacity_change=capacity.append)
+    first, second = pool.backends
+    second.outstanding = 1  # слот второго занят - все запросы идут на первый сервер
+
+    for _ in range(2):
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(use(pool, error=httpx.ConnectError("refused")))
+
+    assert not first.healthy
+    assert capacity == [1]
+    second.outstanding = 0
+    assert pick(pool) is second
+
+    # Срок исключения истёк - сервер получает пробный запрос
+    first.ejected_until = 0
+    second.outstanding = 1
+    assert pick(pool) is first
+    assert first.healthy
+    asyncio.run(use(pool))
+    assert first.failures == 0
+    assert capacity == [1, 2]
+
+
+def test_client_errors_do_not_count_as_backend_failures():
+    pool = make_pool(failure_threshold=1)
+    first = pool.backends[0]
+    first.models = {"llama3:latest", "mistral:latest"}
+    pool.backends[1].outstanding = 1
+
+    with pytest.raises(ResponseError):
+        asyncio.run(use(pool, error=ResponseError("bad request", 400)))
+    assert first.healthy and first.failures == 0
+
+    # 404 - модели на сервере больше нет, её запросы туда не отправляются
+    with pytest.raises(ResponseError):
+        asyncio.run(use(pool, error=ResponseError("model not found", 404)))
+    assert first.healthy
+    assert not first.has_model("llama3")
+    assert first.has_model("mistral")
+
+
+def test_health_check_updates_models_and_health():
+    pool = make_pool(failure_threshold=1)
+    first, second = pool.backends
+    first.client = FakeClient(models=["llama3:latest"])
+    second.client = FakeClient(error=httpx.ConnectError("refused"))
+
+    asyncio.run(pool.check_all())
+
+    assert first.healthy and first.models == {"llama3:latest"}
+    assert not second.healthy
+    assert pool.stats()["healthy"] == 1
+    assert pick(pool) is first
+
+    second.client = FakeClient(models=["mistral:latest"])
+    asyncio.run(pool.check(second))
+    assert second.healthy
+    assert pick(pool, "mistral") is second
@@ -0,0 +1,36 @@
+from datetime import datetime
+from types import SimpleNamespace
+from api.routes.v1.process_handlers import _profile_response
+from api.schemas.v1.ai_models import CareerProfileResponse, ChatExample, RealCaseExample
+
+PROFILE_DATA = {
+    "position_title": "Junior Backend-разработчик в финтехе",
+    "sounds": ["Уведомление Build failed в CI/CD"],
+    "career_growth": "Junior (0-2 года) → Middle (2-4 года)",
+    "balance_score": "60/40",
+    "benefit": "Видишь, как твой код проводит платежи",
+    "typical_day": "Утром стендап, потом код-ревью и задачи.",
+    "real_cases": [{"title": "Оптимизация запроса", "description": "Ускорить выборку", "difficulty": "medium"}],
+    "tech_stack": ["Python - пишешь сервисы весь день"],
+    "visual": ["Два монитора", "Открытый офис", "Зелёные тесты"],
+    "chat_examples": [{
+        "colleague": "Саша (тимлид)",
+        "request": "Глянешь PR?",
+        "your_response": "Да, после обеда",
+        "vibe": "Спокойная рутина",
+    }],
+}
+
+
+def test_profile_response_builds_career_profile():
+    session = SimpleNamespace(id=42, created_at=datetime(2025, 1, 1, 12, 0))
+
+    response = _profile_response(session, PROFILE_DATA, ["https://img/1.png"])
+
+    assert isinstance(response, CareerProfileResponse)
+    assert response.session_id == 42
+    assert response.created_at == session.created_at
+    assert response.position_title == PROFILE_DATA["position_title"]
+    assert response.day_images == ["https://img/1.png"]
+    assert response.real_cases == [RealCaseExample(**PROFILE_DATA["real_cases"][0])]
+    assert response.chat_examples == [ChatExample(**PROFILE_DATA["chat_examples"][0])]
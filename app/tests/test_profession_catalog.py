@@ -0,0 +1,51 @@
+from api.services.profession_catalog import ProfessionMatcher, catalog_entries
+
+PROFESSIONS = [
+    "Программист, разработчик",
+    "Менеджер по продажам, менеджер по работе с клиентами",
+    "Менеджер по персоналу",
+    "Врач-терапевт",
+    "Тестировщик",
+    "Другое",
+]
+
+
+def make_matcher() -> ProfessionMatcher:
+    return ProfessionMatcher(catalog_entries([{"name": name} for name in PROFESSIONS]))
+
+
+def test_short_synonym_matches_exactly():
+    result = make_matcher().match("HR")
+    assert result["status"] == "exact"
+    assert result["profession_name"] == "Менеджер по персоналу"
+
+
+def test_colloquial_synonym():
+    result = make_matcher().match("хочу стать айтишником")
+    assert result["status"] == "exact"
+    assert result["profession_name"] == "Программист, разработчик"
+
+
+def test_inflected_form():
+    result = make_matcher().match("Хочу быть тестировщиком")
+    assert result["status"] == "exact"
+    assert result["profession_name"] == "Тестировщик"
+
+
+def test_inflected_head_word():
+    result = make_matcher().match("хочу быть врачом")
+    assert result["status"] == "fuzzy"
+    assert result["profession_name"] == "Врач-терапевт"
+
+
+def test_bare_common_title_offers_alternatives():
+    result = make_matcher().match("Менеджер")
+    assert result["status"] == "near"
+    assert result["alternatives"] == [
+        "Менеджер по продажам, менеджер по работе с клиентами",
+        "Менеджер по персоналу",
+    ]
+
+
+def test_ignored_role_is_not_indexed():
+    assert make_matcher().match("другое")["status"] == "none"
@@ -0,0 +1,51 @@
+from api.services.profile_schema import (
+    PROFILE_MIN_ITEMS,
+    SERVICE_FIELDS,
+    profile_json_schema,
+    profile_sections,
+    section_json_schema,
+    section_problem,
+    valid_items,
+)
+
+
+def chat_example(index: int) -> dict:
+    return {"colleague": f"Коллега {index}", "request": "Глянешь?", "your_response": "Да", "vibe": "Спокойно"}
+
+
+def test_schema_has_no_service_fields_or_refs():
+    schema = profile_json_schema()
+    assert not set(SERVICE_FIELDS) & set(schema["properties"])
+    assert not set(SERVICE_FIELDS) & set(schema["required"])
+    assert "$ref" not in str(schema) and "$defs" not in schema
+    assert schema["properties"]["chat_examples"]["minItems"] == PROFILE_MIN_ITEMS["chat_examples"]
+    assert schema["properties"]["real_cases"]["items"]["properties"]["difficulty"]["enum"] == ["easy", "medium", "hard"]
+
+
+def test_section_json_schema_overrides_min_items():
+    schema = section_json_schema("real_cases", min_items=1)
+    assert schema["required"] == ["real_cases"]
+    assert schema["properties"]["real_cases"]["minItems"] == 1
+    assert profile_json_schema()["properties"]["real_cases"]["minItems"] == PROFILE_MIN_ITEMS["real_cases"]
+
+
+def test_valid_items_drops_incomplete_entries():
+    items = [chat_example(1), {"colleague": "Без ответа", "request": "?"}, "строка", chat_example(2)]
+    assert valid_items("chat_examples", items) == [chat_example(1), chat_example(2)]
+    assert valid_items("chat_examples", "не список") == []
+    assert valid_items("position_title", "Разработчик") == []
+
+
+def test_section_problem():
+    assert section_problem("position_title", None) == "missing"
+    assert section_problem("position_title", "  ") == "expected string"
+    assert section_problem("position_title", "Разработчик") is None
+    assert section_problem("chat_examples", [chat_example(i) for i in range(4)]) == \
+        "need at least 5 valid items, got 4"
+    assert section_problem("chat_examples", [chat_example(i) for i in range(5)]) is None
+    assert section_problem("sounds", []) == "need at least 1 valid items, got 0"
+
+
+def test_every_section_is_known():
+    assert "position_title" in profile_sections()
+    assert "session_id" not in profile_sections()
@@ -0,0 +1,20 @@
+from api.services.salary_snapshot import NOT_SPECIFIED, SalarySnapshot
+
+RECORDS = [
+    {"id": "1", "salary": {"from": 100_000, "to": 150_000, "currency": "RUR"},
+     "experience": {"id": "noExperience", "name": "Нет опыта"},
+     "professional_roles": [{"id": "96", "name": "Программист, разработчик"}, {"id": "0", "name": None}]},
+    {"id": "2", "salary": {"from": 60_000, "to": None, "currency": "RUR"},
+     "experience": {"id": "noExperience", "name": "Нет опыта"},
+     "professional_roles": [{"id": "0"}]},
+]
+
+
+def test_nameless_roles_are_skipped():
+    snapshot = SalarySnapshot(RECORDS)
+    by_role = snapshot.full_stats()["by_professional_role"]
+
+    assert None not in by_role
+    assert None not in snapshot.roles.codes
+    assert by_role["Программист, разработчик"]["avg_middle"] == 125_000
+    assert by_role[NOT_SPECIFIED]["avg_middle"] == 60_000
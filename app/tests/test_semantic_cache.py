@@ -0,0 +1,81 @@
+import asyncio
+import numpy as np
+from api.services.semantic_cache import SemanticCache, VectorIndex
+
+
+def make_cache(vectors: dict, max_entries: int = 10) -> SemanticCache:
+    calls = []
+
+    async def embed(text):
+        calls.append(text)
+        return vectors.get(text)
+
+    cache = SemanticCache("test", embed=embed, threshold=0.9, max_entries=max_entries)
+    cache.calls = calls
+    return cache
+
+
+def test_index_overwrites_row_of_existing_key():
+    index = VectorIndex(initial_capacity=2)
+    index.add("a", np.array([1.0, 0.0], dtype=np.float32))
+    index.add("a", np.array([0.0, 1.0], dtype=np.float32))
+    assert len(index) == 1
+    assert index.keys == ["a"]
+    assert index.nearest(np.array([0.0, 1.0], dtype=np.float32)) == ("a", 1.0)
+
+
+def test_index_reuses_removed_rows_and_grows():
+    index = VectorIndex(initial_capacity=2)
+    for i, key in enumerate("abc"):
+        index.add(key, np.eye(3, dtype=np.float32)[i])
+    index.remove("b")
+    index.add("d", np.eye(3, dtype=np.float32)[1])
+    assert len(index) == 3
+    assert len(index.keys) == 3
+    assert index.nearest(np.eye(3, dtype=np.float32)[1])[0] == "d"
+
+
+def test_semantic_hit_stays_within_partition():
+    cache = make_cache({"стартап": [1.0, 0.0], "небольшая компания": [1.0, 0.01]})
+
+    async def scenario():
+        await cache.set("стартап", "вопрос аналитику", partition=("Аналитик", 1))
+        other, _ = await cache.get("небольшая компания", ("Дизайнер", 1))
+        same, _ = await cache.get("небольшая компания", ("Аналитик", 1))
+        return other, same
+
+    assert asyncio.run(scenario()) == (None, "вопрос аналитику")
+    assert cache.metrics["semantic_hits"] == 1
+
+
+def test_embeds_original_text():
+    cache = make_cache({})
+    asyncio.run(cache.get("Хочу работать в стартапе"))
+    assert cache.calls == ["Хочу работать в стартапе"]
+
+
+def test_accept_rejects_semantic_hit():
+    cache = make_cache({"пилот": [1.0, 0.0], "пилот дронов": [1.0, 0.1]})
+
+    async def scenario():
+        await cache.set("пилот", {"profession_name": "Пилот"})
+        value, _ = await cache.get("пилот дронов", accept=lambda value: value["profession_name"] == "Пилот дронов")
+        return value
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_eviction_removes_vector():
+    cache = make_cache({"a": [1.0, 0.0], "b": [0.0, 1.0], "a2": [1.0, 0.05]}, max_entries=1)
+
+    async def scenario():
+        await cache.set("a", "A")
+        await cache.set("a", "A")
+        await cache.set("b", "B")
+        value, _ = await cache.get("a2")
+        return value
+
+    assert asyncio.run(scenario()) is None
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["partitions"] == 1
+    assert len(cache._indexes[None]) == 1
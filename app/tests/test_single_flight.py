@@ -0,0 +1,134 @@
+import asyncio
+import pytest
+from api.services.single_flight import SingleFlight
+from database.models import LLMResult
+
+
+def test_make_key_is_stable_and_distinguishes_parts():
+    assert SingleFlight.make_key("model", "prompt", {"a": 1, "b": 2}) == \
+        SingleFlight.make_key("model", "prompt", {"b": 2, "a": 1})
+    assert SingleFlight.make_key("model", "prompt", 0.3) != SingleFlight.make_key("model", "prompt", 0.7)
+
+
+def test_concurrent_calls_share_one_execution():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"text": "ответ"}
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", work) for _ in range(5)))
+        return flight, results
+
+    flight, results = asyncio.run(scenario())
+    assert results == [{"text": "ответ"}] * 5
+    assert len(calls) == 1
+    assert flight.stats()["executed"] == 1 and flight.stats()["coalesced"] == 4
+    assert flight.stats()["inflight"] == 0
+
+
+def test_cancelled_caller_does_not_cancel_work_for_others():
+    async def work():
+        await asyncio.sleep(0.02)
+        return "готово"
+
+    async def scenario():
+        flight = SingleFlight()
+        first = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(flight.do("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await asyncio.gather(first, second, return_exceptions=True)
+
+    first, second = asyncio.run(scenario())
+    assert isinstance(first, asyncio.CancelledError)
+    assert second == "готово"
+
+
+def test_errors_reach_every_caller_and_are_not_cached():
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("ollama down")
+
+    async def scenario():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.do("key", failing) for _ in range(3)), return_exceptions=True)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+        return results
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(attempts) == 2
+
+
+def run_with_database(scenario):
+    """Сценарий с таблицей llm_results в SQLite в памяти - аренда работает через обычные запросы ORM"""
+    from tortoise import Tortoise
+
+    async def main():
+        await Tortoise.init(db_url="sqlite://:memory:", modules={"models": ["database.models"]})
+        await Tortoise.generate_schemas()
+        try:
+            return await scenario()
+        finally:
+            await Tortoise.close_connections()
+
+    return asyncio.run(main())
+
+
+def test_shared_mode_executes_once_across_workers():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.3)
+        return {"text": "ответ"}
+
+    async def scenario():
+        # Два SingleFlight - как два воркера с общей БД
+        workers = [SingleFlight(mode="postgres", ttl=60, wait_timeout=5) for _ in range(2)]
+        first = asyncio.create_task(workers[0].do("key", work))
+        await asyncio.sleep(0.05)
+        second = asyncio.create_task(workers[1].do("key", work))
+        results = await asyncio.gather(first, second)
+        return workers, results, await LLMResult.get(key="key")
+
+    workers, results, row = run_with_database(scenario)
+    assert results == [{"text": "ответ"}] * 2
+    assert len(calls) == 1
+    assert workers[1].stats()["shared_hits"] == 1
+    assert row.result == {"text": "ответ"} and row.lease_until is None
+
+
+def test_failed_work_releases_lease():
+    async def failing():
+        raise RuntimeError("ollama down")
+
+    async def work():
+        return "ответ"
+
+    async def scenario():
+        flight = SingleFlight(mode="postgres", ttl=60, wait_timeout=5)
+        with pytest.raises(RuntimeError):
+            await flight.do("key", failing)
+        assert not await LLMResult.exists(key="key")
+        # Следующий воркер сразу берёт аренду, а не ждёт её истечения
+        return await SingleFlight(mode="postgres", ttl=60, wait_timeout=5).do("key", work)
+
+    assert run_with_database(scenario) == "ответ"
+
+
+def test_busy_lease_is_not_taken_twice():
+    async def scenario():
+        flight = SingleFlight(mode="postgres", ttl=60, wait_timeout=5)
+        return await flight._acquire_lease("key"), await flight._acquire_lease("key")
+
+    assert run_with_database(scenario) == (True, False)
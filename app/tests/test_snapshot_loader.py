@@ -0,0 +1,25 @@
+from api.services.snapshot_loader import _snapshot_rows
+
+DESCRIPTION = (
+    "<p>Разработка backend-сервисов на Python для платёжной платформы, проектирование API, "
+    "код-ревью коллег, оптимизация запросов к PostgreSQL, работа с очередями сообщений, "
+    "участие в дежурствах и разборе инцидентов вместе с командой эксплуатации</p>"
+)
+
+
+def test_snapshot_rows_skip_duplicates_and_nameless_roles():
+    vacancies = [
+        {"id": "1", "name": "Python-разработчик", "description": DESCRIPTION,
+         "professional_roles": [{"id": "96", "name": "Программист, разработчик"}, {"id": "0"}]},
+        {"id": "1", "name": "Повтор того же id"},
+        {"id": "2", "name": "Python-разработчик", "description": DESCRIPTION},
+        {"name": "Без id"},
+    ]
+    rows, roles, descriptions, signatures, bands, clusters = _snapshot_rows(vacancies)
+
+    assert [row[0] for row in rows] == ["1", "2"]
+    assert roles == [["1", "96", "Программист, разработчик"]]
+    assert len(descriptions) == 2
+    assert set(signatures) == set(bands) == {"1", "2"}
+    # Одинаковые тексты попадают в один кластер почти-дублей
+    assert clusters["1"] == clusters["2"]
@@ -0,0 +1,26 @@
+import asyncio
+import sys
+import pytest
+from fastapi import HTTPException
+from api.routes.v1 import hhru_handlers
+from api.services.vacancy_export import parquet_available
+
+
+def test_parquet_unavailable_without_pyarrow(monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyarrow", None)
+    assert parquet_available() is False
+
+
+def test_parquet_export_is_rejected_before_streaming(monkeypatch):
+    monkeypatch.setattr(hhru_handlers, "parquet_available", lambda: False)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(hhru_handlers.export_vacancies_stream(format="parquet", chunk_size=5000,
+                                                          include_description=False))
+    assert error.value.status_code == 501
+
+
+def test_other_formats_do_not_need_pyarrow(monkeypatch):
+    monkeypatch.setattr(hhru_handlers, "parquet_available", lambda: False)
+    response = asyncio.run(hhru_handlers.export_vacancies_stream(format="csv", chunk_size=5000,
+                                                                 include_description=False))
+    assert response.media_type.startswith("text/csv")